@@ -1,10 +1,18 @@
+import os
+
 from flask import Flask
-from flask_migrate import Migrate
 
+from commands import register_commands
 from config import config
 from models import db
 from routes.admin_routes import admin_bp
+from routes.asset_routes import assets_bp
+from routes.media_routes import media_bp
 from routes.user_routes import user_bp
+from utils.db_routing import init_db_routing
+from utils.instrumentation import init_instrumentation, timed_context_processor
+from utils.metrics import init_metrics
+from utils.schema import prepare_schema
 
 
 def create_app() -> Flask:
@@ -15,33 +23,41 @@ def create_app() -> Flask:
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = config.SQLALCHEMY_ENGINE_OPTIONS
 
+    init_db_routing(app)   # before init_app: adds the replica bind
     db.init_app(app)
-    Migrate(app, db)
+    from_cli = os.environ.get("FLASK_RUN_FROM_CLI") == "true"
+    # Flask-Migrate pulls in Alembic (about half of startup); only the
+    # `flask` CLI needs it, for `flask db ...`
+    if from_cli:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    init_instrumentation(app)
+    init_metrics(app)
 
-    # ✅ Always ensure tables exist (safe no-op if they already do)
-    with app.app_context():
-        db.create_all()
+    # ✅ Create tables or check the Alembic revision, per SCHEMA_MODE
+    prepare_schema(app, from_cli)
 
     # ── Inject current user's total score into every template ──────────────
     @app.context_processor
+    @timed_context_processor
     def inject_user_score():
         from flask import session as _session
-        from models import Attempt as _Attempt, db as _db
-        user_id = _session.get("user_id")
-        if user_id:
-            total = (
-                _db.session.query(
-                    _db.func.coalesce(_db.func.sum(_Attempt.score), 0)
-                )
-                .filter(_Attempt.user_id == user_id)
-                .scalar()
-            )
-            return {"user_total_score": int(total or 0)}
-        return {"user_total_score": None}
+        from utils.user_scores import cached_total
+        return {
+            "user_total_score": cached_total(_session, _session.get("user_id"))
+        }
+
+    # Fingerprinted static URLs (falls back to /static before a build)
+    from utils.assets import asset_url
+    app.jinja_env.globals["asset_url"] = asset_url
 
     # ✅ Register blueprints ONLY
     app.register_blueprint(user_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(assets_bp)
+    app.register_blueprint(media_bp)
+
+    register_commands(app)
 
     return app
 
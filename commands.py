@@ -0,0 +1,112 @@
+"""
+Maintenance commands, registered on the app's `flask` CLI.
+
+    flask repair-scores        rebuild users.total_score from attempts
+    flask compile-manifests    (re)build contents.panel_manifest
+    flask build-assets         fingerprint + precompress static CSS/JS
+    flask check-assets         verify every template asset reference resolves
+    flask build-panel-variants resize uploaded panels that lack their variants
+    flask rebuild-rollups      recompute chapter funnels and solve-time sketches
+"""
+
+import click
+from flask import Flask
+
+from models import db
+
+
+def register_commands(app: Flask) -> None:
+
+    @app.cli.command("repair-scores")
+    def repair_scores():
+        """Rebuild every user's materialized total from attempts."""
+        from utils.user_scores import rebuild_user_totals
+        from utils.live_events import mark_changed
+
+        drifted = rebuild_user_totals()
+        db.session.commit()
+        mark_changed()
+        click.echo(f"Rebuilt user totals ({drifted} were out of date).")
+
+    @app.cli.command("compile-manifests")
+    @click.option("--all", "rebuild_all", is_flag=True,
+                  help="Recompile every chapter, not just missing/stale ones.")
+    def compile_manifests(rebuild_all):
+        """Backfill the precompiled panel manifest for every chapter."""
+        from models import Content
+        from utils.content_catalog import bump_catalog_version
+        from utils.panel_manifest import (
+            compile_manifest,
+            manifest_from_json,
+            manifest_to_json,
+            panels_from_json,
+        )
+
+        changed = 0
+        for content in Content.query.order_by(Content.id.asc()).all():
+            fresh = manifest_to_json(
+                compile_manifest(panels_from_json(content.panels_json))
+            )
+            current = manifest_from_json(content.panel_manifest)
+            if rebuild_all or current is None or content.panel_manifest != fresh:
+                content.panel_manifest = fresh
+                changed += 1
+
+        if changed:
+            bump_catalog_version()
+        db.session.commit()
+        click.echo(f"Compiled {changed} panel manifest(s).")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Write hashed, precompressed copies of static CSS/JS."""
+        from utils.assets import brotli, build_assets
+
+        manifest = build_assets()
+        for source, hashed in sorted(manifest.items()):
+            click.echo(f"{source} -> {hashed}")
+        if brotli is None:
+            click.echo("brotli not installed: wrote .gz variants only.")
+
+    @app.cli.command("check-assets")
+    def check_assets_command():
+        """Fail if any template references a static file that won't resolve."""
+        import os
+
+        from utils.assets import check_template_refs
+
+        problems = check_template_refs(
+            os.path.join(app.root_path, app.template_folder)
+        )
+        for problem in problems:
+            click.echo(problem, err=True)
+        if problems:
+            raise SystemExit(1)
+        click.echo("All template asset references resolve.")
+
+    @app.cli.command("build-panel-variants")
+    def build_panel_variants_command():
+        """Build any missing srcset variants for uploaded panels."""
+        from utils.panel_store import build_variants, missing_variants, pillow_available
+
+        if not pillow_available():
+            click.echo("Pillow not installed: uploaded panels are served without variants.", err=True)
+            raise SystemExit(1)
+
+        written = 0
+        for original, jobs in missing_variants():
+            written += build_variants(original, jobs)
+        click.echo(f"Built {written} panel variant(s).")
+
+    @app.cli.command("rebuild-rollups")
+    @click.option("--batch-size", default=5000, show_default=True,
+                  help="Attempts read per query.")
+    def rebuild_rollups_command(batch_size):
+        """Recompute chapter funnels and solve-time sketches from attempts."""
+        from utils.chapter_rollups import rebuild_rollups
+        from utils.live_events import mark_changed
+
+        seen = rebuild_rollups(batch_size)
+        db.session.commit()
+        mark_changed()
+        click.echo(f"Rebuilt chapter rollups from {seen} attempt(s).")
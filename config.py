@@ -1,4 +1,15 @@
 import os
+import tempfile
+
+
+def _database_url(url: str) -> str:
+    # Render provides postgres://, but SQLAlchemy requires postgresql://.
+    # Name the driver too: psycopg2 is the one installed (and the one
+    # psycogreen makes cooperative), while newer SQLAlchemy defaults to psycopg 3.
+    for scheme in ("postgres://", "postgresql://"):
+        if url.startswith(scheme):
+            return url.replace(scheme, "postgresql+psycopg2://", 1)
+    return url
 
 
 class Config:
@@ -9,19 +20,122 @@ class Config:
     DB_PATH = os.path.join(BASE_DIR, "database.db")
 
     # Support Render's PostgreSQL (DATABASE_URL) or local SQLite fallback
-    _db_url = os.environ.get("DATABASE_URL", "")
-    # Render provides postgres://, but SQLAlchemy requires postgresql://
-    if _db_url.startswith("postgres://"):
-        _db_url = _db_url.replace("postgres://", "postgresql://", 1)
+    _db_url = _database_url(os.environ.get("DATABASE_URL", ""))
     SQLALCHEMY_DATABASE_URI = _db_url if _db_url else f"sqlite:///{DB_PATH}"
 
+    # Optional read replica (see utils/db_routing.py): read-only views
+    # query it, except for a player's own REPLICA_STICKY_SECONDS after any
+    # request of theirs that wrote, which read the primary.
+    SQLALCHEMY_DATABASE_REPLICA_URI = (
+        _database_url(os.environ.get("DATABASE_REPLICA_URL", "")) or None
+    )
+    REPLICA_STICKY_SECONDS = float(os.environ.get("REPLICA_STICKY_SECONDS", "5"))
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Schema work at startup (see utils/schema.py): "create_all" creates
+    # missing tables on every boot; "alembic" only checks that
+    # `flask db upgrade` brought the database to the latest migration;
+    # "skip" does nothing.
+    SCHEMA_MODE = os.environ.get("SCHEMA_MODE", "create_all")
+
+    # Gunicorn worker model (see gunicorn.conf.py). Threaded workers
+    # ("gthread") serve GUNICORN_THREADS requests at once per process;
+    # green workers ("gevent") serve up to GUNICORN_WORKER_CONNECTIONS,
+    # each one parked cheaply while it waits on the database.
+    WORKER_CLASS = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+    WORKER_THREADS = int(os.environ.get("GUNICORN_THREADS", "8"))
+    WORKER_CONNECTIONS = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+    GREEN_WORKERS = WORKER_CLASS == "gevent"
+    WORKER_CONCURRENCY = WORKER_CONNECTIONS if GREEN_WORKERS else WORKER_THREADS
+
+    # Database connections per worker process: one per concurrent request
+    # plus two for the background threads (live publisher, metrics),
+    # capped at DB_POOL_LIMIT so that WEB_CONCURRENCY x DB_POOL_LIMIT stays
+    # under the server's max_connections. Half are kept open, the rest
+    # are overflow; requests past the cap queue for DB_POOL_TIMEOUT seconds.
+    DB_POOL_LIMIT = int(os.environ.get("DB_POOL_LIMIT", "20"))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+    _pool_limit = max(1, min(WORKER_CONCURRENCY + 2, DB_POOL_LIMIT))
+
     # Reconnect automatically if Neon (or any provider) drops the SSL connection
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_pre_ping": True,   # test connection before use; reconnects if stale
         "pool_recycle": 300,     # recycle connections every 5 minutes
     }
+    # SQLite pools are per-thread or static, not sized
+    if not SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        SQLALCHEMY_ENGINE_OPTIONS.update(
+            pool_size=(_pool_limit + 1) // 2,
+            max_overflow=_pool_limit // 2,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    # How often (seconds) each worker re-checks the catalog version row.
+    # 0 checks on every request; admin edits are always seen immediately
+    # by the worker that made them.
+    CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", "1.0"))
+
+    # How long (seconds) a player's session progress mask is trusted before
+    # it is re-checked against their progress version in the database
+    PROGRESS_MASK_TTL = float(os.environ.get("PROGRESS_MASK_TTL", "30"))
+
+    # How often (seconds) each worker pulls score changes made by the others
+    LEADERBOARD_SYNC_INTERVAL = float(os.environ.get("LEADERBOARD_SYNC_INTERVAL", "1.0"))
+
+    # Self-hosted media (chapter videos, uploaded panels) served from /media/
+    MEDIA_ROOT = os.environ.get("MEDIA_ROOT", os.path.join(BASE_DIR, "media"))
+    MEDIA_MAX_AGE = int(os.environ.get("MEDIA_MAX_AGE", "86400"))
+    MEDIA_FD_CACHE_SIZE = int(os.environ.get("MEDIA_FD_CACHE_SIZE", "32"))
+    # Background processes that resize uploaded panels into srcset variants
+    MEDIA_VARIANT_WORKERS = int(os.environ.get("MEDIA_VARIANT_WORKERS", "2"))
+
+    # Per-request instrumentation (see utils/instrumentation.py):
+    # Server-Timing header, one JSON log line per request, and an opt-in
+    # warning for requests issuing more than QUERY_BUDGET statements (0 = off).
+    # The header is sent to admin sessions only ("admin"), to every client
+    # ("1", for local profiling and load tests) or never ("0").
+    SERVER_TIMING = os.environ.get("SERVER_TIMING", "admin")
+    REQUEST_LOG = os.environ.get("REQUEST_LOG", "1") == "1"
+    QUERY_BUDGET = int(os.environ.get("QUERY_BUDGET", "0"))
+
+    # Prometheus metrics at /admin/metrics (see utils/metrics.py). Each
+    # worker writes its snapshot to METRICS_DIR at most every
+    # METRICS_FLUSH_INTERVAL seconds; scrapers without an admin session
+    # authenticate with "Authorization: Bearer $METRICS_TOKEN".
+    METRICS_DIR = os.environ.get(
+        "METRICS_DIR", os.path.join(tempfile.gettempdir(), "murdermystery-metrics")
+    )
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1.0"))
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+    # Live dashboard stream at /admin/live (see utils/live_events.py). Every
+    # score change touches LIVE_MARKER_FILE (shared by the workers on one
+    # host); one publisher per process checks it every LIVE_POLL_INTERVAL
+    # and reads the database only when it moved;
+    # clients get a heartbeat comment when idle, can replay the last
+    # LIVE_REPLAY_SIZE events, and are dropped once LIVE_CLIENT_BUFFER
+    # events behind. Streams end after LIVE_MAX_STREAM_SECONDS and the
+    # browser reconnects, so a stream never pins a worker thread for good.
+    LIVE_MARKER_FILE = os.environ.get(
+        "LIVE_MARKER_FILE", os.path.join(tempfile.gettempdir(), "murdermystery-live.marker")
+    )
+    LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", "1.0"))
+    LIVE_HEARTBEAT_SECONDS = float(os.environ.get("LIVE_HEARTBEAT_SECONDS", "15"))
+    LIVE_REPLAY_SIZE = int(os.environ.get("LIVE_REPLAY_SIZE", "500"))
+    LIVE_CLIENT_BUFFER = int(os.environ.get("LIVE_CLIENT_BUFFER", "100"))
+    LIVE_MAX_STREAM_SECONDS = float(os.environ.get("LIVE_MAX_STREAM_SECONDS", "300"))
+    LIVE_RETRY_MS = int(os.environ.get("LIVE_RETRY_MS", "3000"))
+    LIVE_TOP_N = int(os.environ.get("LIVE_TOP_N", "50"))
+    # An open stream holds a thread for its whole life, so with threaded
+    # workers a few dashboards would starve players' requests. Streams are
+    # only served by gevent workers (LIVE_STREAMING=1 forces them on);
+    # otherwise, and once LIVE_MAX_STREAMS per process are open, /admin/live
+    # answers 503 and dashboards poll /admin/live/snapshot every
+    # LIVE_FALLBACK_POLL_SECONDS instead.
+    LIVE_STREAMING = os.environ.get("LIVE_STREAMING", "1" if GREEN_WORKERS else "0") == "1"
+    LIVE_MAX_STREAMS = int(os.environ.get("LIVE_MAX_STREAMS", "50"))
+    LIVE_FALLBACK_POLL_SECONDS = float(os.environ.get("LIVE_FALLBACK_POLL_SECONDS", "5"))
 
     # Server config — DEBUG off by default in production
     HOST  = os.environ.get("FLASK_RUN_HOST", "0.0.0.0")
@@ -1,5 +1,7 @@
 from app import app
 from models import Content, db
+from utils.content_catalog import bump_catalog_version
+from utils.panel_manifest import compile_manifest, manifest_to_json
 import json
 
 with app.app_context():
@@ -18,10 +20,12 @@ with app.app_context():
         cleaned = [url for url in cleaned if url.startswith("http")]
         if cleaned != panels:
             c.panels_json = json.dumps({"panels": cleaned})
+            c.panel_manifest = manifest_to_json(compile_manifest(cleaned))
             print(f"Ch {c.chapter_number}: Fixed {len(panels)} panels:")
             for url in cleaned:
                 print(f"  {url}")
         else:
             print(f"Ch {c.chapter_number}: Already clean, {len(panels)} panels")
+    bump_catalog_version()
     db.session.commit()
     print("Done.")
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings (`gunicorn -c gunicorn.conf.py app:app`).
+
+The app is imported once in the master (`preload_app`) and the workers
+fork from it, so each new or restarted worker starts with the imports
+done and the schema already checked (see SCHEMA_MODE in config.py).
+Connections opened in the master are not shared with the workers: each
+worker drops the inherited pool and opens its own on first use.
+
+GUNICORN_WORKER_CLASS picks the worker model: "gthread" (default) or
+"gevent" for green workers, which needs the gevent and psycogreen
+packages. Under gevent the standard library and psycopg2 are patched
+here, before the app is imported, so every lock, thread, queue and
+socket the app creates is cooperative; psycopg2 otherwise blocks the
+whole worker while it waits on Postgres.
+"""
+
+import os
+import sys
+
+if os.environ.get("GUNICORN_WORKER_CLASS") == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config as _Config  # noqa: E402
+
+worker_class = _Config.WORKER_CLASS
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = _Config.WORKER_THREADS
+worker_connections = _Config.WORKER_CONNECTIONS
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    from app import app
+    from models import db
+
+    with app.app_context():
+        # close=False: leave the parent's sockets alone, just forget them
+        for engine in db.engines.values():
+            engine.dispose(close=False)
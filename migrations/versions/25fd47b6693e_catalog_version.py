@@ -0,0 +1,30 @@
+"""catalog version counter
+
+Revision ID: 25fd47b6693e
+Revises: e23def1eac8a
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '25fd47b6693e'
+down_revision = 'e23def1eac8a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_state = op.create_table(
+        'catalog_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(catalog_state, [{'id': 1, 'version': 1}])
+
+
+def downgrade():
+    op.drop_table('catalog_state')
@@ -0,0 +1,40 @@
+"""user score_updated_at for leaderboard deltas
+
+Revision ID: 3f8a6d21c0e4
+Revises: 9c41e07a2b5d
+Create Date: 2026-10-18 10:31:17.904452
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a6d21c0e4'
+down_revision = '9c41e07a2b5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'users',
+        sa.Column('score_updated_at', sa.DateTime(), nullable=True),
+    )
+    op.execute("UPDATE users SET score_updated_at = created_at")
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column(
+            'score_updated_at',
+            existing_type=sa.DateTime(),
+            nullable=False,
+        )
+        batch_op.create_index(
+            'ix_users_score_updated_at', ['score_updated_at'], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_index('ix_users_score_updated_at')
+        batch_op.drop_column('score_updated_at')
@@ -0,0 +1,28 @@
+"""per-user progress version
+
+Revision ID: 6e1b93c8d5f7
+Revises: d4c7a1f9e286
+Create Date: 2026-10-18 12:52:09.183655
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1b93c8d5f7'
+down_revision = 'd4c7a1f9e286'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'users',
+        sa.Column('progress_version', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('progress_version')
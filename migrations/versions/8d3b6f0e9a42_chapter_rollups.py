@@ -0,0 +1,44 @@
+"""chapter start counts and solve-time sketches
+
+Revision ID: 8d3b6f0e9a42
+Revises: f2a9d7c4e351
+Create Date: 2026-10-18 18:11:36.540218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3b6f0e9a42'
+down_revision = 'f2a9d7c4e351'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'chapter_stats',
+        sa.Column('starts', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.create_table(
+        'chapter_time_buckets',
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['content_id'], ['contents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('content_id', 'bucket'),
+    )
+
+    # Starts are a plain count; the sketches are filled by `flask rebuild-rollups`
+    op.execute(
+        "UPDATE chapter_stats SET starts = ("
+        " SELECT COUNT(attempts.id) FROM attempts"
+        " WHERE attempts.content_id = chapter_stats.content_id)"
+    )
+
+
+def downgrade():
+    op.drop_table('chapter_time_buckets')
+    with op.batch_alter_table('chapter_stats') as batch_op:
+        batch_op.drop_column('starts')
@@ -0,0 +1,35 @@
+"""materialized user total score
+
+Revision ID: 9c41e07a2b5d
+Revises: 25fd47b6693e
+Create Date: 2026-10-18 09:48:03.561920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41e07a2b5d'
+down_revision = '25fd47b6693e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'users',
+        sa.Column('total_score', sa.Float(), server_default='0', nullable=False),
+    )
+
+    # Backfill from existing attempts
+    op.execute(
+        "UPDATE users SET total_score = ("
+        " SELECT COALESCE(SUM(attempts.score), 0) FROM attempts"
+        " WHERE attempts.user_id = users.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('total_score')
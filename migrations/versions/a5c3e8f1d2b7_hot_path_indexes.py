@@ -0,0 +1,33 @@
+"""hot-path indexes on attempts and contents
+
+Revision ID: a5c3e8f1d2b7
+Revises: 6e1b93c8d5f7
+Create Date: 2026-10-18 14:05:41.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c3e8f1d2b7'
+down_revision = '6e1b93c8d5f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_attempts_content_user', 'attempts',
+        ['content_id', 'user_id', 'completed', 'score'],
+    )
+    op.create_index('ix_attempts_start_time_id', 'attempts', ['start_time', 'id'])
+    op.create_index('ix_attempts_user_score', 'attempts', ['user_id', 'score'])
+    op.create_index('ix_contents_chapter_number', 'contents', ['chapter_number'])
+
+
+def downgrade():
+    op.drop_index('ix_contents_chapter_number', table_name='contents')
+    op.drop_index('ix_attempts_user_score', table_name='attempts')
+    op.drop_index('ix_attempts_start_time_id', table_name='attempts')
+    op.drop_index('ix_attempts_content_user', table_name='attempts')
@@ -0,0 +1,39 @@
+"""per-chapter completion counter
+
+Revision ID: b7d2e95f4a13
+Revises: 3f8a6d21c0e4
+Create Date: 2026-10-18 11:20:52.337016
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e95f4a13'
+down_revision = '3f8a6d21c0e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'chapter_stats',
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('completions', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['content_id'], ['contents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('content_id'),
+    )
+
+    # Seed from completions already on record
+    op.execute(
+        "INSERT INTO chapter_stats (content_id, completions)"
+        " SELECT contents.id, COUNT(attempts.id) FROM contents"
+        " LEFT JOIN attempts ON attempts.content_id = contents.id"
+        " AND attempts.completed = true"
+        " GROUP BY contents.id"
+    )
+
+
+def downgrade():
+    op.drop_table('chapter_stats')
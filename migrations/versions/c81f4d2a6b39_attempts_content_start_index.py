@@ -0,0 +1,27 @@
+"""index attempts by content and start time
+
+Revision ID: c81f4d2a6b39
+Revises: a5c3e8f1d2b7
+Create Date: 2026-10-18 16:20:12.804417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4d2a6b39'
+down_revision = 'a5c3e8f1d2b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_attempts_content_start', 'attempts',
+        ['content_id', 'start_time', 'id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_attempts_content_start', table_name='attempts')
@@ -0,0 +1,27 @@
+"""precompiled panel manifest
+
+Revision ID: d4c7a1f9e286
+Revises: b7d2e95f4a13
+Create Date: 2026-10-18 12:05:44.718390
+
+Existing rows are backfilled with `flask compile-manifests`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4c7a1f9e286'
+down_revision = 'b7d2e95f4a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('contents', sa.Column('panel_manifest', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('contents') as batch_op:
+        batch_op.drop_column('panel_manifest')
@@ -0,0 +1,27 @@
+"""index attempts by completed and start time
+
+Revision ID: f2a9d7c4e351
+Revises: c81f4d2a6b39
+Create Date: 2026-10-18 17:02:48.216930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9d7c4e351'
+down_revision = 'c81f4d2a6b39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_attempts_completed_start', 'attempts',
+        ['completed', 'start_time', 'id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_attempts_completed_start', table_name='attempts')
@@ -1,7 +1,9 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from utils.db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # Chapter reveal config
 CHAPTER_REVEAL_TRIGGER = 6
@@ -16,6 +18,30 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Running SUM(attempts.score); kept in step by submit_result and
+    # rebuilt by `flask repair-scores`
+    total_score = db.Column(
+        db.Float,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+    # Stamped whenever total_score changes, so leaderboards can pull deltas
+    score_updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+        index=True
+    )
+    # Bumped whenever the user starts or finishes an attempt; with the
+    # catalog version it validates cached /chapters pages
+    progress_version = db.Column(
+        db.Integer,
+        default=0,
+        server_default="0",
+        nullable=False
+    )
+
     attempts = db.relationship(
         "Attempt",
         back_populates="user",
@@ -36,7 +62,7 @@ class Content(db.Model):
     is_unlocked = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
-    chapter_number = db.Column(db.Integer, default=1, nullable=False)
+    chapter_number = db.Column(db.Integer, default=1, nullable=False, index=True)
     unlock_time = db.Column(db.DateTime, nullable=True)
     requires_previous_completion = db.Column(
         db.Boolean,
@@ -45,6 +71,8 @@ class Content(db.Model):
     )
 
     panels_json = db.Column(db.Text, nullable=True)
+    # Compiled by utils.panel_manifest whenever panels are written
+    panel_manifest = db.Column(db.Text, nullable=True)
 
     attempts = db.relationship(
         "Attempt",
@@ -92,10 +120,67 @@ class Attempt(db.Model):
             "content_id",
             name="unique_user_content_attempt"
         ),
+        # Per-chapter completion counts and chapter deletes (grouped by
+        # user), answered from the index alone
+        db.Index(
+            "ix_attempts_content_user",
+            "content_id", "user_id", "completed", "score",
+        ),
+        # Admin attempts view: newest first, with id as the tie-breaker
+        db.Index("ix_attempts_start_time_id", "start_time", "id"),
+        # One chapter's attempts in start order (filtered views and exports)
+        db.Index("ix_attempts_content_start", "content_id", "start_time", "id"),
+        # Attempts view filtered on completed, newest first
+        db.Index("ix_attempts_completed_start", "completed", "start_time", "id"),
+        # Per-user score sums (score repair) without touching the table
+        db.Index("ix_attempts_user_score", "user_id", "score"),
     )
 
     user = db.relationship("User", back_populates="attempts")
     content = db.relationship("Content", back_populates="attempts")
 
     def __repr__(self):
-        return f"<Attempt user={self.user_id} content={self.content_id}>"
\ No newline at end of file
+        return f"<Attempt user={self.user_id} content={self.content_id}>"
+
+
+class CatalogState(db.Model):
+    """Single-row version counter, bumped whenever chapters change."""
+    __tablename__ = "catalog_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<CatalogState v{self.version}>"
+
+
+class ChapterStats(db.Model):
+    """Per-chapter counters; `completions` doubles as the finish-order sequence."""
+    __tablename__ = "chapter_stats"
+
+    content_id = db.Column(
+        db.Integer,
+        db.ForeignKey("contents.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    completions = db.Column(db.Integer, default=0, nullable=False)
+    starts = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+
+    def __repr__(self):
+        return f"<ChapterStats content={self.content_id} completions={self.completions}>"
+
+
+class ChapterTimeBucket(db.Model):
+    """One bucket of a chapter's solve-time sketch (see utils/chapter_rollups.py)."""
+    __tablename__ = "chapter_time_buckets"
+
+    content_id = db.Column(
+        db.Integer,
+        db.ForeignKey("contents.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ChapterTimeBucket content={self.content_id} bucket={self.bucket} count={self.count}>"
@@ -1,17 +1,50 @@
 from datetime import datetime
+import hmac
 import json
 
 from flask import (
     Blueprint,
+    Response,
+    current_app,
+    jsonify,
     redirect,
     render_template,
     request,
     session,
+    stream_with_context,
     url_for,
 )
 
 from config import config
-from models import Attempt, Content, User, db
+from models import Attempt, ChapterStats, ChapterTimeBucket, Content, User, db
+from utils.chapter_import import (
+    BundleError,
+    import_chapters,
+    parse_bundle,
+    parse_bundle_text,
+)
+from utils.chapter_config import bump_progress_version
+from utils.chapter_rollups import chapter_rollups
+from utils.content_catalog import bump_catalog_version, catalog
+from utils.db_routing import read_only
+from utils.attempt_filters import AttemptFilters, parse_attempt_filters
+from utils.attempt_pages import MAX_PAGE_SIZE, PAGE_SIZE, attempts_page
+from utils.exports import (
+    stream_attempts_csv,
+    stream_attempts_ndjson,
+    stream_leaderboard_csv,
+    stream_leaderboard_ndjson,
+)
+from utils.leaderboard import encode_cursor, leaderboard
+from utils.live_events import hub, mark_changed
+from utils.metrics import scrape
+from utils.panel_manifest import (
+    compile_manifest,
+    manifest_to_json,
+    parse_panels_input,
+)
+from utils.panel_store import store_upload
+from utils.user_scores import add_to_user_total
 
 admin_bp = Blueprint(
     "admin",
@@ -19,6 +52,8 @@ admin_bp = Blueprint(
     url_prefix="/admin"
 )
 
+LEADERBOARD_PAGE_SIZE = 50
+
 
 # ---------------- AUTH ---------------- #
 
@@ -62,45 +97,141 @@ def logout():
 # ---------------- DASHBOARD ---------------- #
 
 @admin_bp.route("/dashboard")
+@read_only
 def dashboard():
 
     if not _is_admin_authenticated():
         return redirect(url_for("admin.login"))
 
-    contents = Content.query.order_by(
-        Content.chapter_number.asc()
-    ).all()
+    contents = catalog.records()
+
+    # Leaderboard comes from the in-memory ranked index, one page at a time
+    page = max(request.args.get("page", 1, type=int), 1)
+    rows = leaderboard.page(page, LEADERBOARD_PAGE_SIZE)
+    total_players = len(leaderboard)
+
+    return render_template(
+        "admin/dashboard.html",
+        contents=contents,
+        rollups=chapter_rollups(),
+        leaderboard=rows,
+        page=page,
+        has_next=page * LEADERBOARD_PAGE_SIZE < total_players,
+        total_players=total_players,
+        live_top_n=config.LIVE_TOP_N,
+        live_streaming=config.LIVE_STREAMING,
+        live_poll_ms=int(config.LIVE_FALLBACK_POLL_SECONDS * 1000),
+    )
+
+
+# ---------------- LEADERBOARD API ---------------- #
+
+@admin_bp.route("/api/leaderboard")
+@read_only
+def api_leaderboard():
+    """Cursor-paginated leaderboard: ?limit=N&cursor=<next_cursor>."""
+
+    if not _is_admin_authenticated():
+        return jsonify({"ok": False}), 401
+
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    cursor = request.args.get("cursor")
+
+    rows = leaderboard.after(cursor, limit)
+    next_cursor = (
+        encode_cursor(rows[-1]) if len(rows) == limit else None
+    )
+
+    return jsonify({
+        "ok": True,
+        "total": len(leaderboard),
+        "rows": [row._asdict() for row in rows],
+        "next_cursor": next_cursor,
+    })
+
+
+@admin_bp.route("/api/leaderboard/rank/<int:user_id>")
+@read_only
+def api_leaderboard_rank(user_id):
+
+    if not _is_admin_authenticated():
+        return jsonify({"ok": False}), 401
 
-    # ✅ FIXED leaderboard query
-    total_score_label = db.func.coalesce(
-        db.func.sum(Attempt.score), 0
-    ).label("total_score")
+    row = leaderboard.rank_of(user_id)
+    if row is None:
+        return jsonify({"ok": False, "error": "Unknown user"}), 404
 
-    leaderboard_rows = (
-        db.session.query(
-            User.name,
-            User.email,
-            total_score_label,
+    return jsonify({"ok": True, **row._asdict()})
+
+
+# ---------------- LIVE EVENTS ---------------- #
+
+@admin_bp.route("/live")
+def live_events():
+    """Server-Sent Events: leaderboard deltas and chapter solve counts."""
+
+    if not _is_admin_authenticated():
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+    # Refused streams make the dashboard fall back to /admin/live/snapshot
+    q = None
+    if config.LIVE_STREAMING:
+        hub.ensure_publisher(current_app._get_current_object())
+        # Subscribe first so nothing published meanwhile is lost
+        q = hub.subscribe()
+    if q is None:
+        return Response(
+            "Live stream unavailable; poll /admin/live/snapshot\n",
+            status=503,
+            mimetype="text/plain",
+            headers={"Retry-After": str(int(config.LIVE_FALLBACK_POLL_SECONDS))},
         )
-        .outerjoin(Attempt, Attempt.user_id == User.id)
-        .group_by(User.id, User.name, User.email)
-        .order_by(db.desc("total_score"))
-        .all()
+
+    return Response(
+        hub.stream(q, request.headers.get("Last-Event-ID")),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
     )
 
-    leaderboard = [
-        {
-            "name": row[0],
-            "email": row[1],
-            "total_score": float(row[2] or 0),
+
+@admin_bp.route("/live/snapshot")
+def live_snapshot():
+    """The stream's snapshot event as JSON, for dashboards that poll."""
+
+    if not _is_admin_authenticated():
+        return jsonify({"ok": False}), 401
+
+    # Served from the publisher's cached state: polls cost no queries
+    state = hub.poll(current_app._get_current_object())
+    if state is None:
+        return jsonify({"ok": False}), 503, {
+            "Retry-After": str(int(config.LIVE_FALLBACK_POLL_SECONDS)),
         }
-        for row in leaderboard_rows
-    ]
+    return Response(state[2], mimetype="application/json",
+                    headers={"Cache-Control": "no-store"})
 
-    return render_template(
-        "admin/dashboard.html",
-        contents=contents,
-        leaderboard=leaderboard,
+
+# ---------------- METRICS ---------------- #
+
+def _has_metrics_token():
+    token = config.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+@admin_bp.route("/metrics")
+def metrics():
+    """Prometheus text exposition, merged across all worker processes."""
+
+    if not (_is_admin_authenticated() or _has_metrics_token()):
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+    return Response(
+        scrape(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
     )
 
 
@@ -133,38 +264,31 @@ def create_content():
         except ValueError:
             chapter_number_int = 1
 
+        panels_list = parse_panels_input(raw_panels)
+
+        # Uploaded images follow any pasted URLs, in the order selected.
+        # Only the originals are written here; variants build in the background.
+        if not error:
+            for upload in request.files.getlist("panel_files"):
+                if not upload or not upload.filename:
+                    continue
+                try:
+                    panels_list.append(store_upload(upload).url)
+                except ValueError as exc:
+                    error = str(exc)
+                    break
+
         if error:
             return render_template(
                 "admin/create_content.html",
                 error=error,
             )
 
-        # Robust parser: handles plain URL lists AND pasted raw JSON blobs
-        import re as _re
-        _URL_RE = _re.compile(r'https?://[^\s\'"\\,\]}\)]+')
-        panels_list = []
-        if raw_panels:
-            # First: try to parse as a JSON object with a "panels" key
-            try:
-                _data = json.loads(raw_panels)
-                if isinstance(_data, dict) and "panels" in _data:
-                    panels_list = [u.strip().rstrip('\\/\'" \t') for u in _data["panels"] if isinstance(u, str) and u.startswith("http")]
-                elif isinstance(_data, list):
-                    panels_list = [u.strip().rstrip('\\/\'" \t') for u in _data if isinstance(u, str) and u.startswith("http")]
-            except (json.JSONDecodeError, ValueError):
-                pass
-
-            # Second: if no URLs found yet, use regex to extract all http(s) URLs
-            if not panels_list:
-                panels_list = _URL_RE.findall(raw_panels)
-                panels_list = [u.rstrip('\\/\'" \t,') for u in panels_list]
-
-            # Filter out any empty or non-http strings
-            panels_list = [u for u in panels_list if u.startswith("http")]
-
         panels_json_string = None
+        manifest_string = None
         if panels_list:
             panels_json_string = json.dumps({"panels": panels_list})
+            manifest_string = manifest_to_json(compile_manifest(panels_list))
 
         content = Content(
             title=title,
@@ -172,16 +296,66 @@ def create_content():
             chapter_number=chapter_number_int,
             is_unlocked=True,
             panels_json=panels_json_string,
+            panel_manifest=manifest_string,
         )
 
         db.session.add(content)
+        bump_catalog_version()
         db.session.commit()
+        catalog.invalidate()
 
         return redirect(url_for("admin.dashboard"))
 
     return render_template("admin/create_content.html")
 
 
+# ---------------- BULK IMPORT ---------------- #
+
+@admin_bp.route("/import", methods=["GET", "POST"])
+def import_bundle():
+    """Create or replace many chapters from one JSON bundle (see utils/chapter_import.py)."""
+
+    if not _is_admin_authenticated():
+        if request.is_json:
+            return jsonify({"ok": False}), 401
+        return redirect(url_for("admin.login"))
+
+    if request.method == "GET":
+        return render_template("admin/import.html")
+
+    if request.is_json:
+        dry_run = request.args.get("dry_run") == "1"
+        try:
+            chapters = parse_bundle(request.get_json(silent=True))
+            changes = import_chapters(chapters, dry_run=dry_run)
+        except BundleError as exc:
+            return jsonify({"ok": False, "errors": exc.errors}), 400
+        return jsonify({
+            "ok": True,
+            "dry_run": dry_run,
+            "changes": [c._asdict() for c in changes],
+        })
+
+    dry_run = bool(request.form.get("dry_run"))
+    upload = request.files.get("bundle_file")
+    text = (
+        upload.read().decode("utf-8", "replace")
+        if upload and upload.filename
+        else request.form.get("bundle", "")
+    )
+    try:
+        changes = import_chapters(parse_bundle_text(text), dry_run=dry_run)
+    except BundleError as exc:
+        return render_template("admin/import.html", bundle=text, errors=exc.errors), 400
+
+    return render_template(
+        "admin/import.html",
+        bundle=text if dry_run else "",
+        changes=changes,
+        dry_run=dry_run,
+    )
+
+
 # ---------------- TOGGLE ---------------- #
 
 @admin_bp.route("/toggle/<int:content_id>", methods=["POST"])
@@ -193,7 +367,9 @@ def toggle_content(content_id):
     content = Content.query.get_or_404(content_id)
 
     content.is_unlocked = not content.is_unlocked
+    bump_catalog_version()
     db.session.commit()
+    catalog.invalidate()
 
     return redirect(url_for("admin.dashboard"))
 
@@ -207,12 +383,30 @@ def delete_content(content_id):
 
     content = Content.query.get_or_404(content_id)
 
+    # Take the deleted attempts' points back out of the users' totals, and
+    # bump their progress versions so cached masks and totals are dropped
+    per_user = (
+        db.session.query(Attempt.user_id, db.func.sum(Attempt.score))
+        .filter(Attempt.content_id == content_id)
+        .group_by(Attempt.user_id)
+        .all()
+    )
+    for user_id, points in per_user:
+        if points:
+            add_to_user_total(user_id, -points)
+        bump_progress_version(user_id)
+
     # First delete any attempts on this content so foreign key constraints don't break
     Attempt.query.filter_by(content_id=content_id).delete()
+    ChapterStats.query.filter_by(content_id=content_id).delete()
+    ChapterTimeBucket.query.filter_by(content_id=content_id).delete()
     
     # Then delete the content itself
     db.session.delete(content)
+    bump_catalog_version()
     db.session.commit()
+    catalog.invalidate()
+    mark_changed()
 
     return redirect(url_for("admin.dashboard"))
 
@@ -221,25 +415,100 @@ def delete_content(content_id):
 # ---------------- ATTEMPTS ---------------- #
 
 @admin_bp.route("/attempts")
+@read_only
 def attempts():
 
     if not _is_admin_authenticated():
         return redirect(url_for("admin.login"))
 
-    attempts = (
-        db.session.query(
-            Attempt,
-            User,
-            Content,
-        )
-        .join(User, Attempt.user_id == User.id)
-        .join(Content, Attempt.content_id == Content.id)
-        .order_by(Attempt.start_time.desc())
-        .limit(500)
-        .all()
+    try:
+        filters = parse_attempt_filters(request.args)
+        error = None
+    except ValueError:
+        filters, error = AttemptFilters(), "Invalid filter; showing all attempts."
+
+    limit = min(max(request.args.get("limit", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    page = attempts_page(
+        filters,
+        older=request.args.get("older"),
+        newer=request.args.get("newer"),
+        limit=limit,
     )
 
+    # Filter args carried over into the paging and export links
+    filter_args = {
+        k: v for k, v in request.args.items()
+        if k not in ("older", "newer") and v
+    }
+
     return render_template(
         "admin/attempts.html",
-        attempts=attempts,
-    )
\ No newline at end of file
+        attempts=page.rows,
+        older=page.older,
+        newer=page.newer,
+        filters=filters,
+        filter_args=filter_args,
+        chapters=sorted({r.chapter_number for r in catalog.records()}),
+        error=error,
+    )
+
+
+# ---------------- EXPORTS ---------------- #
+
+EXPORT_FORMATS = {
+    "csv": (stream_attempts_csv, "text/csv; charset=utf-8"),
+    "ndjson": (stream_attempts_ndjson, "application/x-ndjson"),
+}
+
+
+@admin_bp.route("/attempts/export.<fmt>")
+@read_only
+def export_attempts(fmt):
+    """Every attempt matching the attempts view's filters, streamed."""
+
+    if not _is_admin_authenticated():
+        return redirect(url_for("admin.login"))
+
+    if fmt not in EXPORT_FORMATS:
+        return Response("Unknown export format\n", status=404, mimetype="text/plain")
+
+    try:
+        filters = parse_attempt_filters(request.args)
+    except ValueError:
+        return Response("Invalid chapter or date filter\n", status=400, mimetype="text/plain")
+
+    stream, content_type = EXPORT_FORMATS[fmt]
+    return _export_response(stream(filters), content_type, "attempts", fmt)
+
+
+LEADERBOARD_EXPORT_FORMATS = {
+    "csv": (stream_leaderboard_csv, "text/csv; charset=utf-8"),
+    "ndjson": (stream_leaderboard_ndjson, "application/x-ndjson"),
+}
+
+
+@admin_bp.route("/leaderboard/export.<fmt>")
+@read_only
+def export_leaderboard(fmt):
+    """Every player's total score in leaderboard order, streamed."""
+
+    if not _is_admin_authenticated():
+        return redirect(url_for("admin.login"))
+
+    if fmt not in LEADERBOARD_EXPORT_FORMATS:
+        return Response("Unknown export format\n", status=404, mimetype="text/plain")
+
+    stream, content_type = LEADERBOARD_EXPORT_FORMATS[fmt]
+    return _export_response(stream(), content_type, "leaderboard", fmt)
+
+
+def _export_response(chunks, content_type: str, name: str, fmt: str) -> Response:
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        content_type=content_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
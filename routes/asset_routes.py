@@ -0,0 +1,36 @@
+import mimetypes
+import os
+
+from flask import Blueprint, abort, request, send_file
+from werkzeug.security import safe_join
+
+from utils.assets import dist_folder, load_manifest, pick_encoding
+
+assets_bp = Blueprint("assets", __name__, url_prefix="/assets")
+
+# Hashed filenames never change content, so clients may keep them forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# ---------------- FINGERPRINTED ASSETS ---------------- #
+
+@assets_bp.route("/<path:filename>")
+def serve(filename):
+    """Serve a built asset, picking a precompressed variant when accepted."""
+
+    if filename not in set(load_manifest().values()):
+        abort(404)
+
+    path = safe_join(dist_folder(), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    chosen, encoding = pick_encoding(path, request.accept_encodings)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    response = send_file(chosen, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
@@ -0,0 +1,88 @@
+import mimetypes
+import os
+
+from flask import Blueprint, Response, abort, request
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+from config import config
+from utils.media import FileHandlePool, RangeFile, resolve_range
+from utils.panel_store import is_stored_panel, original_for
+
+media_bp = Blueprint("media", __name__, url_prefix="/media")
+
+handle_pool = FileHandlePool(max_idle=config.MEDIA_FD_CACHE_SIZE)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# ---------------- SELF-HOSTED MEDIA ---------------- #
+
+@media_bp.route("/<path:filename>")
+def serve(filename):
+    """Stream a media file with byte-range, If-Range and sendfile support."""
+
+    path = safe_join(config.MEDIA_ROOT, filename)
+    if path is None:
+        abort(404)
+
+    # Uploaded panels are content-addressed and never change once written
+    cache_control = (
+        IMMUTABLE if is_stored_panel(filename)
+        else f"public, max-age={config.MEDIA_MAX_AGE}"
+    )
+
+    if not os.path.isfile(path):
+        # A panel variant that is still being built: send the original,
+        # uncached, so the browser picks up the variant on a later visit
+        original = original_for(filename)
+        if original is None:
+            abort(404)
+        filename = original
+        path = safe_join(config.MEDIA_ROOT, original)
+        cache_control = "no-cache"
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+    handle = handle_pool.acquire(path)
+    try:
+        span, unsatisfiable = resolve_range(request.range, request.if_range, handle)
+
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Cache-Control": cache_control,
+        }
+
+        if unsatisfiable:
+            handle_pool.release(handle)
+            headers["Content-Range"] = f"bytes */{handle.size}"
+            return Response(status=416, headers=headers)
+
+        if span is None:
+            start, stop, status = 0, handle.size, 200
+        else:
+            (start, stop), status = span, 206
+            headers["Content-Range"] = f"bytes {start}-{stop - 1}/{handle.size}"
+
+        if status == 200 and request.if_none_match.contains(handle.etag):
+            handle_pool.release(handle)
+            response = Response(status=304, headers=headers)
+            response.set_etag(handle.etag)
+            return response
+
+        body = RangeFile(handle_pool, handle, start, stop - start)
+    except Exception:
+        handle_pool.release(handle)
+        raise
+
+    response = Response(
+        wrap_file(request.environ, body),
+        status=status,
+        headers=headers,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    response.content_length = stop - start
+    response.set_etag(handle.etag)
+    response.last_modified = handle.mtime
+    return response
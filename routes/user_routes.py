@@ -1,9 +1,12 @@
-import json
+import os
 from datetime import datetime
 
 from flask import (
     Blueprint,
+    abort,
+    current_app,
     jsonify,
+    make_response,
     redirect,
     render_template,
     request,
@@ -11,15 +14,39 @@ from flask import (
     url_for,
 )
 
-from models import Attempt, Content, User, db
+from models import Attempt, User, db
+from utils.assets import manifest_revision
+from utils.attempts import get_or_start_attempt
 from utils.chapter_config import (
-    get_visible_contents_for_user,
-    can_access_content,
+    ChapterCard,
+    UserProgress,
+    bump_progress_version,
+    read_progress_version,
+    unlock_epoch,
 )
+from utils.chapter_rollups import record_solve_time
+from utils.content_catalog import catalog
+from utils.db_routing import read_only
+from utils.leaderboard import leaderboard
+from utils.live_events import mark_changed
+from utils.metrics import registry as metrics
+from utils.page_cache import (
+    content_fragments,
+    fill_nav_slot,
+    make_etag,
+    nav_slot,
+    template_revision,
+)
+from utils.placements import GAME_CHAPTERS, next_completion_place, placement_bonus
+from utils.user_scores import add_to_user_total, cached_total, remember_total
 from utils.score_calculator import calculate_score
 
 user_bp = Blueprint("user", __name__)
 
+# Templates whose markup feeds the page ETags
+CONTENT_PAGE_TEMPLATES = ("content.html", "base.html", "_user_nav.html")
+CHAPTERS_PAGE_TEMPLATES = ("index.html", "base.html", "_user_nav.html")
+
 
 # ---------------- INDEX ---------------- #
 
@@ -32,20 +59,46 @@ def home():
 # ---------------- CHAPTERS (was INDEX) ---------------- #
 
 @user_bp.route("/chapters")
+@read_only
 def index():
 
     user_id = session.get("user_id")
     if not user_id:
         return redirect(url_for("user.register"))
 
-    from types import SimpleNamespace
-    from models import HIDDEN_CHAPTERS, CHAPTER_REVEAL_TRIGGER
+    from models import HIDDEN_CHAPTERS
+
+    # Players reload this page while waiting for unlocks: answer unchanged
+    # reloads with a 304 after one primary-key read
+    is_admin = bool(session.get("is_admin"))
+    etag = None
+    progress_version = None
+    if not is_admin:
+        progress_version = read_progress_version(user_id)
+        etag = make_etag(
+            "chapters",
+            user_id,
+            progress_version,
+            catalog.version,
+            unlock_epoch(catalog.records()),
+            session.get("user_name"),
+            cached_total(session, user_id, progress_version),
+            template_revision(
+                os.path.join(current_app.root_path, current_app.template_folder),
+                CHAPTERS_PAGE_TEMPLATES,
+            ),
+            manifest_revision(),
+        )
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
 
-    real_contents, chapters_revealed = (
-        get_visible_contents_for_user(user_id)
-    )
+    progress = UserProgress.for_session(session, user_id, progress_version)
+    real_contents = progress.visible_contents()
+    chapters_revealed = progress.revealed
 
-    # Build a lookup: chapter_number -> real Content object
+    # Build a lookup: chapter_number -> real chapter card
     real_by_num = {c.chapter_number: c for c in real_contents}
 
     # Slots 1-6: always displayed (real or placeholder)
@@ -55,13 +108,12 @@ def index():
             contents.append(real_by_num[num])
         else:
             # Locked placeholder — no DB row yet
-            contents.append(SimpleNamespace(
+            contents.append(ChapterCard(
                 id=None,
                 chapter_number=num,
                 title="Classified",
                 accessible=False,
                 is_placeholder=True,
-                chapter_number_for_template=num,
             ))
 
     # Slots 7-8: only shown after chapter 6 is completed
@@ -70,7 +122,7 @@ def index():
             if num in real_by_num:
                 contents.append(real_by_num[num])
             else:
-                contents.append(SimpleNamespace(
+                contents.append(ChapterCard(
                     id=None,
                     chapter_number=num,
                     title="Classified",
@@ -79,41 +131,22 @@ def index():
                 ))
 
     # Only admins see the leaderboard
-    if session.get("is_admin"):
-        leaderboard_rows = (
-            db.session.query(
-                User.id,
-                User.name,
-                User.email,
-                db.func.coalesce(
-                    db.func.sum(Attempt.score), 0
-                ).label("total_score"),
-            )
-            .outerjoin(Attempt)
-            .group_by(User.id, User.name, User.email)
-            .order_by(db.desc("total_score"))
-            .limit(100)
-            .all()
-        )
-        leaderboard = [
-            {
-                "user_id": r[0],
-                "name": r[1],
-                "email": r[2],
-                "total_score": float(r[3] or 0),
-            }
-            for r in leaderboard_rows
-        ]
+    if is_admin:
+        leaderboard_rows = leaderboard.top(100)
     else:
-        leaderboard = []
+        leaderboard_rows = []
 
-    return render_template(
+    response = make_response(render_template(
         "index.html",
         contents=contents,
-        leaderboard=leaderboard,
+        leaderboard=leaderboard_rows,
         chapters_revealed=chapters_revealed,
-        is_admin=bool(session.get("is_admin")),
-    )
+        is_admin=is_admin,
+    ))
+    if etag:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 # ---------------- LOGIN & LOGOUT ---------------- #
@@ -138,6 +171,7 @@ def login():
         session["user_id"] = user.id
         session["user_name"] = user.name
         session["user_email"] = user.email
+        remember_total(session, user.id, user.total_score or 0, user.progress_version)
 
         return redirect(url_for("user.index"))
 
@@ -185,6 +219,7 @@ def register():
         session["user_id"] = user.id
         session["user_name"] = user.name
         session["user_email"] = user.email
+        remember_total(session, user.id, 0, user.progress_version)
 
         return redirect(url_for("user.index"))
 
@@ -201,27 +236,24 @@ def start_challenge(content_id):
 
     user_id = session["user_id"]
 
-    content = Content.query.get_or_404(content_id)
+    progress = UserProgress.for_session(session, user_id)
+    content = progress.content(content_id)
+    if content is None:
+        abort(404)
 
-    if not can_access_content(user_id, content_id):
+    if not progress.can_enter(content):
         return jsonify({"ok": False, "error": "Locked"}), 403
 
-    existing = Attempt.query.filter_by(
-        user_id=user_id,
-        content_id=content_id,
-    ).first()
-
-    if existing:
+    if progress.has_started(content_id):
         return jsonify({"ok": False, "error": "Exists"}), 403
 
-    attempt = Attempt(
-        user_id=user_id,
-        content_id=content_id,
-        start_time=datetime.utcnow(),
-    )
-
-    db.session.add(attempt)
+    attempt = get_or_start_attempt(user_id, content_id)
     db.session.commit()
+    progress.remember(content, attempt.progress_version)
+
+    # Lost a race with another request from the same player (double-click)
+    if not attempt.created:
+        return jsonify({"ok": False, "error": "Exists"}), 403
 
     return jsonify(
         {
@@ -235,6 +267,7 @@ def start_challenge(content_id):
 # ---------------- CONTENT PAGE ---------------- #
 
 @user_bp.route("/content/<int:content_id>")
+@read_only
 def content_page(content_id):
 
     is_preview = request.args.get("preview") == "1"
@@ -242,7 +275,9 @@ def content_page(content_id):
 
     if is_preview and is_admin:
         # Admin Preview Bypass
-        content = Content.query.get_or_404(content_id)
+        content = catalog.get(content_id)
+        if content is None:
+            abort(404)
         attempted = False
     else:
         # Normal User Flow
@@ -250,73 +285,67 @@ def content_page(content_id):
             return redirect(url_for("user.register"))
 
         user_id = session["user_id"]
-        content = Content.query.get_or_404(content_id)
+        progress = UserProgress.for_session(session, user_id)
+        content = progress.content(content_id)
+        if content is None:
+            abort(404)
 
-        if not can_access_content(user_id, content_id):
+        if not progress.can_enter(content):
             return "Locked", 403
 
-        existing = Attempt.query.filter_by(
-            user_id=user_id,
-            content_id=content_id,
-        ).first()
-
-        attempted = existing is not None
-
-    panels = []
-
-    if content.panels_json:
-        try:
-            data = json.loads(content.panels_json)
-            panels = data.get("panels", [])
-        except Exception:
-            panels = []
-
-    # ── Video detection ──────────────────────────────────────────────────────
-    # If the chapter has exactly one "panel" that is a video URL, switch to
-    # video-player mode instead of the image carousel.
-    VIDEO_EXTS   = (".mp4", ".webm", ".ogg", ".mov")
-    VIDEO_HOSTS  = ("youtube.com/watch", "youtu.be/", "vimeo.com/")
-    # Note: CDN/cloud hosts (cloudinary, S3, etc.) are NOT listed here –
-    # those can serve images too. Extension check handles direct video files.
-
-    is_video   = False
-    video_url  = None
-    video_type = None   # "youtube" | "vimeo" | "direct"
-
-    if len(panels) == 1:
-        raw = panels[0].strip()
-        if any(raw.lower().endswith(ext) for ext in VIDEO_EXTS) or \
-           any(vh in raw for vh in VIDEO_HOSTS):
-            is_video = True
-            # Convert YouTube watch → embed
-            if "youtube.com/watch" in raw:
-                import re as _re
-                m = _re.search(r"[?&]v=([^&]+)", raw)
-                vid = m.group(1) if m else ""
-                video_url  = f"https://www.youtube.com/embed/{vid}?enablejsapi=1&rel=0"
-                video_type = "youtube"
-            elif "youtu.be/" in raw:
-                vid = raw.split("youtu.be/")[-1].split("?")[0]
-                video_url  = f"https://www.youtube.com/embed/{vid}?enablejsapi=1&rel=0"
-                video_type = "youtube"
-            elif "vimeo.com/" in raw:
-                vid = raw.rstrip("/").split("/")[-1]
-                video_url  = f"https://player.vimeo.com/video/{vid}?api=1"
-                video_type = "vimeo"
-            else:
-                video_url  = raw
-                video_type = "direct"
-
-    return render_template(
-        "content.html",
-        content=content,
-        attempted=attempted,
-        panels=panels,
-        is_preview=(is_preview and is_admin),
-        is_video=is_video,
-        video_url=video_url,
-        video_type=video_type,
+        attempted = progress.has_started(content_id)
+
+    # Panels, media kinds and embed URLs were compiled at write time
+    manifest = content.manifest
+    preview = bool(is_preview and is_admin)
+
+    # The page body depends only on the content revision; the nav bar is
+    # the only per-player markup. Revalidate against both before rendering.
+    page_rev = template_revision(
+        os.path.join(current_app.root_path, current_app.template_folder),
+        CONTENT_PAGE_TEMPLATES,
+    )
+    revision = (
+        content.id,
+        manifest.hash,
+        content.title,
+        content.chapter_number,
+        preview,
+        page_rev,
+        manifest_revision(),
+    )
+    etag = make_etag(
+        *revision,
+        session.get("user_id"),
+        session.get("user_name"),
+        cached_total(session, session.get("user_id")),
+        attempted,
+    )
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+
+    fragment = content_fragments.get_or_render(
+        revision,
+        lambda: render_template(
+            "content.html",
+            content=content,
+            panels=manifest.urls,
+            panel_refs=manifest.panels,
+            is_preview=preview,
+            is_video=manifest.is_video,
+            video_url=manifest.video_url,
+            video_type=manifest.video_type,
+            user_nav_slot=nav_slot(),
+        ),
     )
+    html = fill_nav_slot(fragment, render_template("_user_nav.html"))
+
+    response = make_response(html)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 # ---------------- PUZZLE ---------------- #
@@ -328,23 +357,19 @@ def puzzle(content_id):
         return redirect(url_for("user.register"))
 
     user_id = session["user_id"]
-    content = Content.query.get_or_404(content_id)
+    progress = UserProgress.for_session(session, user_id)
+    content = progress.content(content_id)
+    if content is None:
+        abort(404)
 
-    if not can_access_content(user_id, content_id):
+    if not progress.can_enter(content):
         return "Locked", 403
 
     # Ensure an Attempt row exists so /submit can finalise it
-    existing = Attempt.query.filter_by(
-        user_id=user_id, content_id=content_id
-    ).first()
-    if not existing:
-        attempt = Attempt(
-            user_id=user_id,
-            content_id=content_id,
-            start_time=datetime.utcnow(),
-        )
-        db.session.add(attempt)
+    if not progress.has_started(content_id):
+        attempt = get_or_start_attempt(user_id, content_id)
         db.session.commit()
+        progress.remember(content, attempt.progress_version)
 
     return render_template("puzzle.html", content=content)
 
@@ -356,22 +381,19 @@ def callgame(content_id):
         return redirect(url_for("user.register"))
 
     user_id = session["user_id"]
-    content = Content.query.get_or_404(content_id)
+    progress = UserProgress.for_session(session, user_id)
+    content = progress.content(content_id)
+    if content is None:
+        abort(404)
 
-    if not can_access_content(user_id, content_id):
+    if not progress.can_enter(content):
         return "Locked", 403
 
-    existing = Attempt.query.filter_by(
-        user_id=user_id, content_id=content_id
-    ).first()
-    if not existing:
-        attempt = Attempt(
-            user_id=user_id,
-            content_id=content_id,
-            start_time=datetime.utcnow(),
-        )
-        db.session.add(attempt)
+    # Ensure an Attempt row exists so /submit can finalise it
+    if not progress.has_started(content_id):
+        attempt = get_or_start_attempt(user_id, content_id)
         db.session.commit()
+        progress.remember(content, attempt.progress_version)
 
     return render_template("callgame.html", content=content)
 
@@ -383,22 +405,19 @@ def codegate(content_id):
         return redirect(url_for("user.register"))
 
     user_id = session["user_id"]
-    content = Content.query.get_or_404(content_id)
+    progress = UserProgress.for_session(session, user_id)
+    content = progress.content(content_id)
+    if content is None:
+        abort(404)
 
-    if not can_access_content(user_id, content_id):
+    if not progress.can_enter(content):
         return "Locked", 403
 
-    existing = Attempt.query.filter_by(
-        user_id=user_id, content_id=content_id
-    ).first()
-    if not existing:
-        attempt = Attempt(
-            user_id=user_id,
-            content_id=content_id,
-            start_time=datetime.utcnow(),
-        )
-        db.session.add(attempt)
+    # Ensure an Attempt row exists so /submit can finalise it
+    if not progress.has_started(content_id):
+        attempt = get_or_start_attempt(user_id, content_id)
         db.session.commit()
+        progress.remember(content, attempt.progress_version)
 
     return render_template("codegate.html", content=content)
 
@@ -410,23 +429,19 @@ def quiz(content_id):
         return redirect(url_for("user.register"))
 
     user_id = session["user_id"]
-    content = Content.query.get_or_404(content_id)
+    progress = UserProgress.for_session(session, user_id)
+    content = progress.content(content_id)
+    if content is None:
+        abort(404)
 
-    if not can_access_content(user_id, content_id):
+    if not progress.can_enter(content):
         return "Locked", 403
 
     # Ensure an Attempt row exists so /submit can finalise it
-    existing = Attempt.query.filter_by(
-        user_id=user_id, content_id=content_id
-    ).first()
-    if not existing:
-        attempt = Attempt(
-            user_id=user_id,
-            content_id=content_id,
-            start_time=datetime.utcnow(),
-        )
-        db.session.add(attempt)
+    if not progress.has_started(content_id):
+        attempt = get_or_start_attempt(user_id, content_id)
         db.session.commit()
+        progress.remember(content, attempt.progress_version)
 
     return render_template("quiz.html", content=content)
 
@@ -453,9 +468,13 @@ def submit_result(content_id):
 
     user_id = session["user_id"]
 
-    content = Content.query.get_or_404(content_id)
+    progress = UserProgress.for_session(session, user_id)
+    content = progress.content(content_id)
+    if content is None:
+        abort(404)
 
-    if not can_access_content(user_id, content_id):
+    if not progress.can_enter(content):
+        metrics.inc("submit_outcomes_total", outcome="locked")
         return jsonify({"ok": False, "error": "Locked"}), 403
 
     attempt = Attempt.query.filter_by(
@@ -464,9 +483,11 @@ def submit_result(content_id):
     ).first()
 
     if not attempt:
+        metrics.inc("submit_outcomes_total", outcome="not_started")
         return jsonify({"ok": False}), 400
 
     if attempt.completed:
+        metrics.inc("submit_outcomes_total", outcome="already_completed")
         return jsonify({"ok": False}), 400
 
     data = request.get_json() or {}
@@ -475,6 +496,23 @@ def submit_result(content_id):
     end_time = datetime.utcnow()
     time_taken = int((end_time - attempt.start_time).total_seconds())
 
+    # Claim the attempt atomically: of two racing submits only one may
+    # finalise it, so points and placements are never handed out twice.
+    claimed = (
+        Attempt.query
+        .filter(
+            Attempt.id == attempt.id,
+            Attempt.completed == False,   # noqa: E712
+        )
+        .update({Attempt.completed: completed}, synchronize_session=False)
+    )
+    if not claimed:
+        db.session.rollback()
+        metrics.inc("submit_outcomes_total", outcome="lost_race")
+        return jsonify({"ok": False}), 400
+
+    previous_score = attempt.score or 0
+
     attempt.end_time  = end_time
     attempt.time_taken = time_taken
     attempt.completed  = completed
@@ -484,36 +522,35 @@ def submit_result(content_id):
     # GAME chapters only (puzzle / quiz / callgame / codegate):
     #   also award a placement bonus based on who solved it first:
     #     1st → +500 | 2nd → +300 | 3rd → +150 | 4th-28th → +100 | 29th+ → +50
-    GAME_CHAPTERS = {3, 4, 5, 7}   # chapters with an interactive puzzle/game
-
     chapter_points = 100 if completed else 0   # flat base for everyone
     bonus_points   = 0
+    placement      = None
 
-    if completed and content.chapter_number in GAME_CHAPTERS:
-        # Count how many OTHER users already completed this chapter
-        prior_completions = (
-            Attempt.query
-            .filter(
-                Attempt.content_id == content_id,
-                Attempt.completed == True,   # noqa: E712
-                Attempt.user_id != user_id,
-            )
-            .count()
-        )
+    if completed:
+        # O(1) finish-order ticket from the chapter's completion counter
+        placement = next_completion_place(content_id, attempt.id)
+        record_solve_time(content_id, time_taken)
 
-        if prior_completions == 0:
-            bonus_points = 500    # 1st to solve
-        elif prior_completions == 1:
-            bonus_points = 300    # 2nd to solve
-        elif prior_completions == 2:
-            bonus_points = 150    # 3rd to solve
-        elif prior_completions <= 27:
-            bonus_points = 100    # 4th – 28th (next 25 people)
-        else:
-            bonus_points = 50     # 29th and beyond
+        if content.chapter_number in GAME_CHAPTERS:
+            bonus_points = placement_bonus(placement)
 
     attempt.score = chapter_points + bonus_points
+    new_total = add_to_user_total(user_id, attempt.score - previous_score)
+    progress_version = bump_progress_version(user_id)
     db.session.commit()
+    mark_changed()
+    progress.remember(content, progress_version, completed=completed)
+    metrics.inc(
+        "submit_outcomes_total",
+        outcome="completed" if completed else "not_completed",
+    )
+    remember_total(session, user_id, new_total, progress_version)
+    leaderboard.record(
+        user_id,
+        session.get("user_name"),
+        session.get("user_email"),
+        new_total,
+    )
 
     revealed = (completed and content.chapter_number == 6)
 
@@ -523,4 +560,5 @@ def submit_result(content_id):
         "bonus_points":   bonus_points,
         "total_points":   chapter_points + bonus_points,
         "revealed":       revealed,
+        "placement":      placement,
     })
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Compare the /media endpoint with Flask's plain static (send_from_directory)
+path for a seeking video player: a mix of random byte-range requests and
+full downloads of the same file.
+
+    python scripts/bench_media.py                      # in-process test client
+    python scripts/bench_media.py --base-url http://127.0.0.1:8000
+
+In-process numbers measure the Python side only. Run against gunicorn
+(with MEDIA_ROOT pointing at the file's directory) to include sendfile.
+"""
+
+import argparse
+import http.client
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_FILE = os.path.join(ROOT, "static", "bg_video.mp4")
+
+
+def _ranges(size: int, count: int, chunk: int, seed: int):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        start = rnd.randrange(0, max(size - chunk, 1))
+        yield f"bytes={start}-{start + chunk - 1}"
+
+
+def _summarise(label: str, timings, total_bytes: int) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    elapsed = sum(timings)
+    print(
+        f"{label:<28} n={len(timings):<5} "
+        f"p50={statistics.median(timings) * 1000:7.2f}ms "
+        f"p95={p95 * 1000:7.2f}ms "
+        f"MB/s={total_bytes / elapsed / 1e6 if elapsed else 0:8.1f}"
+    )
+
+
+def _run_in_process(opts, filename: str, size: int) -> None:
+    media_root = tempfile.mkdtemp()
+    shutil.copy(opts.file, os.path.join(media_root, filename))
+    os.environ["MEDIA_ROOT"] = media_root
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+    from app import create_app
+
+    app = create_app()
+    app.static_folder = media_root
+    client = app.test_client()
+
+    for label, url in (("plain static (send_file)", f"/static/{filename}"),
+                       ("/media (range + fd cache)", f"/media/{filename}")):
+        timings, total = [], 0
+        for rng in _ranges(size, opts.requests, opts.chunk, opts.seed):
+            t0 = time.perf_counter()
+            r = client.get(url, headers={"Range": rng})
+            body = r.get_data()
+            r.close()
+            timings.append(time.perf_counter() - t0)
+            total += len(body)
+            assert r.status_code == 206, (url, r.status_code)
+        _summarise(f"{label} ranges", timings, total)
+
+        timings, total = [], 0
+        for _ in range(opts.full):
+            t0 = time.perf_counter()
+            r = client.get(url)
+            body = r.get_data()
+            r.close()
+            timings.append(time.perf_counter() - t0)
+            total += len(body)
+        _summarise(f"{label} full", timings, total)
+
+    shutil.rmtree(media_root, ignore_errors=True)
+
+
+def _run_live(opts, filename: str, size: int) -> None:
+    base = urlsplit(opts.base_url)
+
+    def fetch(path, rng=None):
+        conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=30)
+        conn.request("GET", path, headers={"Range": rng} if rng else {})
+        resp = conn.getresponse()
+        body = resp.read()
+        conn.close()
+        return resp.status, len(body)
+
+    for label, path in (("plain static (send_file)", f"/static/{filename}"),
+                        ("/media (range + sendfile)", f"/media/{filename}")):
+        timings, total = [], 0
+        for rng in _ranges(size, opts.requests, opts.chunk, opts.seed):
+            t0 = time.perf_counter()
+            status, n = fetch(path, rng)
+            timings.append(time.perf_counter() - t0)
+            total += n
+            if status != 206:
+                print(f"{path}: expected 206, got {status}")
+                return
+        _summarise(f"{label} ranges", timings, total)
+
+        timings, total = [], 0
+        for _ in range(opts.full):
+            t0 = time.perf_counter()
+            _, n = fetch(path)
+            timings.append(time.perf_counter() - t0)
+            total += n
+        _summarise(f"{label} full", timings, total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--requests", type=int, default=300, help="range requests per path")
+    parser.add_argument("--full", type=int, default=10, help="full downloads per path")
+    parser.add_argument("--chunk", type=int, default=256 * 1024, help="bytes per range")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--base-url", help="benchmark a running server instead")
+    opts = parser.parse_args()
+
+    filename = os.path.basename(opts.file)
+    size = os.path.getsize(opts.file)
+    print(f"{filename}: {size / 1e6:.1f} MB, {opts.chunk // 1024} KiB ranges")
+
+    if opts.base_url:
+        _run_live(opts, filename, size)
+    else:
+        _run_in_process(opts, filename, size)
+
+
+if __name__ == "__main__":
+    main()
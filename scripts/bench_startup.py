@@ -0,0 +1,153 @@
+"""
+Startup benchmark: how long a fresh worker takes from `import app` to its
+first response, for each SCHEMA_MODE.
+
+Builds a throwaway SQLite database with `flask db upgrade`, then for each
+mode starts N fresh interpreters that import the app and answer GET / on
+the test client, and reports the median import, first-response and
+process wall times.
+
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --runs 10 --gunicorn
+
+`--gunicorn` also launches `gunicorn -c gunicorn.conf.py app:app` with and
+without `preload_app` and times launch to the first 200 on a real socket.
+Set DATABASE_URL to benchmark against another (already upgraded) database.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("create_all", "alembic")
+
+# Runs in the child interpreter; prints one JSON line of timings
+_CHILD = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+status = app.app.test_client().get("/").status_code
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first_response": t2 - t0, "status": status}))
+"""
+
+
+def _env(database_url: str, **extra) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url, FLASK_APP="app", REQUEST_LOG="0")
+    env.pop("FLASK_RUN_FROM_CLI", None)
+    env.update(extra)
+    return env
+
+
+def _upgrade(database_url: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "flask", "db", "upgrade"],
+        cwd=ROOT, env=_env(database_url, SCHEMA_MODE="alembic"),
+        check=True, capture_output=True,
+    )
+
+
+def _median_ms(values) -> str:
+    return f"{statistics.median(values) * 1000:7.1f}ms"
+
+
+def _bench_in_process(database_url: str, runs: int) -> None:
+    for mode in MODES:
+        imports, firsts, walls = [], [], []
+        for _ in range(runs):
+            started = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, "-c", _CHILD],
+                cwd=ROOT, env=_env(database_url, SCHEMA_MODE=mode),
+                check=True, capture_output=True, text=True,
+            )
+            walls.append(time.perf_counter() - started)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            if result["status"] != 200:
+                raise SystemExit(f"{mode}: GET / returned {result['status']}")
+            imports.append(result["import"])
+            firsts.append(result["first_response"])
+        print(
+            f"{mode:<12} n={runs:<3} import={_median_ms(imports)} "
+            f"first response={_median_ms(firsts)} process={_median_ms(walls)}"
+        )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _time_gunicorn(database_url: str, preload: bool, workers: int) -> float:
+    port = _free_port()
+    env = _env(
+        database_url, SCHEMA_MODE="alembic",
+        GUNICORN_PRELOAD="1" if preload else "0", WEB_CONCURRENCY=str(workers),
+    )
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + 30
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise SystemExit("gunicorn did not answer within 30s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _bench_gunicorn(database_url: str, runs: int, workers: int) -> None:
+    if shutil.which("gunicorn") is None:
+        print("gunicorn not installed; skipping")
+        return
+    for preload in (False, True):
+        timings = [_time_gunicorn(database_url, preload, workers) for _ in range(runs)]
+        label = f"gunicorn preload={'on' if preload else 'off'}"
+        print(f"{label:<22} workers={workers} launch to first 200={_median_ms(timings)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--gunicorn", action="store_true")
+    parser.add_argument("--workers", type=int, default=2)
+    opts = parser.parse_args()
+
+    tmp = None
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        tmp = tempfile.mkdtemp()
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _upgrade(database_url)
+
+    try:
+        _bench_in_process(database_url, opts.runs)
+        if opts.gunicorn:
+            _bench_gunicorn(database_url, opts.runs, opts.workers)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
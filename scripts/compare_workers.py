@@ -0,0 +1,188 @@
+"""
+Compare gunicorn worker classes under the player load harness.
+
+For each worker class, starts `gunicorn -c gunicorn.conf.py app:app` with
+the same number of worker processes, drives it with
+`scripts/load_harness.py --target` (default 500 players, all at once),
+then prints a side-by-side summary. Each class's full report is saved as
+`<class>.json` in `--output-dir`, compared against the first class.
+
+    python scripts/compare_workers.py
+    DATABASE_URL=postgresql://... python scripts/compare_workers.py --db-latency-ms 5
+
+Green workers only pay off while requests wait on the database, so run it
+against Postgres (the deployment target) and use `--db-latency-ms` to add
+a simulated network round trip before every statement when the database
+is local. SQLite takes its write lock inside C code, outside gevent's
+control, so gevent numbers on SQLite mostly measure lock waits.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# gunicorn config that adds --db-latency-ms to every statement; time.sleep
+# is patched under gevent, so the wait yields like a real socket read
+_LATENCY_CONF = """
+import runpy, time
+
+globals().update(
+    (k, v) for k, v in runpy.run_path({conf!r}).items() if not k.startswith("__")
+)
+_post_fork = post_fork
+
+
+def post_fork(server, worker):
+    _post_fork(server, worker)
+    from sqlalchemy import event
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *a, **k: time.sleep({latency}))
+"""
+
+
+def _env(database_url: str, worker_class: str, workers: int, threads: int) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        FLASK_APP="app",
+        SCHEMA_MODE="alembic",
+        REQUEST_LOG="0",
+        SERVER_TIMING="1",
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_THREADS=str(1 if worker_class == "sync" else threads),
+        GUNICORN_PRELOAD="1",
+        WEB_CONCURRENCY=str(workers),
+    )
+    env.pop("FLASK_RUN_FROM_CLI", None)
+    return env
+
+
+def _fresh_database(tmp: str, name: str) -> str:
+    url = f"sqlite:///{os.path.join(tmp, name + '.db')}"
+    _upgrade(url)
+    return url
+
+
+def _upgrade(database_url: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "flask", "db", "upgrade"],
+        cwd=ROOT, env=_env(database_url, "gthread", 1, 1),
+        check=True, capture_output=True,
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(base_url: str, proc: subprocess.Popen) -> None:
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"gunicorn exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("gunicorn did not answer within 30s")
+
+
+def _run_class(opts, worker_class: str, database_url: str, conf: str, baseline) -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = _env(database_url, worker_class, opts.workers, opts.threads)
+    server = subprocess.Popen(
+        ["gunicorn", "-c", conf, "-b", f"127.0.0.1:{port}", "--backlog", "4096", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    output = os.path.join(opts.output_dir, f"{worker_class}.json")
+    try:
+        _wait_until_up(base_url, server)
+        cmd = [
+            sys.executable, os.path.join(ROOT, "scripts", "load_harness.py"),
+            "--target", base_url,
+            "--players", str(opts.players),
+            "--concurrency", str(opts.concurrency),
+            "--output", output,
+        ]
+        if baseline:
+            cmd += ["--baseline", baseline]
+        print(f"== {worker_class} ({opts.workers} workers) ==", flush=True)
+        subprocess.run(cmd, cwd=ROOT, env=dict(os.environ, REQUEST_LOG="0"))
+    finally:
+        server.terminate()
+        server.wait()
+    with open(output) as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--classes", default="sync,gthread,gevent",
+                        help="comma-separated worker classes; the first is the baseline")
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn processes per run")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gthread worker")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0,
+                        help="simulated round trip added before every statement")
+    parser.add_argument("--output-dir", default="worker_results")
+    opts = parser.parse_args()
+
+    if shutil.which("gunicorn") is None:
+        raise SystemExit("gunicorn is not installed")
+    os.makedirs(opts.output_dir, exist_ok=True)
+
+    tmp = tempfile.mkdtemp()
+    conf = os.path.join(ROOT, "gunicorn.conf.py")
+    if opts.db_latency_ms:
+        conf = os.path.join(tmp, "gunicorn_latency.conf.py")
+        with open(conf, "w") as f:
+            f.write(_LATENCY_CONF.format(
+                conf=os.path.join(ROOT, "gunicorn.conf.py"),
+                latency=opts.db_latency_ms / 1000,
+            ))
+
+    shared_url = os.environ.get("DATABASE_URL")
+    if shared_url:
+        _upgrade(shared_url)
+
+    results = {}
+    baseline = None
+    try:
+        for worker_class in opts.classes.split(","):
+            database_url = shared_url or _fresh_database(tmp, worker_class)
+            results[worker_class] = _run_class(opts, worker_class, database_url, conf, baseline)
+            baseline = baseline or os.path.join(opts.output_dir, f"{worker_class}.json")
+            print()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'class':<10}{'req/s':>9}{'errors':>8}{'wall s':>9}{'worst p95 ms':>14}")
+    for worker_class, result in results.items():
+        t = result["total"]
+        worst = max(r["p95_ms"] for r in result["routes"].values())
+        print(f"{worker_class:<10}{t['throughput_rps']:>9.1f}{t['errors']:>8}"
+              f"{t['wall_s']:>9.2f}{worst:>14.2f}")
+    return 1 if any(r["total"]["errors"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+Player-journey load harness.
+
+Every simulated player registers, opens /chapters, then for chapters 1-8
+starts the chapter, opens its page and game page (chapters 3/4/5/7) and
+submits it, finishing on /chapters. Players run concurrently and every
+request is timed per route.
+
+    python scripts/load_harness.py --players 200 --concurrency 20
+    python scripts/load_harness.py --target http://127.0.0.1:8000 --players 200
+    python scripts/load_harness.py --output after.json --baseline before.json
+
+In-process mode builds the app from `create_app()` on a throwaway SQLite
+database (or DATABASE_URL) and counts DB queries per route itself; it
+shares one interpreter, so it measures contention rather than parallel
+capacity. `--target` drives a running server (use a fresh database; the
+harness logs in as ADMIN_USERNAME / ADMIN_PASSWORD and creates any missing
+chapters) and takes query counts from its Server-Timing headers, which
+players only get when the server runs with SERVER_TIMING=1.
+
+Results are written as JSON (sorted keys, fixed rounding) so two runs can
+be diffed, or compared directly with `--baseline`.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+GAME_PAGES = {3: "puzzle", 4: "quiz", 5: "callgame", 7: "codegate"}
+CHAPTERS = range(1, 9)
+
+_DASHBOARD_ROW_RE = re.compile(r"<td>(\d+)</td>\s*<td>(\d+)</td>")
+_SERVER_TIMING_QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+# ---------------- CLIENTS ---------------- #
+
+class InProcessClient:
+    """Flask test client; counts the queries each request issues."""
+
+    def __init__(self, app, query_counter):
+        self._client = app.test_client()
+        self._queries = query_counter
+
+    def request(self, method: str, path: str, form=None, json_body=None):
+        self._queries.n = 0
+        kwargs = {}
+        if form is not None:
+            kwargs["data"] = form
+        if json_body is not None:
+            kwargs["json"] = json_body
+        r = self._client.open(path, method=method, **kwargs)
+        r.get_data()
+        r.close()
+        return r.status_code, r.get_data(as_text=True), self._queries.n
+
+
+class LiveClient:
+    """Keep-alive HTTP/1.1 connection with a single session cookie."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self._host, self._port = parts.hostname, parts.port or 80
+        self._conn = None
+        self._cookie = None
+
+    def request(self, method: str, path: str, form=None, json_body=None):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif json_body is not None:
+            body = json.dumps(json_body)
+            headers["Content-Type"] = "application/json"
+        if self._cookie:
+            headers["Cookie"] = self._cookie
+
+        for retry in (False, True):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=60)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                resp = self._conn.getresponse()
+                text = resp.read().decode("utf-8", "replace")
+                break
+            except (http.client.HTTPException, OSError):
+                self._conn.close()
+                self._conn = None
+                if retry:
+                    raise
+
+        set_cookie = resp.getheader("Set-Cookie")
+        if set_cookie and set_cookie.startswith("session="):
+            self._cookie = set_cookie.split(";", 1)[0]
+        # Query counts come from the server's Server-Timing header, if sent
+        m = _SERVER_TIMING_QUERIES_RE.search(resp.getheader("Server-Timing") or "")
+        return resp.status, text, int(m.group(1)) if m else None
+
+
+# ---------------- RECORDING ---------------- #
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.queries: Dict[str, List[int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def timed(self, client, route: str, method: str, path: str, **kwargs):
+        t0 = time.perf_counter()
+        status, text, queries = client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            if queries is not None:
+                self.queries.setdefault(route, []).append(queries)
+            if status >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return status, text
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarise(recorder: Recorder, wall: float) -> Dict[str, dict]:
+    routes = {}
+    for route, samples in recorder.samples.items():
+        s = sorted(samples)
+        q = recorder.queries.get(route)
+        routes[route] = {
+            "count": len(s),
+            "errors": recorder.errors.get(route, 0),
+            "p50_ms": round(_percentile(s, 50) * 1000, 2),
+            "p95_ms": round(_percentile(s, 95) * 1000, 2),
+            "p99_ms": round(_percentile(s, 99) * 1000, 2),
+            "mean_ms": round(sum(s) / len(s) * 1000, 2),
+            "queries_mean": round(sum(q) / len(q), 2) if q else None,
+            "queries_max": max(q) if q else None,
+        }
+    total = sum(r["count"] for r in routes.values())
+    return {
+        "routes": routes,
+        "total": {
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "wall_s": round(wall, 3),
+            "throughput_rps": round(total / wall, 1) if wall else 0.0,
+        },
+    }
+
+
+# ---------------- JOURNEY ---------------- #
+
+def player_journey(client, recorder: Recorder, ids: Dict[int, int], run_id: str, n: int) -> None:
+    recorder.timed(client, "POST /register", "POST", "/register",
+                   form={"name": f"Load {n}", "email": f"load-{run_id}-{n}@example.com"})
+    recorder.timed(client, "GET /chapters", "GET", "/chapters")
+
+    for num in CHAPTERS:
+        cid = ids[num]
+        recorder.timed(client, "POST /start", "POST", f"/start/{cid}", json_body={})
+        recorder.timed(client, "GET /content", "GET", f"/content/{cid}")
+        game = GAME_PAGES.get(num)
+        if game:
+            recorder.timed(client, f"GET /{game}", "GET", f"/{game}/{cid}")
+        recorder.timed(client, "POST /submit", "POST", f"/submit/{cid}",
+                       json_body={"completed": True})
+
+    recorder.timed(client, "GET /chapters", "GET", "/chapters")
+
+
+# ---------------- SETUP ---------------- #
+
+def _setup_in_process():
+    if "DATABASE_URL" not in os.environ:
+        db_file = tempfile.mktemp(prefix="load-", suffix=".db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+    from sqlalchemy import event
+
+    from app import create_app
+    from models import Content, db
+
+    app = create_app()
+    counter = threading.local()
+
+    with app.app_context():
+        def count(*_):
+            counter.n = getattr(counter, "n", 0) + 1
+
+        event.listen(db.engine, "before_cursor_execute", count)
+
+        ids = {}
+        for num in CHAPTERS:
+            c = Content(title=f"Load chapter {num}", time_limit=0,
+                        chapter_number=num, is_unlocked=True)
+            db.session.add(c)
+            db.session.flush()
+            ids[num] = c.id
+        db.session.commit()
+
+    return (lambda: InProcessClient(app, counter)), ids
+
+
+def _dashboard_ids(admin: LiveClient) -> Dict[int, int]:
+    _, html, _ = admin.request("GET", "/admin/dashboard")
+    ids: Dict[int, int] = {}
+    for content_id, chapter in _DASHBOARD_ROW_RE.findall(html):
+        content_id, chapter = int(content_id), int(chapter)
+        if chapter not in ids or content_id < ids[chapter]:
+            ids[chapter] = content_id
+    return ids
+
+
+def _setup_live(target: str):
+    admin = LiveClient(target)
+    admin.request("POST", "/admin/", form={
+        "username": os.environ.get("ADMIN_USERNAME", "admin"),
+        "password": os.environ.get("ADMIN_PASSWORD", "changeme"),
+    })
+    ids = _dashboard_ids(admin)
+    for num in CHAPTERS:
+        if num not in ids:
+            admin.request("POST", "/admin/create-content", form={
+                "title": f"Load chapter {num}",
+                "chapter_number": str(num),
+            })
+    ids = _dashboard_ids(admin)
+    missing = [n for n in CHAPTERS if n not in ids]
+    if missing:
+        raise SystemExit(f"Could not find or create chapters {missing} (admin login failed?)")
+    return (lambda: LiveClient(target)), ids
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------- REPORT ---------------- #
+
+def print_report(result: dict, baseline: Optional[dict]) -> None:
+    base_routes = (baseline or {}).get("routes", {})
+    header = f"{'route':<18}{'n':>7}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>14}"
+    print(header)
+
+    for route in sorted(result["routes"]):
+        r = result["routes"][route]
+        q = "-" if r["queries_mean"] is None else f"{r['queries_mean']:.1f}"
+        line = (f"{route:<18}{r['count']:>7}{r['errors']:>5}"
+                f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{q:>9}")
+        base = base_routes.get(route)
+        if base and base["p95_ms"]:
+            line += f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:>+13.1f}%"
+        print(line)
+
+    t = result["total"]
+    print(f"{t['requests']} requests, {t['errors']} errors in {t['wall_s']:.2f}s "
+          f"→ {t['throughput_rps']:.1f} req/s")
+    if baseline:
+        print(f"baseline: {baseline['total']['throughput_rps']:.1f} req/s "
+              f"({baseline['meta'].get('commit')})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--target", help="base URL of a running server (default: in-process)")
+    parser.add_argument("--output", default="load_results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    if args.target:
+        make_client, ids = _setup_live(args.target)
+    else:
+        make_client, ids = _setup_in_process()
+
+    recorder = Recorder()
+    run_id = f"{os.getpid()}-{int(time.time())}"
+
+    def run(n: int) -> None:
+        player_journey(make_client(), recorder, ids, run_id, n)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run, range(args.players)))
+    wall = time.perf_counter() - t0
+
+    result = summarise(recorder, wall)
+    result["meta"] = {
+        "commit": _git_commit(),
+        "mode": "live" if args.target else "in-process",
+        "target": args.target,
+        "players": args.players,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(result, baseline)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Results written to {args.output}")
+
+    return 1 if result["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
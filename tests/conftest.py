@@ -0,0 +1,77 @@
+"""
+Shared test setup: the app on a throwaway SQLite file.
+
+The environment is fixed here, before anything imports `config`, so the
+tests never touch `database.db` or a DATABASE_URL from the shell. The
+`app` fixture gives each test an empty schema and empty process caches.
+
+    python -m pytest
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_DB_FILE = tempfile.mktemp(prefix="murdermystery-tests-", suffix=".db")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_DB_FILE}",
+    SCHEMA_MODE="create_all",
+    REQUEST_LOG="0",
+    LIVE_STREAMING="0",
+    METRICS_DIR=tempfile.mkdtemp(prefix="murdermystery-tests-metrics-"),
+    MEDIA_ROOT=tempfile.mkdtemp(prefix="murdermystery-tests-media-"),
+    LIVE_MARKER_FILE=os.path.join(tempfile.mkdtemp(prefix="murdermystery-tests-live-"), "marker"),
+)
+os.environ.pop("DATABASE_REPLICA_URL", None)
+os.environ.pop("FLASK_RUN_FROM_CLI", None)
+
+
+def reset_database() -> None:
+    """Empty schema and caches; call inside an app context."""
+    from models import db
+    from utils.content_catalog import catalog
+    from utils.leaderboard import leaderboard
+    from utils.page_cache import content_fragments
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    catalog.invalidate()
+    leaderboard.reset()
+    content_fragments.clear()
+
+
+def add_chapters(count: int = 8) -> dict:
+    """Unlocked chapters 1..count; returns chapter number -> content id."""
+    from models import Content, db
+
+    chapters = {}
+    for num in range(1, count + 1):
+        c = Content(title=f"Test chapter {num}", time_limit=0,
+                    chapter_number=num, is_unlocked=True)
+        db.session.add(c)
+        chapters[num] = c
+    db.session.commit()
+    return {num: c.id for num, c in chapters.items()}
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app
+
+    with flask_app.app_context():
+        reset_database()
+        yield flask_app
+        from models import db
+        db.session.remove()
+
+
+def pytest_unconfigure(config):
+    if os.path.exists(_DB_FILE):
+        os.remove(_DB_FILE)
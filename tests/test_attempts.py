@@ -0,0 +1,81 @@
+"""
+`get_or_start_attempt`: created exactly once, revisits leave the row alone.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from conftest import add_chapters
+
+
+def _user():
+    from models import User, db
+
+    u = User(name="Starter", email="starter@example.com")
+    db.session.add(u)
+    db.session.commit()
+    return u.id
+
+
+def test_first_call_creates_the_attempt(app):
+    from models import ChapterStats, User, db
+    from utils.attempts import get_or_start_attempt
+
+    ids = add_chapters(1)
+    user_id = _user()
+    ref = get_or_start_attempt(user_id, ids[1])
+    db.session.commit()
+
+    assert ref.created and not ref.completed
+    assert ref.progress_version == db.session.get(User, user_id).progress_version
+    assert db.session.get(ChapterStats, ids[1]).starts == 1
+
+
+def test_revisit_returns_the_same_attempt_untouched(app):
+    from models import Attempt, ChapterStats, db
+    from utils.attempts import get_or_start_attempt
+
+    ids = add_chapters(1)
+    user_id = _user()
+    first = get_or_start_attempt(user_id, ids[1])
+    db.session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.lstrip().split(None, 1)[0].upper())
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        again = get_or_start_attempt(user_id, ids[1])
+        db.session.commit()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert again.id == first.id and not again.created
+    assert again.start_time == first.start_time and again.progress_version is None
+    assert "UPDATE" not in statements
+    assert Attempt.query.count() == 1
+    assert db.session.get(ChapterStats, ids[1]).starts == 1
+
+
+def test_existing_attempt_with_a_matching_clock_is_not_created(app, monkeypatch):
+    """A revisit in the same clock tick as the original start is still a revisit."""
+    import utils.attempts
+    from models import db
+    from utils.attempts import get_or_start_attempt
+
+    frozen = datetime.utcnow() - timedelta(minutes=1)
+
+    class FrozenClock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return frozen
+
+    monkeypatch.setattr(utils.attempts, "datetime", FrozenClock)
+    ids = add_chapters(1)
+    user_id = _user()
+    assert get_or_start_attempt(user_id, ids[1]).created
+    db.session.commit()
+    assert not get_or_start_attempt(user_id, ids[1]).created
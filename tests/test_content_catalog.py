@@ -0,0 +1,52 @@
+"""
+The catalog version counter.
+"""
+
+import threading
+
+
+def _version():
+    from models import CatalogState, db
+
+    db.session.expire_all()
+    state = db.session.get(CatalogState, 1)
+    return state.version if state else None
+
+
+def test_bump_creates_the_row_then_increments(app):
+    from models import db
+    from utils.content_catalog import bump_catalog_version
+
+    assert _version() is None
+    bump_catalog_version()
+    db.session.commit()
+    assert _version() == 1
+    bump_catalog_version()
+    db.session.commit()
+    assert _version() == 2
+
+
+def test_concurrent_first_bumps_both_commit(app):
+    from models import db
+    from utils.content_catalog import bump_catalog_version
+
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def admin_write():
+        with app.app_context():
+            try:
+                barrier.wait()
+                bump_catalog_version()
+                db.session.commit()
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=admin_write) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+
+    assert errors == []
+    assert _version() == 2
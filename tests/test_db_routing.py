@@ -0,0 +1,178 @@
+"""
+Read-replica routing, on two SQLite files.
+
+The "replica" is a copy of the primary refreshed with SQLite's backup
+API, which stands in for replication; every statement is recorded with
+the file it ran against.
+"""
+
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import event
+
+STICKY_SECONDS = 0.5
+
+
+def _replicate(primary_path, replica_path):
+    src, dst = sqlite3.connect(primary_path), sqlite3.connect(replica_path)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+class Routed:
+    """The app on a primary and a replica file, recording where SQL runs."""
+
+    def __init__(self, app, primary_path, replica_path, chapter_ids):
+        self.app = app
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.ids = chapter_ids
+        self.seen = []
+
+    def replicate(self):
+        _replicate(self.primary_path, self.replica_path)
+
+    def targets(self, fn):
+        del self.seen[:]
+        result = fn()
+        return result, {name for name, _ in self.seen}
+
+    def replica_attempts(self):
+        with sqlite3.connect(self.replica_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+
+
+@pytest.fixture
+def routed(tmp_path, monkeypatch):
+    from app import create_app
+    from config import config
+    from conftest import add_chapters, reset_database
+    from models import db
+    from utils.db_routing import REPLICA_BIND
+
+    primary_path = str(tmp_path / "primary.db")
+    replica_path = str(tmp_path / "replica.db")
+    monkeypatch.setattr(config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{primary_path}")
+    monkeypatch.setattr(config, "SQLALCHEMY_DATABASE_REPLICA_URI", f"sqlite:///{replica_path}")
+    monkeypatch.setattr(config, "REPLICA_STICKY_SECONDS", STICKY_SECONDS)
+    app = create_app()
+
+    with app.app_context():
+        reset_database()
+        routed = Routed(app, primary_path, replica_path, add_chapters())
+        for key, name in ((None, "primary"), (REPLICA_BIND, "replica")):
+            def record(conn, cursor, statement, *args, _name=name):
+                routed.seen.append((_name, statement.split(None, 1)[0].upper()))
+            event.listen(db.engines[key], "before_cursor_execute", record)
+    routed.replicate()
+
+    # No app context held open: each request gets its own, and with it its
+    # own `g`, as in production
+    yield routed
+
+    with app.app_context():
+        reset_database()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registered an (empty) metadata for the bind on the shared
+    # `db`; the other tests' app has no such bind
+    db.metadatas.pop(REPLICA_BIND, None)
+
+
+def _player(routed, email="replica@example.com"):
+    player = routed.app.test_client()
+    player.post("/register", data={"name": "Replica player", "email": email})
+    return player
+
+
+def _admin(routed):
+    admin = routed.app.test_client()
+    with admin.session_transaction() as s:
+        s["is_admin"] = True
+    return admin
+
+
+def test_writes_go_to_the_primary(routed):
+    ids = routed.ids
+    player = routed.app.test_client()
+    _, used = routed.targets(lambda: player.post(
+        "/register", data={"name": "Replica player", "email": "replica@example.com"}))
+    assert used == {"primary"}
+    _, used = routed.targets(lambda: player.post(f"/start/{ids[1]}", json={}))
+    assert used == {"primary"}
+    _, used = routed.targets(lambda: player.post(f"/submit/{ids[1]}", json={"completed": True}))
+    assert used == {"primary"}
+
+
+def test_own_reads_stick_to_the_primary_after_a_write(routed):
+    ids = routed.ids
+    player = _player(routed)
+    player.post(f"/start/{ids[1]}", json={})
+    player.post(f"/submit/{ids[1]}", json={"completed": True})
+
+    _, used = routed.targets(lambda: player.get("/chapters"))
+    assert used == {"primary"}
+
+    time.sleep(STICKY_SECONDS + 0.1)
+    _, used = routed.targets(lambda: player.get("/chapters"))
+    assert used == {"replica"}
+
+
+def test_read_only_admin_view_reads_the_lagging_replica(routed):
+    from models import Attempt
+
+    ids = routed.ids
+    player = _player(routed)
+    player.post(f"/start/{ids[1]}", json={})
+    player.post(f"/submit/{ids[1]}", json={"completed": True})
+    admin = _admin(routed)
+
+    page, used = routed.targets(lambda: admin.get("/admin/attempts"))
+    assert used == {"replica"}
+    with routed.app.app_context():
+        assert Attempt.query.count() == 1 and routed.replica_attempts() == 0
+    assert b"Replica player" not in page.data
+
+    routed.replicate()
+    assert b"Replica player" in admin.get("/admin/attempts").data
+
+
+def test_leaderboard_sync_ignores_replica_lag(routed):
+    from utils.leaderboard import leaderboard
+
+    ids = routed.ids
+    player = _player(routed)
+    for num in (1, 2):
+        player.post(f"/start/{ids[num]}", json={})
+        player.post(f"/submit/{ids[num]}", json={"completed": True})
+    time.sleep(STICKY_SECONDS + 0.1)
+    leaderboard.reset()
+
+    rows, used = routed.targets(
+        lambda: _admin(routed).get("/admin/api/leaderboard").get_json()["rows"])
+    assert "primary" in used
+    assert any(r["email"] == "replica@example.com" and r["total_score"] == 200 for r in rows)
+
+
+def test_primary_block_overrides_a_read_only_view(routed):
+    from flask import g
+
+    from models import Content, db
+    from utils.db_routing import primary
+
+    with routed.app.test_request_context("/"):
+        g.db_read_only = True
+        _, used = routed.targets(lambda: Content.query.count())
+        assert used == {"replica"}
+        with primary():
+            _, used = routed.targets(lambda: Content.query.count())
+        assert used == {"primary"}
+        _, used = routed.targets(lambda: Content.query.count())
+        assert used == {"replica"}
+        db.session.remove()
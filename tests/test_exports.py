@@ -0,0 +1,136 @@
+"""
+Streaming leaderboard exports.
+"""
+
+import csv
+import io
+import json
+import tracemalloc
+
+import pytest
+
+SCORES = [300, 100, 300, 0, 250]
+
+
+@pytest.fixture
+def admin(app):
+    from models import User, db
+
+    for i, score in enumerate(SCORES):
+        db.session.add(User(name=f"=Player {i}", email=f"p{i}@example.com",
+                            total_score=score))
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["is_admin"] = True
+    return client
+
+
+def _expected():
+    from models import User
+
+    users = User.query.all()
+    ordered = sorted(users, key=lambda u: (-u.total_score, u.id))
+    return [(rank, u.id, u.total_score) for rank, u in enumerate(ordered, 1)]
+
+
+def test_leaderboard_csv_is_in_rank_order(admin):
+    r = admin.get("/admin/leaderboard/export.csv")
+    assert r.status_code == 200 and r.mimetype == "text/csv"
+    assert "attachment" in r.headers["Content-Disposition"]
+
+    rows = list(csv.DictReader(io.StringIO(r.get_data(as_text=True))))
+    got = [(int(row["rank"]), int(row["user_id"]), float(row["total_score"])) for row in rows]
+    assert got == _expected()
+    assert all(row["name"].startswith("'=") for row in rows)
+
+
+def test_leaderboard_ndjson_ranks_across_batches(admin, monkeypatch):
+    from utils import exports
+
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 2)
+    body = admin.get("/admin/leaderboard/export.ndjson").get_data(as_text=True)
+
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [(row["rank"], row["user_id"], row["total_score"]) for row in rows] == _expected()
+
+
+def test_leaderboard_export_needs_admin_and_a_known_format(app, admin):
+    assert app.test_client().get("/admin/leaderboard/export.csv").status_code == 302
+    assert admin.get("/admin/leaderboard/export.xml").status_code == 404
+
+
+# ---------------- MEMORY ---------------- #
+
+CHAPTERS = range(1, 9)
+SMALL, LARGE = 800, 16000
+BATCH = 500
+# Allowed growth of the heap peak between the small and the large export
+SLACK_BYTES = 1024 * 1024
+
+
+def _seed_attempts_to(total, ids, seeded):
+    """Bulk-insert users with 8 attempts each until `total` attempts exist."""
+    from datetime import datetime, timedelta
+
+    from models import Attempt, User, db
+
+    start = datetime(2024, 1, 1)
+    users = range(seeded // len(CHAPTERS), total // len(CHAPTERS))
+    db.session.execute(db.insert(User), [
+        {"id": i + 1, "name": f"Export {i}", "email": f"export-{i}@example.com",
+         "total_score": 800.0}
+        for i in users
+    ])
+    db.session.execute(db.insert(Attempt), [
+        {"user_id": i + 1, "content_id": ids[num],
+         "start_time": start + timedelta(seconds=i * 10 + num),
+         "end_time": start + timedelta(seconds=i * 10 + num + 60),
+         "completed": True, "time_taken": 60, "score": 100.0}
+        for i in users for num in CHAPTERS
+    ])
+    db.session.commit()
+    return total
+
+
+def _download(client, url):
+    """(chunks, lines, heap peak) for one streamed download."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    response = client.get(url, buffered=False)
+    chunks = lines = 0
+    for chunk in response.response:
+        chunks += 1
+        lines += chunk.count(b"\n" if isinstance(chunk, bytes) else "\n")
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, lines, peak - baseline
+
+
+@pytest.mark.parametrize("url, per_attempt", [
+    ("/admin/attempts/export.csv", 1),
+    ("/admin/attempts/export.ndjson", 1),
+    ("/admin/leaderboard/export.csv", 1 / len(CHAPTERS)),
+])
+def test_exports_stream_in_batches_with_flat_memory(app, monkeypatch, url, per_attempt):
+    from conftest import add_chapters
+    from utils import exports
+
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", BATCH)
+    ids = add_chapters()
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["is_admin"] = True
+
+    seeded, peaks = 0, []
+    for size in (SMALL, LARGE):
+        seeded = _seed_attempts_to(size, ids, seeded)
+        rows = int(size * per_attempt)
+        chunks, lines, peak = _download(client, url)
+        assert lines - rows in (0, 1)               # CSV adds a header line
+        assert chunks >= rows // BATCH
+        peaks.append(peak)
+
+    assert peaks[1] - peaks[0] < SLACK_BYTES, peaks
@@ -0,0 +1,62 @@
+"""
+Request instrumentation: who gets the Server-Timing header, and SQL
+timing that survives a failing statement.
+"""
+
+import time
+
+import pytest
+from flask import g
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+
+def _client(app, admin):
+    client = app.test_client()
+    if admin:
+        with client.session_transaction() as s:
+            s["is_admin"] = True
+    return client
+
+
+@pytest.mark.parametrize("mode, admin, sent", [
+    ("admin", False, False),
+    ("admin", True, True),
+    ("1", False, True),
+    ("0", True, False),
+])
+def test_server_timing_header(app, monkeypatch, mode, admin, sent):
+    from config import config
+
+    monkeypatch.setattr(config, "SERVER_TIMING", mode)
+    r = _client(app, admin).get("/")
+    assert ("Server-Timing" in r.headers) is sent
+
+
+def test_failed_statement_is_not_timed(app):
+    from models import db
+    from utils.instrumentation import RequestTimings
+
+    failed = []
+
+    def remember_context(exception_context):
+        failed.append(exception_context.execution_context)
+
+    event.listen(db.engine, "handle_error", remember_context)
+    try:
+        with app.test_request_context("/"):
+            g.request_timings = timings = RequestTimings(keep_statements=False)
+            with db.engine.connect() as conn:
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                time.sleep(0.05)
+                conn.execute(text("SELECT 1"))
+    finally:
+        event.remove(db.engine, "handle_error", remember_context)
+
+    # The start was taken on the failed statement's own context and went
+    # away with it: only the good statement is counted, and none of the
+    # sleep after the failure is charged to the database
+    assert getattr(failed[0], "_query_started", None) is not None
+    assert timings.queries == 1
+    assert timings.db_time < 0.05
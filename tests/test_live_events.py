@@ -0,0 +1,122 @@
+"""
+Live dashboard publisher: database reads only after a change, polls served
+from its cached state, and each event delivered once per stream.
+"""
+
+import json
+import os
+
+import pytest
+from sqlalchemy import event
+
+from conftest import add_chapters
+
+
+@pytest.fixture
+def hub(app, monkeypatch):
+    """A fresh hub whose publisher is driven by hand (no thread)."""
+    import routes.admin_routes
+    import utils.live_events
+    from utils.live_events import LiveEventHub
+
+    fresh = LiveEventHub()
+    fresh._publisher_pid = os.getpid()
+    monkeypatch.setattr(utils.live_events, "hub", fresh)
+    monkeypatch.setattr(routes.admin_routes, "hub", fresh)
+    return fresh
+
+
+@pytest.fixture
+def admin(app):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["is_admin"] = True
+    return client
+
+
+def _queries(app, fn):
+    from models import db
+
+    seen = []
+
+    def count(*args):
+        seen.append(args[2])
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return seen
+
+
+def _solve(app, ids, email):
+    player = app.test_client()
+    player.post("/register", data={"name": email.split("@")[0], "email": email})
+    player.post(f"/start/{ids[1]}", json={})
+    assert player.post(f"/submit/{ids[1]}", json={"completed": True}).status_code == 200
+
+
+def _drain(q):
+    events = []
+    while not q.empty():
+        events.append(q.get_nowait())
+    return events
+
+
+def test_polls_and_idle_ticks_read_nothing(app, hub, admin):
+    add_chapters(1)
+    hub._polled_at = float("inf")
+    hub._tick()                         # first state: one sync + solves read
+
+    def twenty_dashboards_poll_and_tick():
+        for _ in range(20):
+            assert admin.get("/admin/live/snapshot").status_code == 200
+        hub._tick()
+
+    assert _queries(app, twenty_dashboards_poll_and_tick) == []
+
+
+def test_submit_is_published_once_and_a_poll_cannot_swallow_it(app, hub, admin):
+    ids = add_chapters(1)
+    hub._polled_at = float("inf")
+    hub._tick()
+    q = hub.subscribe()
+
+    _solve(app, ids, "live@example.com")
+    before = admin.get("/admin/live/snapshot").get_json()
+    assert before["solves"] == []       # not yet: served from the cache
+    hub._tick()
+
+    kinds = [kind for _, kind, _ in _drain(q)]
+    assert kinds == ["leaderboard", "solves"]
+    after = admin.get("/admin/live/snapshot").get_json()
+    assert after["solves"][0]["solved"] == 1
+    assert [r["email"] for r in after["rows"]] == ["live@example.com"]
+
+    hub._tick()
+    assert _drain(q) == []
+
+
+def test_events_published_during_catch_up_are_sent_once(app, hub, monkeypatch):
+    from config import config
+
+    monkeypatch.setattr(config, "LIVE_HEARTBEAT_SECONDS", 0.01)
+    add_chapters(1)
+    hub._polled_at = float("inf")
+    hub._tick()
+    last_seen = hub._state[0]
+
+    q = hub.subscribe()
+    # Published after subscribing but before the stream catches up: these
+    # reach both the replay buffer and the queue
+    hub._publish([("solves", {"n": 1}), ("solves", {"n": 2})], {"rows": []})
+    hub._publish([("solves", {"n": 3})], {"rows": []})
+
+    body = hub.stream(q, last_seen)
+    chunks = [next(body) for _ in range(4)]     # retry and the 3 missed
+    assert next(body) == ": heartbeat\n\n"     # not the queued copies
+    body.close()
+
+    data = [json.loads(c.split("data: ")[1]) for c in chunks[1:]]
+    assert data == [{"n": 1}, {"n": 2}, {"n": 3}]
@@ -0,0 +1,45 @@
+"""
+Metrics snapshots survive pid reuse.
+"""
+
+import json
+import os
+
+from utils.metrics import MetricsRegistry, merge_snapshots
+
+
+def _old_snapshot(directory, pid):
+    """What an exited process that had this pid left behind."""
+    with open(os.path.join(directory, f"{pid}-1.json"), "w") as f:
+        json.dump({
+            "pid": pid,
+            "started": 1,
+            "counters": [["http_requests_total", {"status": "200"}, 7.0]],
+            "histograms": [],
+            "gauges": [["db_pool_checked_out", {}, 3.0]],
+        }, f)
+
+
+def test_reused_pid_does_not_overwrite_or_revive_an_old_snapshot(tmp_path):
+    directory = str(tmp_path)
+    registry = MetricsRegistry()
+    pid, started = registry.process()
+    _old_snapshot(directory, pid)
+
+    registry.inc("http_requests_total", status="200")
+    registry.add_collector(lambda: [("gauge", "db_pool_checked_out", {}, 1.0)])
+    registry.flush(directory)
+
+    assert sorted(os.listdir(directory)) == sorted([f"{pid}-1.json", f"{pid}-{started}.json"])
+    merged = merge_snapshots(directory)
+    assert merged["counters"][("http_requests_total", (("status", "200"),))] == 8.0
+    assert merged["gauges"][("db_pool_checked_out", ())] == 1.0
+    assert merged["gauges"][("metrics_processes", ())] == 1
+
+
+def test_forked_child_gets_its_own_start_token(monkeypatch):
+    registry = MetricsRegistry()
+    parent = registry.process()
+    monkeypatch.setattr(os, "getpid", lambda: parent[0] + 1)
+    child = registry.process()
+    assert child[0] == parent[0] + 1 and child != parent
@@ -0,0 +1,56 @@
+"""
+Background panel variants: built on a spawned process pool.
+"""
+
+import io
+import os
+import time
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 30, 30)).save(buf, "PNG")
+    buf.seek(0)
+    return FileStorage(buf, filename="panel.png", content_type="image/png")
+
+
+def test_variants_are_built_in_spawned_processes(app):
+    from utils import panel_store
+
+    assert panel_store._executor()._mp_context.get_start_method() == "spawn"
+
+    stored = panel_store.store_upload(_png(1600, 900))
+    meta = panel_store._read_meta(os.path.splitext(os.path.basename(stored.url))[0])
+    targets = [os.path.join(panel_store.panels_folder(), job[0]) for job in meta["variants"]]
+    assert targets
+
+    deadline = time.time() + 60
+    while not all(os.path.exists(t) for t in targets) and time.time() < deadline:
+        time.sleep(0.1)
+    assert all(os.path.exists(t) for t in targets)
+
+
+def test_upload_reads_only_the_header(app, monkeypatch):
+    from PIL import ImageFile
+
+    from utils import panel_store
+
+    def no_decoding(self):
+        raise AssertionError("image decoded inside the request")
+
+    exif = Image.Exif()
+    exif[0x0112] = 6                    # rotated 90 degrees on display
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 800)).save(buf, "JPEG", exif=exif)
+    buf.seek(0)
+
+    monkeypatch.setattr(ImageFile.ImageFile, "load", no_decoding)
+    monkeypatch.setattr(panel_store, "schedule_variants", lambda original, jobs: None)
+    stored = panel_store.store_upload(FileStorage(buf, filename="rotated.jpg"))
+
+    assert (stored.width, stored.height) == (800, 1200)
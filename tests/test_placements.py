@@ -0,0 +1,150 @@
+"""
+Finish-order placements: the counter in `utils/placements.py` and the
+`Attempt.completed` claim in `submit_result` that guards it.
+"""
+
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, text
+
+from conftest import add_chapters
+
+PLAYERS = 20
+SUBMITS_PER_PLAYER = 2   # a double click
+
+
+def _player_at(ids, chapter, name):
+    """A player with every chapter before `chapter` done and `chapter` started."""
+    from models import Attempt, User, db
+
+    u = User(name=name, email=f"{name.lower().replace(' ', '-')}@example.com")
+    db.session.add(u)
+    db.session.flush()
+    for num in range(1, chapter + 1):
+        done = num < chapter
+        db.session.add(Attempt(user_id=u.id, content_id=ids[num],
+                               start_time=datetime.utcnow(),
+                               completed=done, score=100 if done else None))
+    db.session.commit()
+    return u.id
+
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+        s["user_name"] = f"Player {user_id}"
+    return client
+
+
+def _stored(user_id, content_id):
+    from models import Attempt, db
+
+    db.session.expire_all()
+    return Attempt.query.filter_by(user_id=user_id, content_id=content_id).one()
+
+
+# ---------------- COUNTER ---------------- #
+
+def test_next_completion_place_counts_up(app):
+    from models import db
+    from utils.placements import next_completion_place
+
+    ids = add_chapters(3)
+    user_ids = [_player_at(ids, 3, f"Counter {i}") for i in range(3)]
+    places = [next_completion_place(ids[3], _stored(uid, ids[3]).id) for uid in user_ids]
+    db.session.commit()
+    assert places == [1, 2, 3]
+
+
+def test_next_completion_place_seeds_from_attempts_on_record(app):
+    from models import Attempt, ChapterStats, db
+    from utils.placements import next_completion_place
+
+    ids = add_chapters(3)
+    earlier = [_player_at(ids, 3, f"Earlier {i}") for i in range(2)]
+    Attempt.query.filter(Attempt.user_id.in_(earlier)).update({Attempt.completed: True})
+    late = _player_at(ids, 3, "Late")
+    db.session.query(ChapterStats).delete()
+    db.session.commit()
+
+    assert next_completion_place(ids[3], _stored(late, ids[3]).id) == 3
+
+
+# ---------------- CLAIM ---------------- #
+
+def test_second_submit_gets_no_placement(app):
+    ids = add_chapters(3)
+    client = _client(app, _player_at(ids, 3, "Double"))
+
+    first = client.post(f"/submit/{ids[3]}", json={"completed": True})
+    second = client.post(f"/submit/{ids[3]}", json={"completed": True})
+
+    assert first.status_code == 200 and first.get_json()["placement"] == 1
+    assert second.status_code == 400 and "placement" not in second.get_json()
+
+
+def test_submit_that_loses_the_claim_gets_no_placement(app):
+    """Another submit completes the attempt between our read and our claim."""
+    from models import ChapterStats, User, db
+
+    ids = add_chapters(3)
+    user_id = _player_at(ids, 3, "Racer")
+    attempt_id = _stored(user_id, ids[3]).id
+    total_before = db.session.get(User, user_id).total_score
+
+    raced = []
+
+    def rival_wins(conn, cursor, statement, parameters, context, executemany):
+        if not raced and statement.lstrip().upper().startswith("UPDATE ATTEMPTS SET COMPLETED"):
+            raced.append(statement)
+            with db.engine.connect() as rival:
+                rival.execute(text("UPDATE attempts SET completed = 1 WHERE id = :id"),
+                              {"id": attempt_id})
+                rival.commit()
+
+    event.listen(db.engine, "before_cursor_execute", rival_wins)
+    try:
+        r = _client(app, user_id).post(f"/submit/{ids[3]}", json={"completed": True})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", rival_wins)
+
+    assert raced
+    assert r.status_code == 400 and "placement" not in r.get_json()
+    db.session.expire_all()
+    stats = db.session.get(ChapterStats, ids[3])
+    assert stats is None or stats.completions == 0
+    attempt = _stored(user_id, ids[3])
+    assert attempt.score is None and attempt.end_time is None
+    assert db.session.get(User, user_id).total_score == total_before
+
+
+# ---------------- CONCURRENCY ---------------- #
+
+def test_concurrent_submits_get_unique_contiguous_places(app):
+    chapter = 3
+    ids = add_chapters(chapter)
+    user_ids = [_player_at(ids, chapter, f"Stress {i}") for i in range(PLAYERS)]
+    jobs = [uid for uid in user_ids for _ in range(SUBMITS_PER_PLAYER)]
+    barrier = threading.Barrier(len(jobs))
+    outcomes = []
+
+    def submit(user_id):
+        client = _client(app, user_id)
+        barrier.wait()
+        r = client.post(f"/submit/{ids[chapter]}", json={"completed": True})
+        outcomes.append((user_id, r.status_code, (r.get_json() or {}).get("placement")))
+
+    threads = [threading.Thread(target=submit, args=(uid,)) for uid in jobs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+
+    assert len(outcomes) == len(jobs)
+    ok = [o for o in outcomes if o[1] == 200]
+    assert Counter(o[0] for o in ok) == Counter(user_ids)
+    assert sorted(o[2] for o in ok) == list(range(1, PLAYERS + 1))
+    assert all(o[2] is None for o in outcomes if o[1] != 200)
@@ -0,0 +1,189 @@
+"""
+No hot path may scan `attempts` in full.
+
+The table is seeded with PLAYERS players' attempts and ANALYZEd once.
+Each case then drives one player or admin flow through the test client,
+captures every statement that mentions `attempts`, and runs it through
+`EXPLAIN QUERY PLAN` with its real parameters. A case fails on a full
+scan, or on an ordered index walk in a statement without a LIMIT.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import add_chapters, reset_database
+
+PLAYERS = 500
+
+GAMES = {3: "puzzle", 4: "quiz", 5: "callgame", 7: "codegate"}
+
+_FULL_SCAN_RE = re.compile(r"\bSCAN (?:TABLE )?attempts\b(?! USING)")
+_INDEX_WALK_RE = re.compile(r"\bSCAN (?:TABLE )?attempts USING")
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    from app import app
+    from models import Attempt, User, db
+
+    with app.app_context():
+        reset_database()
+        ids = add_chapters()
+        start = datetime.utcnow() - timedelta(days=1)
+        for i in range(PLAYERS):
+            u = User(name=f"Player {i}", email=f"plan-{i}@example.com")
+            db.session.add(u)
+            db.session.flush()
+            for num in range(1, 1 + (i % 6)):
+                db.session.add(Attempt(
+                    user_id=u.id,
+                    content_id=ids[num],
+                    start_time=start + timedelta(seconds=i * 8 + num),
+                    completed=True,
+                    time_taken=60 + i % 300,
+                    score=100,
+                ))
+        db.session.commit()
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+        yield app, ids
+
+
+def _player(app, email):
+    client = app.test_client()
+    client.post("/register", data={"name": "Plan player", "email": email})
+    return client
+
+
+def _admin(app):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["is_admin"] = True
+    return client
+
+
+def _cursor():
+    from utils.attempt_pages import AttemptRow, encode_cursor
+
+    return encode_cursor(AttemptRow(1, "", "", 1, "", datetime.utcnow() - timedelta(hours=12),
+                                    None, None, True, None))
+
+
+# ---------------- CASES ---------------- #
+
+def player_start(app, ids):
+    player = _player(app, "plan-start@example.com")
+    player.get("/chapters")
+    player.post(f"/start/{ids[1]}", json={})
+    player.get(f"/content/{ids[1]}")
+    player.get("/chapters")
+
+
+def player_game_submit(app, ids):
+    player = _player(app, "plan-submit@example.com")
+    for num in range(1, 4):
+        player.post(f"/start/{ids[num]}", json={})
+        if num in GAMES:
+            player.get(f"/{GAMES[num]}/{ids[num]}")
+        player.post(f"/submit/{ids[num]}", json={"completed": True})
+
+
+def attempts_first_page(app, ids):
+    _admin(app).get("/admin/attempts")
+
+
+def attempts_deep_pages(app, ids):
+    admin = _admin(app)
+    admin.get(f"/admin/attempts?older={_cursor()}")
+    admin.get(f"/admin/attempts?newer={_cursor()}")
+
+
+def attempts_by_chapter(app, ids):
+    _admin(app).get(f"/admin/attempts?older={_cursor()}&chapter=2")
+
+
+def attempts_by_email(app, ids):
+    _admin(app).get("/admin/attempts?email=plan-7@example.com")
+
+
+def attempts_by_completed(app, ids):
+    _admin(app).get(f"/admin/attempts?older={_cursor()}&completed=no")
+
+
+def attempts_by_date(app, ids):
+    _admin(app).get("/admin/attempts?since=2000-01-01&until=2100-01-01")
+
+
+def filtered_exports(app, ids):
+    # Full exports walk the whole table by design; filtered ones must not
+    admin = _admin(app)
+    admin.get("/admin/attempts/export.csv?chapter=2").get_data()
+    admin.get("/admin/attempts/export.ndjson?since=2000-01-01").get_data()
+
+
+def score_repair(app, ids):
+    from models import db
+    from utils.user_scores import rebuild_user_totals
+
+    rebuild_user_totals()
+    db.session.rollback()
+
+
+def delete_chapter(app, ids):
+    _admin(app).post(f"/admin/delete/{ids[8]}")
+
+
+CASES = [
+    player_start, player_game_submit, attempts_first_page,
+    attempts_deep_pages, attempts_by_chapter, attempts_by_email,
+    attempts_by_completed, attempts_by_date, filtered_exports, score_repair,
+    delete_chapter,
+]
+
+
+def _capture(engine, fn) -> dict:
+    captured = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany or "attempts" not in statement:
+            return
+        captured.setdefault(statement, parameters)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return captured
+
+
+def _bad_plan_lines(cursor, statement, parameters):
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    plan = [row[-1] for row in cursor.fetchall()]
+    bad = [line for line in plan if _FULL_SCAN_RE.search(line)]
+    if " LIMIT " not in statement.upper():
+        bad += [line for line in plan if _INDEX_WALK_RE.search(line)]
+    return bad, plan
+
+
+@pytest.mark.parametrize("case", CASES, ids=[c.__name__ for c in CASES])
+def test_no_full_scan_of_attempts(seeded, case):
+    from models import db
+
+    app, ids = seeded
+    captured = _capture(db.engine, lambda: case(app, ids))
+    assert captured, "case issued no statement on attempts"
+
+    raw = db.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in captured.items():
+            bad, plan = _bad_plan_lines(cursor, statement, parameters)
+            assert not bad, (
+                f"{' '.join(statement.split())[:200]}\n" + "\n".join(plan)
+            )
+    finally:
+        raw.close()
@@ -0,0 +1,55 @@
+"""
+The session-cached nav-badge total must follow the user's real total.
+"""
+
+from conftest import add_chapters
+
+
+def _play(app, ids, chapters):
+    player = app.test_client()
+    player.post("/register", data={"name": "Scorer", "email": "scorer@example.com"})
+    for num in chapters:
+        player.post(f"/start/{ids[num]}", json={})
+        player.post(f"/submit/{ids[num]}", json={"completed": True})
+    return player
+
+
+def _badge(player):
+    with player.session_transaction() as s:
+        return s.get("user_total_score", {}).get("v")
+
+
+def test_deleting_a_chapter_refreshes_the_cached_total(app):
+    ids = add_chapters(2)
+    player = _play(app, ids, [1, 2])
+    before = player.get("/chapters")
+    assert _badge(player) == 200
+
+    admin = app.test_client()
+    with admin.session_transaction() as s:
+        s["is_admin"] = True
+    admin.post(f"/admin/delete/{ids[2]}")
+
+    after = player.get("/chapters", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert _badge(player) == 100
+    assert "&#9733; 100" in after.get_data(as_text=True)
+
+
+def test_cached_total_expires_without_a_version(app, monkeypatch):
+    from config import config
+    from models import User, db
+    from utils.user_scores import cached_total, remember_total
+
+    ids = add_chapters(1)
+    _play(app, ids, [1])
+    user = User.query.filter_by(email="scorer@example.com").one()
+    session = {}
+    remember_total(session, user.id, 100, user.progress_version)
+
+    db.session.query(User).filter_by(id=user.id).update({User.total_score: 40})
+    db.session.commit()
+    assert cached_total(session, user.id) == 100
+
+    monkeypatch.setattr(config, "PROGRESS_MASK_TTL", 0)
+    assert cached_total(session, user.id) == 40
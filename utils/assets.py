@@ -0,0 +1,180 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`flask build-assets` copies every stylesheet and script under `static/` to
+`static/dist/` with a content hash in the filename, writes `.gz` (and `.br`
+when the optional `brotli` package is installed) siblings next to each copy,
+and records the mapping in `static/dist/manifest.json`.
+
+Templates call `asset_url("css/style.css")`; it resolves through the manifest
+to the hashed URL, or falls back to the plain static URL when no build has
+been run (e.g. local development).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, url_for
+
+try:
+    import brotli
+except ImportError:          # optional: .br variants are skipped without it
+    brotli = None
+
+ASSET_DIRS = ("css", "js", "contents")
+ASSET_EXTS = (".css", ".js")
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Precompressed variants, in order of preference
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+_STATIC_REF_RE = re.compile(
+    r"""(?:asset_url\(\s*|url_for\(\s*['"]static['"]\s*,\s*filename\s*=\s*)['"]([^'"]+)['"]"""
+)
+
+
+def _static_folder() -> str:
+    return current_app.static_folder
+
+
+def dist_folder() -> str:
+    return os.path.join(_static_folder(), DIST_DIR)
+
+
+# ---------------- BUILD ---------------- #
+
+def _hashed_name(rel_path: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets() -> Dict[str, str]:
+    """Write hashed copies plus compressed siblings; returns the manifest."""
+    static = _static_folder()
+    dist = dist_folder()
+    manifest: Dict[str, str] = {}
+
+    for sub in ASSET_DIRS:
+        src_dir = os.path.join(static, sub)
+        if not os.path.isdir(src_dir):
+            continue
+        for name in sorted(os.listdir(src_dir)):
+            if not name.endswith(ASSET_EXTS):
+                continue
+            rel = f"{sub}/{name}"
+            with open(os.path.join(src_dir, name), "rb") as f:
+                data = f.read()
+
+            hashed = _hashed_name(rel, data)
+            target = os.path.join(dist, hashed)
+            manifest[rel] = hashed
+
+            if os.path.exists(target):
+                continue        # content-addressed: already built
+            _write(target, data)
+            _write(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(target + ".br", brotli.compress(data, quality=11))
+
+    _write(
+        os.path.join(dist, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    _manifest_cache.clear()
+    return manifest
+
+
+# ---------------- LOOKUP ---------------- #
+
+_manifest_cache: Dict[str, Dict[str, str]] = {}
+
+
+def load_manifest() -> Dict[str, str]:
+    """The build manifest (read once per process); empty if never built."""
+    key = dist_folder()
+    manifest = _manifest_cache.get(key)
+    if manifest is None:
+        try:
+            with open(os.path.join(key, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        _manifest_cache[key] = manifest
+    return manifest
+
+
+def manifest_revision() -> str:
+    """Fingerprint of the current build, for page ETags."""
+    manifest = load_manifest()
+    raw = json.dumps(manifest, sort_keys=True).encode()
+    return hashlib.sha256(raw).hexdigest()[:12]
+
+
+def asset_url(filename: str) -> str:
+    """`url_for("static", ...)` replacement that emits fingerprinted URLs."""
+    hashed = load_manifest().get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.serve", filename=hashed)
+
+
+def pick_encoding(path: str, accept_encodings) -> Tuple[str, Optional[str]]:
+    """Best precompressed sibling the client accepts: (path, encoding)."""
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+# ---------------- CHECK ---------------- #
+
+def find_template_refs(template_folder: str) -> List[Tuple[str, str]]:
+    """(template, static filename) for every static reference in templates."""
+    refs = []
+    for root, _, files in os.walk(template_folder):
+        for name in sorted(files):
+            if not name.endswith(".html"):
+                continue
+            path = os.path.join(root, name)
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            rel = os.path.relpath(path, template_folder)
+            refs.extend((rel, m) for m in _STATIC_REF_RE.findall(text))
+    return refs
+
+
+def check_template_refs(template_folder: str) -> List[str]:
+    """Problems with template asset references; empty when all resolve."""
+    static = _static_folder()
+    manifest = load_manifest()
+    problems = []
+
+    for template, filename in find_template_refs(template_folder):
+        source = os.path.join(static, filename)
+        if not os.path.exists(source):
+            problems.append(f"{template}: {filename} does not exist in static/")
+            continue
+        if os.path.isdir(source):
+            continue        # base path for URLs built client-side
+        if manifest and filename.endswith(ASSET_EXTS):
+            hashed = manifest.get(filename)
+            if hashed is None:
+                problems.append(f"{template}: {filename} is missing from the manifest")
+            elif not os.path.isfile(os.path.join(dist_folder(), hashed)):
+                problems.append(f"{template}: built file {hashed} is missing")
+
+    return problems
@@ -0,0 +1,80 @@
+"""
+Admin filters over `attempts`, shared by the paged attempts view and the
+streaming exports.
+
+Every filter lands on an index: an email becomes a user id (unique email
+index, then the per-user unique constraint), a chapter becomes content ids
+(ix_attempts_content_start), completed uses ix_attempts_completed_start and
+a date range ix_attempts_start_time_id.
+"""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from models import Attempt, User
+from utils.content_catalog import catalog
+
+
+class AttemptFilters(NamedTuple):
+    email: Optional[str] = None
+    chapter: Optional[int] = None
+    completed: Optional[bool] = None
+    since: Optional[datetime] = None        # start_time >= since
+    until: Optional[datetime] = None        # start_time < until
+
+
+def _parse_time(value: str, end: bool) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    # A bare date as the upper bound means "up to the end of that day"
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def _parse_completed(value: str) -> Optional[bool]:
+    if value in ("", "any"):
+        return None
+    if value in ("1", "yes", "true"):
+        return True
+    if value in ("0", "no", "false"):
+        return False
+    raise ValueError(f"Invalid completed filter: {value!r}")
+
+
+def parse_attempt_filters(args) -> AttemptFilters:
+    """Filters from query args (?email=&chapter=3&completed=yes&since=&until=).
+
+    Raises ValueError for malformed values.
+    """
+    email = args.get("email", "").strip().lower()
+    chapter = args.get("chapter", "").strip()
+    since = args.get("since", "").strip()
+    until = args.get("until", "").strip()
+    return AttemptFilters(
+        email=email or None,
+        chapter=int(chapter) if chapter else None,
+        completed=_parse_completed(args.get("completed", "").strip().lower()),
+        since=_parse_time(since, end=False) if since else None,
+        until=_parse_time(until, end=True) if until else None,
+    )
+
+
+def apply_attempt_filters(stmt, filters: AttemptFilters):
+    """Add the filters' WHERE clauses to a select over `attempts`."""
+    if filters.email is not None:
+        user_id = select(User.id).where(User.email == filters.email).scalar_subquery()
+        stmt = stmt.where(Attempt.user_id == user_id)
+    if filters.chapter is not None:
+        content_ids = [
+            r.id for r in catalog.records() if r.chapter_number == filters.chapter
+        ]
+        stmt = stmt.where(Attempt.content_id.in_(content_ids))
+    if filters.completed is not None:
+        stmt = stmt.where(Attempt.completed == filters.completed)
+    if filters.since is not None:
+        stmt = stmt.where(Attempt.start_time >= filters.since)
+    if filters.until is not None:
+        stmt = stmt.where(Attempt.start_time < filters.until)
+    return stmt
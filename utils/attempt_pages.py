@@ -0,0 +1,109 @@
+"""
+Keyset (seek) pagination of the admin attempts view.
+
+Pages are ordered newest first by (start_time, id). Instead of an OFFSET,
+each page starts from the (start_time, id) of the row that ended the
+previous one, so page N is an index seek plus `limit` rows, the same cost
+as page 1. Cursors are opaque strings; `older` walks back in time, `newer`
+walks forward again.
+"""
+
+import base64
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from models import Attempt, Content, User, db
+from utils.attempt_filters import AttemptFilters, apply_attempt_filters
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class AttemptRow(NamedTuple):
+    id: int
+    name: str
+    email: str
+    chapter_number: Optional[int]
+    title: str
+    start_time: datetime
+    end_time: Optional[datetime]
+    time_taken: Optional[int]
+    completed: bool
+    score: Optional[float]
+
+
+class AttemptPage(NamedTuple):
+    rows: List[AttemptRow]
+    older: Optional[str]        # cursor for the next, older page
+    newer: Optional[str]        # cursor for the previous, newer page
+
+
+def encode_cursor(row: AttemptRow) -> str:
+    raw = f"{row.start_time.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_time, attempt_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(start_time), int(attempt_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def attempts_page(
+    filters: AttemptFilters,
+    older: Optional[str] = None,
+    newer: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> AttemptPage:
+    """One page of attempts, newest first, after `older` or before `newer`.
+
+    An unreadable cursor is treated as no cursor (the newest page).
+    """
+    key = tuple_(Attempt.start_time, Attempt.id)
+    stmt = apply_attempt_filters(
+        select(
+            Attempt.id, User.name, User.email,
+            Content.chapter_number, Content.title,
+            Attempt.start_time, Attempt.end_time, Attempt.time_taken,
+            Attempt.completed, Attempt.score,
+        )
+        .join(User, Attempt.user_id == User.id)
+        .join(Content, Attempt.content_id == Content.id),
+        filters,
+    )
+
+    older_key = decode_cursor(older) if older else None
+    newer_key = decode_cursor(newer) if newer else None
+
+    # Fetch one extra row to learn whether there is another page
+    if newer_key is not None:
+        stmt = stmt.where(key > tuple_(*newer_key)).order_by(
+            Attempt.start_time.asc(), Attempt.id.asc()
+        )
+    else:
+        if older_key is not None:
+            stmt = stmt.where(key < tuple_(*older_key))
+        stmt = stmt.order_by(Attempt.start_time.desc(), Attempt.id.desc())
+
+    rows = [AttemptRow(*r) for r in db.session.execute(stmt.limit(limit + 1))]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if newer_key is not None:
+        rows.reverse()
+        return AttemptPage(
+            rows=rows,
+            older=encode_cursor(rows[-1]) if rows else None,
+            newer=encode_cursor(rows[0]) if has_more else None,
+        )
+
+    return AttemptPage(
+        rows=rows,
+        older=encode_cursor(rows[-1]) if has_more else None,
+        newer=encode_cursor(rows[0]) if older_key is not None and rows else None,
+    )
@@ -0,0 +1,58 @@
+"""
+Get-or-create for a player's attempt at a chapter.
+
+`(user_id, content_id)` is unique, so starting a chapter is one
+`INSERT ... ON CONFLICT DO NOTHING RETURNING`. A row back means this call
+created the attempt; no row means it already existed (a revisit or a
+double-click) and one SELECT on the unique index fetches it, so the existing row
+is never rewritten or locked and no IntegrityError is raised.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from models import Attempt, db
+from utils.chapter_config import bump_progress_version
+from utils.chapter_rollups import record_start
+from utils.upserts import dialect_insert
+
+
+class AttemptRef(NamedTuple):
+    id: int
+    start_time: datetime
+    completed: bool
+    created: bool
+    progress_version: Optional[int] = None    # set when created
+
+
+def get_or_start_attempt(user_id: int, content_id: int) -> AttemptRef:
+    """
+    The player's attempt at the chapter, started now if there was none.
+    A new attempt also bumps the player's progress version and the
+    chapter's start count; the caller commits.
+    """
+    stmt = dialect_insert(Attempt).values(
+        user_id=user_id,
+        content_id=content_id,
+        start_time=datetime.utcnow(),
+        completed=False,
+    ).on_conflict_do_nothing(
+        index_elements=["user_id", "content_id"],
+    )
+    columns = (Attempt.id, Attempt.start_time, Attempt.completed)
+
+    row = db.session.execute(stmt.returning(*columns)).first()
+    if row is None:
+        existing = db.session.execute(
+            select(*columns).where(
+                Attempt.user_id == user_id,
+                Attempt.content_id == content_id,
+            )
+        ).one()
+        return AttemptRef(existing.id, existing.start_time, bool(existing.completed), False)
+
+    version = bump_progress_version(user_id)
+    record_start(content_id, row.id)
+    return AttemptRef(row.id, row.start_time, bool(row.completed), True, version)
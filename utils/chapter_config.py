@@ -5,125 +5,408 @@ Rules:
 - Chapter 1: always accessible (no previous required)
 - Chapters 2-6: each requires the previous chapter to be completed by the user
 - Chapters 7-8 (HIDDEN): only visible/accessible after chapter 6 is completed
+
+All checks are answered by a `UserProgress` snapshot, which takes the
+chapters from the in-memory catalog, loads the user's attempts once and
+then works from memory.
+
+Between requests the snapshot is kept in the (signed) session as two
+chapter bitmasks, tagged with the user id, the user's progress version and
+the catalog version. `UserProgress.for_session` trusts a mask for
+PROGRESS_MASK_TTL seconds, then re-checks the progress version (one
+primary-key read) and only reloads attempts when it moved. Progress only
+ever grows, so a stale mask can wrongly deny but never wrongly allow;
+`can_enter` therefore re-reads the database before refusing entry.
 """
 
+import time
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import update
 
+from config import config
 from models import (
     Attempt,
-    Content,
     CHAPTER_REVEAL_TRIGGER,
     HIDDEN_CHAPTERS,
+    User,
+    db,
 )
+from utils.content_catalog import ChapterRecord, catalog
+
 
+class ChapterCard(NamedTuple):
+    """One card on the chapters page (a real chapter or a placeholder)."""
 
-def _content_with_chapter_number(chapter_num: int) -> Optional[Content]:
-    return Content.query.filter_by(
-        chapter_number=chapter_num
-    ).first()
+    id: Optional[int]
+    chapter_number: int
+    title: str
+    accessible: bool
+    is_placeholder: bool = False
 
 
-def _has_completed_chapter(user_id: int, chapter_num: int) -> bool:
-    content = _content_with_chapter_number(chapter_num)
-    if not content:
+def _is_unlocked_by_time(content: ChapterRecord) -> bool:
+    if not content.is_unlocked:
         return False
 
-    attempt = Attempt.query.filter_by(
-        user_id=user_id,
-        content_id=content.id,
-        completed=True
-    ).first()
+    if content.unlock_time is None:
+        return True
 
-    return attempt is not None
+    return datetime.utcnow() >= content.unlock_time
 
 
-def chapters_7_8_revealed_for_user(user_id: Optional[int]) -> bool:
-    if not user_id:
-        return False
+def unlock_epoch(contents: Iterable[ChapterRecord]) -> int:
+    """
+    How many timed unlocks have already passed. Changes on its own as the
+    clock crosses an `unlock_time`, so cached chapter lists expire with it.
+    """
+    now = datetime.utcnow()
+    return sum(
+        1 for c in contents
+        if c.unlock_time is not None and c.unlock_time <= now
+    )
+
 
-    return _has_completed_chapter(
-        user_id,
-        CHAPTER_REVEAL_TRIGGER
+# ── Per-user progress version ────────────────────────────────────────────────
+
+def read_progress_version(user_id: int) -> int:
+    version = (
+        db.session.query(User.progress_version)
+        .filter(User.id == user_id)
+        .scalar()
     )
+    return int(version or 0)
 
 
-def _is_unlocked_by_time(content: Content) -> bool:
-    if not content.is_unlocked:
-        return False
+def bump_progress_version(user_id: int) -> Optional[int]:
+    """
+    Mark the user's progress as changed, inside the caller's transaction.
+    Returns the new version.
+    """
+    return db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(progress_version=User.progress_version + 1)
+        .returning(User.progress_version)
+    ).scalar()
 
-    if content.unlock_time is None:
-        return True
 
-    return datetime.utcnow() >= content.unlock_time
+# ── Session progress mask ────────────────────────────────────────────────────
 
+PROGRESS_SESSION_KEY = "progress"
+PROGRESS_MASK_FORMAT = 1
+MASK_CHAPTERS = 8          # bit n-1 stands for chapter n
 
-def is_chapter_accessible_for_user(
-    user_id: Optional[int],
-    content: Content,
-) -> bool:
+
+def _chapter_bit(chapter_number: int) -> int:
+    if 1 <= chapter_number <= MASK_CHAPTERS:
+        return 1 << (chapter_number - 1)
+    return 0
+
+
+def _mask_matches(mask: Any, user_id: int, catalog_version: int) -> bool:
+    return (
+        isinstance(mask, dict)
+        and mask.get("f") == PROGRESS_MASK_FORMAT
+        and mask.get("uid") == user_id
+        and mask.get("cv") == catalog_version
+    )
+
+
+class UserProgress:
     """
-    Returns True if this specific user can enter/start this chapter.
+    Per-request snapshot of every chapter plus one user's attempts.
 
-    Sequential rule: chapters 2-6 require the previous chapter to be
-    completed by this user. Chapter 1 is always open (if unlocked).
-    Chapters 7-8 require chapter 6 completed.
+    Chapters come from the catalog cache and the user's attempts cost one
+    query; every visibility / accessibility question afterwards is
+    answered from memory.
     """
-    if content.chapter_number in HIDDEN_CHAPTERS:
+
+    def __init__(
+        self,
+        user_id: Optional[int],
+        contents: Iterable[ChapterRecord],
+        started_ids: Iterable[int] = (),
+        completed_ids: Iterable[int] = (),
+    ):
+        self.user_id = user_id
+        self.contents: List[ChapterRecord] = list(contents)
+        self._by_id: Dict[int, ChapterRecord] = {
+            c.id: c for c in self.contents
+        }
+
+        # The lowest id wins when two rows share a chapter number
+        self._by_chapter: Dict[int, ChapterRecord] = {}
+        for c in sorted(self.contents, key=lambda c: c.id):
+            self._by_chapter.setdefault(c.chapter_number, c)
+
+        self.started_ids: Set[int] = set(started_ids)
+        self.completed_ids: Set[int] = set(completed_ids)
+
+        # Set when the snapshot came from (and is written back to) a session
+        self._session = None
+
+    @classmethod
+    def load(cls, user_id: Optional[int]) -> "UserProgress":
+        contents = catalog.records()
+
+        started, completed = [], []
+        if user_id:
+            rows = (
+                db.session.query(Attempt.content_id, Attempt.completed)
+                .filter(Attempt.user_id == user_id)
+                .all()
+            )
+            for content_id, is_completed in rows:
+                started.append(content_id)
+                if is_completed:
+                    completed.append(content_id)
+
+        return cls(user_id, contents, started, completed)
+
+    @classmethod
+    def for_session(
+        cls,
+        session,
+        user_id: Optional[int],
+        progress_version: Optional[int] = None,
+    ) -> "UserProgress":
+        """
+        Snapshot from the session's progress mask when it is still current,
+        otherwise from the database (refreshing the mask). Pass
+        `progress_version` when the caller has already read it.
+        """
         if not user_id:
+            return cls.load(user_id)
+
+        contents = catalog.records()
+        catalog_version = catalog.version
+        mask = session.get(PROGRESS_SESSION_KEY)
+        now = time.time()
+
+        if _mask_matches(mask, user_id, catalog_version):
+            expired = now - mask["t"] >= config.PROGRESS_MASK_TTL
+            current = True
+            if expired or progress_version is not None:
+                if progress_version is None:
+                    progress_version = read_progress_version(user_id)
+                current = progress_version == mask["pv"]
+                if current and expired:
+                    session[PROGRESS_SESSION_KEY] = {**mask, "t": now}
+
+            if current:
+                progress = cls(user_id, contents)
+                for c in progress._by_chapter.values():
+                    bit = _chapter_bit(c.chapter_number)
+                    if mask["s"] & bit:
+                        progress.started_ids.add(c.id)
+                    if mask["c"] & bit:
+                        progress.completed_ids.add(c.id)
+                progress._session = session
+                return progress
+
+        return cls._reload_into(session, user_id, catalog_version, progress_version)
+
+    @classmethod
+    def _reload_into(
+        cls,
+        session,
+        user_id: int,
+        catalog_version: int,
+        progress_version: Optional[int] = None,
+    ) -> "UserProgress":
+        # Version first: a write landing in between leaves the mask stale,
+        # never ahead of the attempts it describes
+        if progress_version is None:
+            progress_version = read_progress_version(user_id)
+        progress = cls.load(user_id)
+
+        started = completed = 0
+        for c in progress._by_chapter.values():
+            bit = _chapter_bit(c.chapter_number)
+            if c.id in progress.started_ids:
+                started |= bit
+            if c.id in progress.completed_ids:
+                completed |= bit
+
+        session[PROGRESS_SESSION_KEY] = {
+            "f": PROGRESS_MASK_FORMAT,
+            "uid": user_id,
+            "pv": progress_version,
+            "cv": catalog_version,
+            "s": started,
+            "c": completed,
+            "t": time.time(),
+        }
+        progress._session = session
+        return progress
+
+    def remember(
+        self,
+        content: ChapterRecord,
+        new_version: Optional[int],
+        completed: bool = False,
+    ) -> None:
+        """
+        Fold a just-committed start/finish into the session mask. The mask
+        is only advanced when it was current before the write; otherwise it
+        is dropped and rebuilt on the next request.
+        """
+        if self._session is None:
+            return
+
+        self.started_ids.add(content.id)
+        if completed:
+            self.completed_ids.add(content.id)
+
+        mask = self._session.get(PROGRESS_SESSION_KEY)
+        canonical = self._by_chapter.get(content.chapter_number)
+        if (
+            new_version is None
+            or canonical is None
+            or canonical.id != content.id
+            or not _mask_matches(mask, self.user_id, catalog.version)
+            or mask["pv"] != new_version - 1
+        ):
+            self._session.pop(PROGRESS_SESSION_KEY, None)
+            return
+
+        bit = _chapter_bit(content.chapter_number)
+        self._session[PROGRESS_SESSION_KEY] = {
+            **mask,
+            "pv": new_version,
+            "s": mask["s"] | bit,
+            "c": mask["c"] | (bit if completed else 0),
+            "t": time.time(),
+        }
+
+    # ── Lookups ──────────────────────────────────────────────────────────────
+
+    def content(self, content_id: int) -> Optional[ChapterRecord]:
+        return self._by_id.get(content_id)
+
+    def has_started(self, content_id: int) -> bool:
+        return content_id in self.started_ids
+
+    def has_completed_chapter(self, chapter_num: int) -> bool:
+        content = self._by_chapter.get(chapter_num)
+        if not content:
             return False
-        return chapters_7_8_revealed_for_user(user_id)
+        return content.id in self.completed_ids
 
-    # Chapter must be marked as unlocked by admin first
-    if not _is_unlocked_by_time(content):
-        return False
+    @property
+    def revealed(self) -> bool:
+        """Chapters 7 & 8 unlock once the trigger chapter is completed."""
+        if not self.user_id:
+            return False
+        return self.has_completed_chapter(CHAPTER_REVEAL_TRIGGER)
 
-    # Chapter 1 never requires a predecessor
-    if content.chapter_number <= 1:
-        return True
+    # ── Gates ────────────────────────────────────────────────────────────────
 
-    # Chapters 2-6: user must have completed the previous chapter
-    if not user_id:
-        return False
+    def is_accessible(self, content: ChapterRecord) -> bool:
+        """
+        Returns True if this user can enter/start this chapter.
 
-    return _has_completed_chapter(user_id, content.chapter_number - 1)
+        Sequential rule: chapters 2-6 require the previous chapter to be
+        completed by this user. Chapter 1 is always open (if unlocked).
+        Chapters 7-8 require chapter 6 completed.
+        """
+        if content.chapter_number in HIDDEN_CHAPTERS:
+            return self.revealed
 
+        # Chapter must be marked as unlocked by admin first
+        if not _is_unlocked_by_time(content):
+            return False
 
-def get_visible_contents_for_user(
-    user_id: Optional[int]
-) -> Tuple[List[Content], bool]:
-    """
-    Returns (list_of_visible_contents, chapters_7_8_revealed).
+        # Chapter 1 never requires a predecessor
+        if content.chapter_number <= 1:
+            return True
 
-    Visible means the card is shown on the chapters page.
-    Each card carries an `accessible` attribute so the template
-    can distinguish locked vs unlocked state.
-    """
-    revealed = chapters_7_8_revealed_for_user(user_id)
+        # Chapters 2-6: user must have completed the previous chapter
+        if not self.user_id:
+            return False
 
-    all_contents = Content.query.order_by(
-        Content.chapter_number.asc()
-    ).all()
+        return self.has_completed_chapter(content.chapter_number - 1)
+
+    def can_enter(self, content: ChapterRecord) -> bool:
+        """
+        Gate for the chapter routes. A refusal based on a session mask is
+        confirmed against the database first, since the mask may predate
+        progress made from another device.
+        """
+        if self.is_accessible(content):
+            return True
+        if self._session is None:
+            return False
 
-    visible = []
+        fresh = self._reload_into(self._session, self.user_id, catalog.version)
+        self.started_ids = fresh.started_ids
+        self.completed_ids = fresh.completed_ids
+        return self.is_accessible(content)
 
-    for c in all_contents:
+    def can_access(self, content_id: int) -> bool:
+        content = self.content(content_id)
+        if not content:
+            return False
+        return self.is_accessible(content)
+
+    def visible_contents(self) -> List[ChapterCard]:
+        """
+        Cards shown on the chapters page, in chapter order.
+
+        Each card carries an `accessible` flag so the template
+        can distinguish locked vs unlocked state.
+        """
+        revealed = self.revealed
+        visible = []
+
+        for c in self.contents:
 
-        # Hidden chapters (7, 8): only show after chapter 6 complete
-        if c.chapter_number in HIDDEN_CHAPTERS:
-            if not revealed:
+            # Hidden chapters (7, 8): only show after chapter 6 complete
+            if c.chapter_number in HIDDEN_CHAPTERS:
+                if not revealed:
+                    continue
+                visible.append(self._card(c, accessible=True))
                 continue
-            # Attach accessibility flag
-            c.accessible = True
-            visible.append(c)
-            continue
 
-        # Regular chapters: show if admin has unlocked the chapter
-        if _is_unlocked_by_time(c):
-            c.accessible = is_chapter_accessible_for_user(user_id, c)
-            visible.append(c)
+            # Regular chapters: show if admin has unlocked the chapter
+            if _is_unlocked_by_time(c):
+                visible.append(self._card(c, self.is_accessible(c)))
 
-    return visible, revealed
+        return visible
+
+    @staticmethod
+    def _card(c: ChapterRecord, accessible: bool) -> ChapterCard:
+        return ChapterCard(
+            id=c.id,
+            chapter_number=c.chapter_number,
+            title=c.title,
+            accessible=accessible,
+        )
+
+
+# ── Convenience wrappers (one snapshot per call) ─────────────────────────────
+
+def chapters_7_8_revealed_for_user(user_id: Optional[int]) -> bool:
+    return UserProgress.load(user_id).revealed
+
+
+def is_chapter_accessible_for_user(
+    user_id: Optional[int],
+    content: ChapterRecord,
+) -> bool:
+    return UserProgress.load(user_id).is_accessible(content)
+
+
+def get_visible_contents_for_user(
+    user_id: Optional[int]
+) -> Tuple[List[ChapterCard], bool]:
+    """
+    Returns (list_of_visible_contents, chapters_7_8_revealed).
+    """
+    progress = UserProgress.load(user_id)
+    return progress.visible_contents(), progress.revealed
 
 
 def can_access_content(
@@ -131,9 +414,4 @@ def can_access_content(
     content_id: int
 ) -> bool:
     """Gate used by /start and /content routes."""
-    content = Content.query.get(content_id)
-
-    if not content:
-        return False
-
-    return is_chapter_accessible_for_user(user_id, content)
\ No newline at end of file
+    return UserProgress.load(user_id).can_access(content_id)
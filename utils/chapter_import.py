@@ -0,0 +1,242 @@
+"""
+Bulk import of a whole event's chapters from one JSON bundle.
+
+    {"chapters": [
+        {"chapter_number": 1, "title": "The Letter",
+         "panels": ["https://res.cloudinary.com/.../p1.png", "/media/panels/ab12.png"],
+         "unlock_time": "2025-01-15T00:00:00",
+         "is_unlocked": true, "requires_previous_completion": false},
+        ...
+    ]}
+
+The whole bundle is validated and normalised in one pass before anything
+is written; an invalid bundle changes nothing. Chapters are matched to
+existing `contents` rows by `chapter_number`: new numbers are inserted,
+existing ones are replaced in place (their attempts stay attached), and
+chapters missing from the bundle are left alone. Writes are one batched
+INSERT and one batched UPDATE in a single transaction, with one catalog
+version bump. A dry run returns the same diff without writing.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert, update
+
+from models import Content, db
+from utils import panel_store
+from utils.content_catalog import bump_catalog_version, catalog
+from utils.panel_manifest import compile_manifest, manifest_to_json, panels_from_json
+
+# Fields compared for the diff, in display order
+DIFF_FIELDS = (
+    "title", "panels", "unlock_time", "is_unlocked", "requires_previous_completion",
+)
+
+
+class BundleError(ValueError):
+    """The bundle failed validation; `errors` lists every problem found."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class ImportedChapter(NamedTuple):
+    chapter_number: int
+    title: str
+    panels: Tuple[str, ...]
+    unlock_time: Optional[datetime]
+    is_unlocked: bool
+    requires_previous_completion: bool
+
+
+class ChapterChange(NamedTuple):
+    chapter_number: int
+    action: str                     # "create" | "update" | "unchanged"
+    content_id: Optional[int]
+    changed: Tuple[str, ...]        # DIFF_FIELDS that differ (updates only)
+
+
+# ---------------- VALIDATION ---------------- #
+
+def _normalise_panel(value: Any, where: str, errors: List[str]) -> Optional[str]:
+    if not isinstance(value, str) or not value.strip():
+        errors.append(f"{where}: must be a non-empty string")
+        return None
+    url = value.strip()
+    if url.startswith(("http://", "https://")):
+        return url
+    if url.startswith(panel_store.PANEL_URL_PREFIX):
+        if panel_store.describe(url) is None:
+            errors.append(f"{where}: no uploaded panel at {url}")
+            return None
+        return url
+    errors.append(f"{where}: must be an http(s) URL or an uploaded /media/panels/ URL")
+    return None
+
+
+def _flag(entry: dict, key: str, default: bool, where: str, errors: List[str]) -> bool:
+    value = entry.get(key, default)
+    if not isinstance(value, bool):
+        errors.append(f"{where}.{key}: must be true or false")
+        return default
+    return value
+
+
+def parse_bundle(data: Any) -> List[ImportedChapter]:
+    """Validate and normalise a decoded bundle. Raises BundleError."""
+    if isinstance(data, dict):
+        data = data.get("chapters")
+    if not isinstance(data, list) or not data:
+        raise BundleError(['Expected {"chapters": [...]} or a non-empty list of chapters'])
+
+    errors: List[str] = []
+    chapters: List[ImportedChapter] = []
+    seen: Dict[int, int] = {}
+
+    for i, entry in enumerate(data):
+        where = f"chapters[{i}]"
+        if not isinstance(entry, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+
+        number = entry.get("chapter_number")
+        if isinstance(number, bool) or not isinstance(number, int) or number < 1:
+            errors.append(f"{where}.chapter_number: must be a positive integer")
+            number = None
+        elif number in seen:
+            errors.append(f"{where}.chapter_number: {number} already used by chapters[{seen[number]}]")
+        else:
+            seen[number] = i
+
+        title = entry.get("title")
+        if not isinstance(title, str) or not title.strip():
+            errors.append(f"{where}.title: required")
+
+        raw_panels = entry.get("panels", [])
+        if not isinstance(raw_panels, list):
+            errors.append(f"{where}.panels: must be a list of URLs")
+            raw_panels = []
+        panels = [
+            _normalise_panel(p, f"{where}.panels[{j}]", errors)
+            for j, p in enumerate(raw_panels)
+        ]
+
+        unlock_time = None
+        raw_unlock = entry.get("unlock_time")
+        if raw_unlock is not None:
+            try:
+                unlock_time = datetime.fromisoformat(raw_unlock)
+                if unlock_time.tzinfo is not None:
+                    # Stored naive, in UTC like every other timestamp
+                    unlock_time = unlock_time.astimezone(timezone.utc).replace(tzinfo=None)
+            except (TypeError, ValueError):
+                errors.append(f"{where}.unlock_time: must be an ISO datetime or null")
+
+        is_unlocked = _flag(entry, "is_unlocked", True, where, errors)
+        requires_previous = _flag(entry, "requires_previous_completion", False, where, errors)
+
+        if number is not None and isinstance(title, str):
+            chapters.append(ImportedChapter(
+                chapter_number=number,
+                title=title.strip(),
+                panels=tuple(p for p in panels if p is not None),
+                unlock_time=unlock_time,
+                is_unlocked=is_unlocked,
+                requires_previous_completion=requires_previous,
+            ))
+
+    if errors:
+        raise BundleError(errors)
+    return chapters
+
+
+def parse_bundle_text(text: str) -> List[ImportedChapter]:
+    try:
+        data = json.loads(text)
+    except ValueError as exc:
+        raise BundleError([f"Not valid JSON: {exc}"])
+    return parse_bundle(data)
+
+
+# ---------------- DIFF + APPLY ---------------- #
+
+def _current_values(c: Content) -> Dict[str, Any]:
+    return {
+        "title": c.title,
+        "panels": tuple(panels_from_json(c.panels_json)),
+        "unlock_time": c.unlock_time,
+        "is_unlocked": bool(c.is_unlocked),
+        "requires_previous_completion": bool(c.requires_previous_completion),
+    }
+
+
+def _row_values(chapter: ImportedChapter) -> Dict[str, Any]:
+    panels = list(chapter.panels)
+    return {
+        "title": chapter.title,
+        "chapter_number": chapter.chapter_number,
+        "unlock_time": chapter.unlock_time,
+        "is_unlocked": chapter.is_unlocked,
+        "requires_previous_completion": chapter.requires_previous_completion,
+        "panels_json": json.dumps({"panels": panels}) if panels else None,
+        "panel_manifest": manifest_to_json(compile_manifest(panels)) if panels else None,
+    }
+
+
+def import_chapters(chapters: List[ImportedChapter], dry_run: bool = False) -> List[ChapterChange]:
+    """
+    Diff `chapters` against `contents` and, unless `dry_run`, apply the
+    diff and commit. Raises BundleError if a chapter number matches more
+    than one existing row.
+    """
+    numbers = [c.chapter_number for c in chapters]
+    existing: Dict[int, List[Content]] = {}
+    for row in Content.query.filter(Content.chapter_number.in_(numbers)).order_by(Content.id):
+        existing.setdefault(row.chapter_number, []).append(row)
+
+    ambiguous = sorted(n for n, rows in existing.items() if len(rows) > 1)
+    if ambiguous:
+        raise BundleError([
+            f"chapter_number {n} matches several existing chapters; delete the extras first"
+            for n in ambiguous
+        ])
+
+    changes: List[ChapterChange] = []
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+
+    for chapter in sorted(chapters, key=lambda c: c.chapter_number):
+        rows = existing.get(chapter.chapter_number)
+        if not rows:
+            changes.append(ChapterChange(chapter.chapter_number, "create", None, ()))
+            if not dry_run:
+                inserts.append({**_row_values(chapter), "time_limit": 0})
+            continue
+
+        current = rows[0]
+        old = _current_values(current)
+        changed = tuple(f for f in DIFF_FIELDS if old[f] != getattr(chapter, f))
+        changes.append(ChapterChange(
+            chapter.chapter_number,
+            "update" if changed else "unchanged",
+            current.id,
+            changed,
+        ))
+        if changed and not dry_run:
+            updates.append({"id": current.id, **_row_values(chapter)})
+
+    if dry_run or not (inserts or updates):
+        db.session.rollback()
+        return changes
+
+    if inserts:
+        db.session.execute(insert(Content), inserts)
+    if updates:
+        db.session.execute(update(Content), updates)
+    bump_catalog_version()
+    db.session.commit()
+    catalog.invalidate()
+    return changes
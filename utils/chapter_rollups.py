@@ -0,0 +1,205 @@
+"""
+Per-chapter funnel and solve-time rollups for the admin dashboard.
+
+`chapter_stats` counts starts and completions per chapter. Solve times
+(`time_taken` of completed attempts) go into a log-bucketed quantile
+sketch in `chapter_time_buckets`, in the style of DDSketch. A time `t`
+falls in bucket `ceil(log(t) / log(gamma))`, and every value in a bucket
+is within RELATIVE_ACCURACY of the bucket's representative value, so the
+median and p90 read from the counts are within 2% of the exact ones. The
+sketch is mergeable: recording a time is one `count + 1` upsert, and a
+rebuild simply sums counts.
+
+The counters are kept up to date by `get_or_start_attempt` (starts) and
+`/submit` (completions via placements, solve times here). `flask
+rebuild-rollups` recomputes everything from `attempts`.
+"""
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import func, select, update
+
+from models import Attempt, ChapterStats, ChapterTimeBucket, db
+from utils.upserts import dialect_insert
+
+RELATIVE_ACCURACY = 0.02
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+# Bucket for times under a second (0 s); log() needs a positive value
+ZERO_BUCKET = -1
+
+REBUILD_BATCH_SIZE = 5000
+
+
+# ---------------- SKETCH ---------------- #
+
+def bucket_for(seconds: float) -> int:
+    if seconds < 1:
+        return ZERO_BUCKET
+    return math.ceil(math.log(seconds) / _LOG_GAMMA)
+
+
+def bucket_value(bucket: int) -> float:
+    """Representative value of a bucket (relative error <= RELATIVE_ACCURACY)."""
+    if bucket == ZERO_BUCKET:
+        return 0.0
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+
+def quantile(counts: Dict[int, int], q: float) -> Optional[float]:
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bucket in sorted(counts):
+        seen += counts[bucket]
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(max(counts))
+
+
+# ---------------- INCREMENTAL UPDATES ---------------- #
+
+def create_stats_row(content_id: int, attempt_id: int, count_own_start: bool) -> None:
+    """
+    Create a chapter's counters from what is already on record. The
+    attempt being processed is left out of `completions` (its caller
+    increments that) and, unless `count_own_start`, out of `starts`.
+    A concurrent creator wins harmlessly: each caller then increments.
+    """
+    others = (Attempt.content_id == content_id, Attempt.id != attempt_id)
+    started = select(func.count(Attempt.id)).where(*others).scalar_subquery()
+    completed = (
+        select(func.count(Attempt.id))
+        .where(*others, Attempt.completed == True)   # noqa: E712
+        .scalar_subquery()
+    )
+    stmt = dialect_insert(ChapterStats).values(
+        content_id=content_id,
+        completions=completed,
+        starts=started + 1 if count_own_start else started,
+    ).on_conflict_do_nothing(index_elements=["content_id"])
+    db.session.execute(stmt)
+
+
+def _increment_starts(content_id: int):
+    return db.session.execute(
+        update(ChapterStats)
+        .where(ChapterStats.content_id == content_id)
+        .values(starts=ChapterStats.starts + 1)
+        .returning(ChapterStats.starts)
+    ).scalar()
+
+
+def record_start(content_id: int, attempt_id: int) -> None:
+    """Count a newly created attempt; the caller commits."""
+    if _increment_starts(content_id) is None:
+        create_stats_row(content_id, attempt_id, count_own_start=False)
+        _increment_starts(content_id)
+
+
+def record_solve_time(content_id: int, seconds: int) -> None:
+    """Add a completed attempt's time to the chapter's sketch; the caller commits."""
+    stmt = dialect_insert(ChapterTimeBucket).values(
+        content_id=content_id,
+        bucket=bucket_for(seconds),
+        count=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["content_id", "bucket"],
+        set_={"count": ChapterTimeBucket.count + 1},
+    )
+    db.session.execute(stmt)
+
+
+# ---------------- READING ---------------- #
+
+class ChapterRollup(NamedTuple):
+    content_id: int
+    starts: int
+    completions: int
+    median_time: Optional[float]
+    p90_time: Optional[float]
+
+    @property
+    def completion_rate(self) -> Optional[float]:
+        return self.completions / self.starts if self.starts else None
+
+
+def chapter_rollups() -> Dict[int, ChapterRollup]:
+    """Every chapter's funnel and solve-time percentiles, keyed by content id."""
+    sketches: Dict[int, Dict[int, int]] = {}
+    for content_id, bucket, count in db.session.query(
+        ChapterTimeBucket.content_id, ChapterTimeBucket.bucket, ChapterTimeBucket.count
+    ):
+        sketches.setdefault(content_id, {})[bucket] = count
+
+    rollups = {}
+    for content_id, starts, completions in db.session.query(
+        ChapterStats.content_id, ChapterStats.starts, ChapterStats.completions
+    ):
+        sketch = sketches.get(content_id, {})
+        rollups[content_id] = ChapterRollup(
+            content_id, starts, completions,
+            quantile(sketch, 0.5), quantile(sketch, 0.9),
+        )
+    return rollups
+
+
+# ---------------- REBUILD ---------------- #
+
+def _attempt_batches(batch_size: int) -> Iterable[List[tuple]]:
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(Attempt.id, Attempt.content_id, Attempt.completed, Attempt.time_taken)
+            .where(Attempt.id > last_id)
+            .order_by(Attempt.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def rebuild_rollups(batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    Recompute every chapter's counters and sketch by replaying `attempts`
+    in id order, `batch_size` rows at a time. Returns the attempts seen;
+    the caller commits. Run it while no one is submitting, since
+    `completions` is also the placement sequence.
+    """
+    starts: Dict[int, int] = {}
+    completions: Dict[int, int] = {}
+    sketches: Dict[int, Dict[int, int]] = {}
+    seen = 0
+
+    for batch in _attempt_batches(batch_size):
+        for _, content_id, completed, time_taken in batch:
+            starts[content_id] = starts.get(content_id, 0) + 1
+            if completed:
+                completions[content_id] = completions.get(content_id, 0) + 1
+                if time_taken is not None:
+                    sketch = sketches.setdefault(content_id, {})
+                    bucket = bucket_for(time_taken)
+                    sketch[bucket] = sketch.get(bucket, 0) + 1
+        seen += len(batch)
+
+    db.session.execute(ChapterTimeBucket.__table__.delete())
+    db.session.execute(ChapterStats.__table__.delete())
+    if starts:
+        db.session.execute(ChapterStats.__table__.insert(), [
+            {"content_id": cid, "starts": n, "completions": completions.get(cid, 0)}
+            for cid, n in starts.items()
+        ])
+    rows = [
+        {"content_id": cid, "bucket": bucket, "count": count}
+        for cid, sketch in sketches.items() for bucket, count in sketch.items()
+    ]
+    if rows:
+        db.session.execute(ChapterTimeBucket.__table__.insert(), rows)
+    return seen
@@ -0,0 +1,160 @@
+"""
+In-process cache of the chapter catalog.
+
+Chapters only change through the admin write paths, so every worker keeps
+an immutable copy of the `contents` table in memory. Each admin write bumps
+`catalog_state.version` in the same transaction; workers compare that
+single integer (at most once per CATALOG_CHECK_INTERVAL) and reload the
+whole catalog when it moves.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from config import config
+from models import CatalogState, Content, db
+from utils.panel_manifest import (
+    PanelManifest,
+    compile_manifest,
+    manifest_from_json,
+    panels_from_json,
+)
+from utils.upserts import dialect_insert
+
+
+class ChapterRecord(NamedTuple):
+    """Immutable, slotted copy of one `contents` row."""
+
+    id: int
+    title: str
+    time_limit: int
+    is_unlocked: bool
+    chapter_number: int
+    unlock_time: Optional[datetime]
+    requires_previous_completion: bool
+    manifest: PanelManifest
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, c: Content) -> "ChapterRecord":
+        return cls(
+            id=c.id,
+            title=c.title,
+            time_limit=c.time_limit,
+            is_unlocked=bool(c.is_unlocked),
+            chapter_number=c.chapter_number,
+            unlock_time=c.unlock_time,
+            requires_previous_completion=bool(c.requires_previous_completion),
+            manifest=(
+                manifest_from_json(c.panel_manifest)
+                or compile_manifest(panels_from_json(c.panels_json))
+            ),
+            created_at=c.created_at,
+        )
+
+
+def read_catalog_version() -> int:
+    version = (
+        db.session.query(CatalogState.version)
+        .filter(CatalogState.id == 1)
+        .scalar()
+    )
+    return int(version or 0)
+
+
+def bump_catalog_version() -> None:
+    """
+    Increment the catalog version inside the caller's transaction. One
+    upsert, so concurrent first bumps on a database without the row (a
+    `create_all` schema) cannot both insert it.
+    """
+    stmt = dialect_insert(CatalogState).values(id=1, version=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={"version": CatalogState.version + 1},
+    ))
+
+
+class ContentCatalog:
+    """Version-checked, process-local cache of every chapter record."""
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._records: Tuple[ChapterRecord, ...] = ()
+        self._by_id: Dict[int, ChapterRecord] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    # ── Freshness ────────────────────────────────────────────────────────────
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if (
+            self._version is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            self.hits += 1
+            return
+
+        version = read_catalog_version()
+        # A lagging read replica can report an older version; keep ours
+        if self._version is not None and version <= self._version:
+            self._checked_at = now
+            self.hits += 1
+            return
+
+        self.misses += 1
+        self._reload(version, now)
+
+    def _reload(self, version: int, now: float) -> None:
+        rows = Content.query.order_by(
+            Content.chapter_number.asc(),
+            Content.id.asc(),
+        ).all()
+        records = tuple(ChapterRecord.from_row(c) for c in rows)
+
+        with self._lock:
+            self._records = records
+            self._by_id = {r.id: r for r in records}
+            self._version = version
+            self._checked_at = now
+
+    def invalidate(self) -> None:
+        """Force a version check on the next read (used after admin writes)."""
+        with self._lock:
+            self._version = None
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    @property
+    def version(self) -> int:
+        self._ensure_fresh()
+        return self._version or 0
+
+    def records(self) -> Tuple[ChapterRecord, ...]:
+        """All chapters, ordered by chapter number then id."""
+        self._ensure_fresh()
+        return self._records
+
+    def get(self, content_id: int) -> Optional[ChapterRecord]:
+        self._ensure_fresh()
+        return self._by_id.get(content_id)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "version": self._version or 0,
+            "records": len(self._records),
+        }
+
+
+catalog = ContentCatalog(check_interval=config.CATALOG_CHECK_INTERVAL)
@@ -0,0 +1,96 @@
+"""
+Read-replica routing.
+
+With DATABASE_REPLICA_URL set, the replica is registered as the
+"replica" bind and `db.session` (a RoutingSession) chooses an engine per
+statement:
+
+- Views decorated with `@read_only` read from the replica.
+- Everything else, and any flush or INSERT/UPDATE/DELETE, goes to the
+  primary. A read-only view that writes stays on the primary for the rest
+  of the request.
+- Read-your-writes: a request that wrote stamps the player's session, and
+  for REPLICA_STICKY_SECONDS after that their read-only views use the
+  primary too, so the /chapters page after a submit shows the new result
+  even while the replica lags.
+- Code that must not see replica lag wraps its reads in `primary()`.
+
+Without a replica nothing changes: every statement uses the primary.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from flask import Flask, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+
+from config import config
+
+REPLICA_BIND = "replica"
+
+# Flask session key: time until which this player's reads use the primary
+STICKY_SESSION_KEY = "db_primary_until"
+
+
+def replica_enabled() -> bool:
+    return bool(config.SQLALCHEMY_DATABASE_REPLICA_URI)
+
+
+def read_only(view):
+    """Route the view's reads to the replica (when one is configured)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary() -> Iterator[None]:
+    """Send reads inside the block to the primary, even in a read-only view."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get("db_force_primary", False)
+    g.db_force_primary = True
+    try:
+        yield
+    finally:
+        g.db_force_primary = previous
+
+
+def _use_replica() -> bool:
+    if not has_request_context() or not g.get("db_read_only"):
+        return False
+    if g.get("db_force_primary") or g.get("db_wrote"):
+        return False
+    return session.get(STICKY_SESSION_KEY, 0) <= time.time()
+
+
+class RoutingSession(Session):
+    """`db.session` class: picks the replica for reads in read-only views."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and REPLICA_BIND in self._db.engines:
+            if self._flushing or getattr(clause, "is_dml", False):
+                if has_request_context():
+                    g.db_wrote = True
+            elif _use_replica():
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_db_routing(app: Flask) -> None:
+    if not replica_enabled():
+        return
+    app.config.setdefault("SQLALCHEMY_BINDS", {})[REPLICA_BIND] = (
+        config.SQLALCHEMY_DATABASE_REPLICA_URI
+    )
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get("db_wrote"):
+            session[STICKY_SESSION_KEY] = time.time() + config.REPLICA_STICKY_SECONDS
+        return response
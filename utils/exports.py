@@ -0,0 +1,119 @@
+"""
+Streaming exports of every attempt, and of the leaderboard, as CSV or NDJSON.
+
+Exports select plain columns (no ORM entities, so nothing accumulates
+in the session's identity map) and run with `yield_per` +
+`stream_results`: a server-side cursor on PostgreSQL, incremental fetches
+on SQLite. Rows are written out one batch at a time, so memory stays flat
+however many rows there are. Attempt filters are the attempts view's
+(utils/attempt_filters.py); the leaderboard is read from `users.total_score`
+in the in-memory ranked index's order (score descending, then user id).
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, List
+
+from sqlalchemy import select
+
+from models import Attempt, Content, User, db
+from utils.attempt_filters import AttemptFilters, apply_attempt_filters
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "attempt_id", "user_id", "name", "email", "chapter_number", "title",
+    "start_time", "end_time", "time_taken", "completed", "score",
+)
+
+# Built once: json.dumps(..., default=...) would build an encoder per row
+_json = json.JSONEncoder(default=datetime.isoformat, separators=(",", ":"))
+
+
+LEADERBOARD_COLUMNS = ("rank", "user_id", "name", "email", "total_score")
+
+
+# ---------------- STREAMING ---------------- #
+
+def _stream_batches(stmt) -> Iterator[List[tuple]]:
+    result = db.session.execute(
+        stmt.execution_options(yield_per=EXPORT_BATCH_SIZE, stream_results=True)
+    )
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _export_batches(filters: AttemptFilters) -> Iterator[List[tuple]]:
+    return _stream_batches(apply_attempt_filters(
+        select(
+            Attempt.id, User.id, User.name, User.email,
+            Content.chapter_number, Content.title,
+            Attempt.start_time, Attempt.end_time, Attempt.time_taken,
+            Attempt.completed, Attempt.score,
+        )
+        .join(User, Attempt.user_id == User.id)
+        .join(Content, Attempt.content_id == Content.id),
+        filters,
+    ).order_by(Attempt.start_time, Attempt.id))
+
+
+def _leaderboard_batches() -> Iterator[List[tuple]]:
+    rank = 0
+    for batch in _stream_batches(
+        select(User.id, User.name, User.email, User.total_score)
+        .order_by(User.total_score.desc(), User.id)
+    ):
+        yield [(rank + i, *row) for i, row in enumerate(batch, 1)]
+        rank += len(batch)
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Player-entered text must not be read as a formula by spreadsheets
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+def _stream_csv(columns, batches: Iterator[List[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(v) for v in row] for row in batch)
+        yield buffer.getvalue()
+
+
+def _stream_ndjson(columns, batches: Iterator[List[tuple]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            _json.encode(dict(zip(columns, row))) + "\n"
+            for row in batch
+        )
+
+
+def stream_attempts_csv(filters: AttemptFilters) -> Iterator[str]:
+    return _stream_csv(EXPORT_COLUMNS, _export_batches(filters))
+
+
+def stream_attempts_ndjson(filters: AttemptFilters) -> Iterator[str]:
+    return _stream_ndjson(EXPORT_COLUMNS, _export_batches(filters))
+
+
+def stream_leaderboard_csv() -> Iterator[str]:
+    return _stream_csv(LEADERBOARD_COLUMNS, _leaderboard_batches())
+
+
+def stream_leaderboard_ndjson() -> Iterator[str]:
+    return _stream_ndjson(LEADERBOARD_COLUMNS, _leaderboard_batches())
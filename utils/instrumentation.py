@@ -0,0 +1,191 @@
+"""
+Per-request instrumentation.
+
+For every request this records the number of SQL statements and the time
+spent in them (SQLAlchemy engine events), the time spent rendering
+templates (Flask's template signals) and the time spent in the
+`inject_user_score` context processor. The totals are sent back in a
+`Server-Timing` header, which browser dev tools display per request:
+
+    Server-Timing: db;dur=1.84;desc="3 queries", tpl;dur=4.10, ctx;dur=0.05, app;dur=7.92
+
+SERVER_TIMING decides who gets the header: admin sessions by default,
+since the timings tell an anonymous client how much work a request did.
+Every request is also written as one JSON log line on the `app.requests`
+logger. With QUERY_BUDGET set, requests issuing more statements than that are also
+logged as warnings, with the statements, so N+1 patterns show up in logs.
+"""
+
+import functools
+import json
+import logging
+import sys
+import time
+from typing import List, Optional
+
+from flask import Flask, g, has_request_context, request, session
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import config
+
+log = logging.getLogger("app.requests")
+
+# Statements kept per request when a query budget is set
+MAX_LOGGED_STATEMENTS = 50
+
+
+class RequestTimings:
+    __slots__ = (
+        "started", "queries", "db_time", "render_time", "ctx_time",
+        "_render_starts", "statements",
+    )
+
+    def __init__(self, keep_statements: bool):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.ctx_time = 0.0
+        self._render_starts: List[float] = []
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f"tpl;dur={self.render_time * 1000:.2f}, "
+            f"ctx;dur={self.ctx_time * 1000:.2f}, "
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+def current_timings() -> Optional[RequestTimings]:
+    if not has_request_context():
+        return None
+    return g.get("request_timings")
+
+
+# ---------------- SQL ---------------- #
+
+# The start time lives on the statement's execution context, not on the
+# pooled connection, so a statement that raises leaves nothing behind.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_timings() is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings()
+    started = getattr(context, "_query_started", None)
+    if timings is None or started is None:
+        return
+    timings.db_time += time.perf_counter() - started
+    timings.queries += 1
+    if timings.statements is not None and len(timings.statements) < MAX_LOGGED_STATEMENTS:
+        timings.statements.append(" ".join(statement.split())[:200])
+
+
+_engine_hooks_installed = False
+
+
+def _install_engine_hooks() -> None:
+    # Listening on the Engine class covers every engine, once per process
+    global _engine_hooks_installed
+    if not _engine_hooks_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _engine_hooks_installed = True
+
+
+# ---------------- TEMPLATES ---------------- #
+
+def _before_render(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None:
+        timings._render_starts.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None and timings._render_starts:
+        started = timings._render_starts.pop()
+        if not timings._render_starts:      # only count the outermost render
+            timings.render_time += time.perf_counter() - started
+
+
+def timed_context_processor(fn):
+    """Add a context processor's run time to the request's `ctx` timing."""
+
+    @functools.wraps(fn)
+    def wrapper():
+        started = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            timings = current_timings()
+            if timings is not None:
+                timings.ctx_time += time.perf_counter() - started
+
+    return wrapper
+
+
+# ---------------- REQUEST HOOKS ---------------- #
+
+def _send_server_timing() -> bool:
+    if config.SERVER_TIMING == "admin":
+        return bool(session.get("is_admin"))
+    return config.SERVER_TIMING == "1"
+
+
+def _start_request():
+    g.request_timings = RequestTimings(keep_statements=config.QUERY_BUDGET > 0)
+
+
+def _finish_request(response):
+    timings = g.pop("request_timings", None)
+    if timings is None:
+        return response
+
+    total = time.perf_counter() - timings.started
+    if _send_server_timing():
+        response.headers["Server-Timing"] = timings.server_timing(total)
+
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    record = {
+        "event": "request",
+        "method": request.method,
+        "path": request.path,
+        "route": rule,
+        "status": response.status_code,
+        "dur_ms": round(total * 1000, 2),
+        "queries": timings.queries,
+        "db_ms": round(timings.db_time * 1000, 2),
+        "tpl_ms": round(timings.render_time * 1000, 2),
+        "ctx_ms": round(timings.ctx_time * 1000, 2),
+    }
+    log.info(json.dumps(record))
+
+    if config.QUERY_BUDGET and timings.queries > config.QUERY_BUDGET:
+        record["event"] = "query_budget_exceeded"
+        record["budget"] = config.QUERY_BUDGET
+        record["statements"] = timings.statements
+        log.warning(json.dumps(record))
+
+    return response
+
+
+def init_instrumentation(app: Flask) -> None:
+    _install_engine_hooks()
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    if config.REQUEST_LOG and not log.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
@@ -0,0 +1,345 @@
+"""
+Incrementally maintained leaderboard.
+
+Each worker seeds a ranked index from `users.total_score` once, then keeps
+it current in two ways:
+- the worker handling a scoring submit applies the new total immediately;
+- every LEADERBOARD_SYNC_INTERVAL seconds a read pulls only the users whose
+  `score_updated_at` moved (indexed), which covers the other workers.
+
+Ranks are kept in an indexable skip list, so top-K, page N and "rank of
+user X" are all O(log n) and never touch `attempts`. Users whose score
+changed after seeding are journaled for `take_changes` (the live
+dashboard stream).
+"""
+
+import base64
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from config import config
+from models import User, db
+from utils.db_routing import primary
+
+# Re-read this far behind the newest stamp seen, so commits that land late
+# (or come from a worker with a slightly different clock) are not missed.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+# ---------------- ORDER-STATISTICS INDEX ---------------- #
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Any, levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        # width[i] = how many positions node.next[i] is ahead of this node
+        self.width: List[int] = [1] * levels
+
+
+class RankedSet:
+    """
+    Sorted set with O(log n) insert, remove, rank and positional access
+    (an indexable skip list).
+    """
+
+    MAX_LEVELS = 24
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVELS)
+        self._size = 0
+
+    @classmethod
+    def from_sorted(cls, keys: Iterator[Any]) -> "RankedSet":
+        """Build in O(n) from keys that are already in ascending order."""
+        ranked = cls()
+        last = [ranked._head] * cls.MAX_LEVELS
+        last_pos = [0] * cls.MAX_LEVELS
+        pos = 0
+
+        for pos, key in enumerate(keys, 1):
+            node = _Node(key, ranked._random_levels())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = pos - last_pos[level]
+                last[level] = node
+                last_pos[level] = pos
+
+        for level in range(cls.MAX_LEVELS):
+            last[level].width[level] = pos + 1 - last_pos[level]
+
+        ranked._size = pos
+        return ranked
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_levels(self) -> int:
+        levels = 1
+        while levels < self.MAX_LEVELS and random.random() < 0.5:
+            levels += 1
+        return levels
+
+    def _find(self, key: Any, inclusive: bool = False) -> Tuple[List[_Node], List[int]]:
+        """Predecessor at every level and its position (head = 0)."""
+        chain = [self._head] * self.MAX_LEVELS
+        positions = [0] * self.MAX_LEVELS
+        node, pos = self._head, 0
+
+        for level in reversed(range(self.MAX_LEVELS)):
+            while True:
+                nxt = node.next[level]
+                if nxt is None:
+                    break
+                if nxt.key < key or (inclusive and nxt.key == key):
+                    pos += node.width[level]
+                    node = nxt
+                else:
+                    break
+            chain[level] = node
+            positions[level] = pos
+
+        return chain, positions
+
+    def insert(self, key: Any) -> None:
+        chain, positions = self._find(key)
+        new_pos = positions[0] + 1
+        levels = self._random_levels()
+        node = _Node(key, levels)
+
+        for level in range(levels):
+            prev = chain[level]
+            node.next[level] = prev.next[level]
+            node.width[level] = prev.width[level] + positions[level] + 1 - new_pos
+            prev.next[level] = node
+            prev.width[level] = new_pos - positions[level]
+
+        for level in range(levels, self.MAX_LEVELS):
+            chain[level].width[level] += 1
+
+        self._size += 1
+
+    def remove(self, key: Any) -> None:
+        chain, _ = self._find(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        levels = len(target.next)
+        for level in range(levels):
+            prev = chain[level]
+            prev.next[level] = target.next[level]
+            prev.width[level] += target.width[level] - 1
+
+        for level in range(levels, self.MAX_LEVELS):
+            chain[level].width[level] -= 1
+
+        self._size -= 1
+
+    def bisect_left(self, key: Any) -> int:
+        """Number of keys strictly less than `key` (i.e. its 0-based rank)."""
+        _, positions = self._find(key)
+        return positions[0]
+
+    def bisect_right(self, key: Any) -> int:
+        """Number of keys less than or equal to `key`."""
+        _, positions = self._find(key, inclusive=True)
+        return positions[0]
+
+    def _node_at(self, index: int) -> Optional[_Node]:
+        target = index + 1
+        node, pos = self._head, 0
+        for level in reversed(range(self.MAX_LEVELS)):
+            while node.next[level] is not None and pos + node.width[level] <= target:
+                pos += node.width[level]
+                node = node.next[level]
+        return node if pos == target else None
+
+    def iter_from(self, index: int) -> Iterator[Any]:
+        if index < 0 or index >= self._size:
+            return
+        node = self._node_at(index)
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+# ---------------- LEADERBOARD ---------------- #
+
+class LeaderboardEntry(NamedTuple):
+    user_id: int
+    name: str
+    email: str
+    total_score: float
+
+
+class LeaderboardRow(NamedTuple):
+    rank: int
+    user_id: int
+    name: str
+    email: str
+    total_score: float
+
+
+def _sort_key(user_id: int, score: float) -> Tuple[float, int]:
+    # Highest score first; ties broken by registration order
+    return (-score, user_id)
+
+
+def encode_cursor(row: LeaderboardRow) -> str:
+    raw = f"{row.total_score!r}:{row.user_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[float, int]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, user_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        return _sort_key(int(user_id), float(score))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class Leaderboard:
+    """Process-local ranked view of every user's total score."""
+
+    def __init__(self, sync_interval: float = 1.0):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._ranked = RankedSet()
+        self._entries: Dict[int, LeaderboardEntry] = {}
+        self._watermark: Optional[datetime] = None
+        self._synced_at = 0.0
+        self._seeded = False
+        self._changed: Set[int] = set()
+
+    # ── Maintenance ──────────────────────────────────────────────────────────
+
+    def _apply(self, user_id: int, name: str, email: str, score: float) -> None:
+        score = float(score or 0)
+        old = self._entries.get(user_id)
+        if old is not None and old.total_score != score:
+            self._ranked.remove(_sort_key(user_id, old.total_score))
+        if old is None or old.total_score != score:
+            self._ranked.insert(_sort_key(user_id, score))
+            self._changed.add(user_id)
+        self._entries[user_id] = LeaderboardEntry(user_id, name, email, score)
+
+    def record(self, user_id: int, name: str, email: str, total_score: float) -> None:
+        """Apply a total this worker just committed."""
+        if not self._seeded:
+            return
+        with self._lock:
+            self._apply(user_id, name, email, total_score)
+
+    def sync(self, force: bool = False) -> None:
+        """Seed on first use, then pull only users whose score moved."""
+        now = time.monotonic()
+        if self._seeded and not force and now - self._synced_at < self.sync_interval:
+            return
+
+        query = db.session.query(
+            User.id,
+            User.name,
+            User.email,
+            User.total_score,
+            User.score_updated_at,
+        )
+        if self._seeded and self._watermark is not None:
+            query = query.filter(
+                User.score_updated_at >= self._watermark - SYNC_OVERLAP
+            )
+        # Always the primary: rows a lagging replica has not applied yet
+        # could fall behind the watermark and never be pulled
+        with primary():
+            rows = query.all()
+
+        with self._lock:
+            if not self._seeded:
+                self._entries = {
+                    r[0]: LeaderboardEntry(r[0], r[1], r[2], float(r[3] or 0))
+                    for r in rows
+                }
+                self._ranked = RankedSet.from_sorted(sorted(
+                    _sort_key(e.user_id, e.total_score)
+                    for e in self._entries.values()
+                ))
+
+            for user_id, name, email, score, stamped in rows:
+                if self._seeded:
+                    self._apply(user_id, name, email, score)
+                if stamped is not None and (
+                    self._watermark is None or stamped > self._watermark
+                ):
+                    self._watermark = stamped
+            self._seeded = True
+            self._synced_at = now
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ranked = RankedSet()
+            self._entries = {}
+            self._watermark = None
+            self._seeded = False
+            self._changed = set()
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        self.sync()
+        return len(self._ranked)
+
+    def _rows_from(self, start: int, limit: int) -> List[LeaderboardRow]:
+        rows = []
+        for offset, (_, user_id) in enumerate(self._ranked.iter_from(start)):
+            if offset >= limit:
+                break
+            e = self._entries[user_id]
+            rows.append(LeaderboardRow(
+                start + offset + 1, e.user_id, e.name, e.email, e.total_score
+            ))
+        return rows
+
+    def top(self, k: int) -> List[LeaderboardRow]:
+        return self.page(1, k)
+
+    def page(self, number: int, size: int) -> List[LeaderboardRow]:
+        self.sync()
+        with self._lock:
+            return self._rows_from((max(number, 1) - 1) * size, size)
+
+    def after(self, cursor: Optional[str], limit: int) -> List[LeaderboardRow]:
+        """Rows strictly after the row a cursor was issued for."""
+        self.sync()
+        key = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            start = self._ranked.bisect_right(key) if key else 0
+            return self._rows_from(start, limit)
+
+    def rank_of(self, user_id: int) -> Optional[LeaderboardRow]:
+        self.sync()
+        with self._lock:
+            e = self._entries.get(user_id)
+            if e is None:
+                return None
+            rank = self._ranked.bisect_left(_sort_key(user_id, e.total_score)) + 1
+            return LeaderboardRow(rank, e.user_id, e.name, e.email, e.total_score)
+
+    def take_changes(self) -> List[LeaderboardRow]:
+        """Current rows of every user whose score moved since the last call."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            rows = []
+            for user_id in changed:
+                e = self._entries[user_id]
+                rank = self._ranked.bisect_left(_sort_key(user_id, e.total_score)) + 1
+                rows.append(LeaderboardRow(rank, e.user_id, e.name, e.email, e.total_score))
+        rows.sort(key=lambda r: r.rank)
+        return rows
+
+
+leaderboard = Leaderboard(sync_interval=config.LEADERBOARD_SYNC_INTERVAL)
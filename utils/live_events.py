@@ -0,0 +1,324 @@
+"""
+Live dashboard events over Server-Sent Events.
+
+One publisher thread per process fans changes out to every dashboard
+connected to that process:
+- `leaderboard`: rows (with their new ranks) of players whose total moved,
+  taken from the leaderboard's own incremental sync;
+- `solves`: "chapter N solved by M players", read from `chapter_stats`.
+
+Nothing is read on a fixed schedule. Every committed score change calls
+`mark_changed()`, which stamps LIVE_MARKER_FILE; the publisher checks the
+stamp (a stat, no query) every LIVE_POLL_INTERVAL and only syncs the
+leaderboard and re-reads the solve counts when it moved. That read also
+rebuilds the publisher's cached snapshot, which is what streams start
+from and what polling dashboards are served, so the database work per
+change is the same however many dashboards are open, and none while
+nothing changes. With no dashboard streaming or polling the publisher
+does nothing at all.
+
+Events carry ids of the form `<process token>:<seq>` and the last
+LIVE_REPLAY_SIZE are kept, so a client reconnecting with `Last-Event-ID`
+gets exactly what it missed. An id from another process (or one too old
+to replay) gets a fresh `snapshot` event instead. Each client has a
+bounded queue; a client that falls LIVE_CLIENT_BUFFER events behind is
+disconnected and catches up through the same reconnect path.
+
+Each stream occupies a worker thread (or greenlet) until it ends, so a
+process serves at most LIVE_MAX_STREAMS at once, and streams are off
+unless LIVE_STREAMING (on by default under gevent). Dashboards refused a
+stream poll the cached snapshot instead.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from flask import Flask
+
+from config import config
+from models import ChapterStats, db
+from utils.content_catalog import catalog
+from utils.leaderboard import leaderboard
+
+Event = Tuple[str, str, str]        # (id, event type, JSON data)
+
+_DISCONNECT = object()
+
+
+def format_event(event: Event) -> str:
+    event_id, kind, data = event
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+def _seq(event_id: Optional[str]) -> int:
+    seq = (event_id or "").rpartition(":")[2]
+    return int(seq) if seq.isdigit() else 0
+
+
+# ---------------- CHANGE MARKER ---------------- #
+
+def mark_changed() -> None:
+    """Tell every publisher on this host that scores moved; call after commit."""
+    now = time.time_ns()
+    try:
+        os.utime(config.LIVE_MARKER_FILE, ns=(now, now))
+    except FileNotFoundError:
+        try:
+            with open(config.LIVE_MARKER_FILE, "a"):
+                pass
+        except OSError:
+            return
+    except OSError:
+        return
+    hub.wake()
+
+
+def _read_marker() -> Optional[int]:
+    try:
+        return os.stat(config.LIVE_MARKER_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+# ---------------- HUB ---------------- #
+
+class LiveEventHub:
+    """Per-process publisher, replay buffer and subscriber fan-out."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: List[queue.Queue] = []
+        self._replay: Deque[Event] = deque(maxlen=config.LIVE_REPLAY_SIZE)
+        self._seq = 0
+        self._token: Optional[str] = None
+        self._publisher_pid: Optional[int] = None
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        # Publisher-owned: only `_tick` (and a fork reset) assigns these
+        self._solves: Optional[Dict[int, int]] = None
+        self._marker: Optional[int] = None
+        self._state: Optional[Event] = None
+        self._polled_at = float("-inf")
+
+    # ── Publishing ───────────────────────────────────────────────────────────
+
+    def _process_token(self) -> str:
+        # Re-derived after fork so workers never share an id space
+        if self._token is None or not self._token.startswith(f"{os.getpid():x}-"):
+            self._token = f"{os.getpid():x}-{int(time.time()):x}"
+        return self._token
+
+    def _publish(self, events: List[Tuple[str, dict]], state: dict) -> None:
+        # Events and the snapshot they lead to are stored together, so a
+        # client starting from the snapshot never misses one of them
+        with self._lock:
+            published = []
+            for kind, payload in events:
+                self._seq += 1
+                published.append((f"{self._process_token()}:{self._seq}", kind,
+                                  json.dumps(payload, separators=(",", ":"))))
+            self._replay.extend(published)
+            self._state = (f"{self._process_token()}:{self._seq}", "snapshot",
+                           json.dumps(state, separators=(",", ":")))
+            subscribers = list(self._subscribers)
+        self._ready.set()
+
+        for q in subscribers:
+            for event in published:
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    self._drop(q)
+                    break
+
+    def _drop(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+        # Make room for the sentinel so the stream notices promptly
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        q.put_nowait(_DISCONNECT)
+
+    def _read_solves(self) -> Dict[int, int]:
+        return dict(db.session.query(ChapterStats.content_id, ChapterStats.completions).all())
+
+    def _active(self) -> bool:
+        recent_poll = time.monotonic() - self._polled_at < 3 * config.LIVE_FALLBACK_POLL_SECONDS
+        return bool(self._subscribers) or recent_poll
+
+    def _tick(self) -> None:
+        if not self._active():
+            leaderboard.take_changes()      # nobody listening: just discard
+            if self._state is not None:
+                # Stale once nobody watches; rebuilt when someone returns
+                self._ready.clear()
+                with self._lock:
+                    self._state = None
+                self._solves = None
+            return
+
+        marker = _read_marker()
+        if self._state is not None and marker == self._marker:
+            return
+        # Read before syncing: a change landing during the sync moves the
+        # marker again and is picked up on the next tick
+        self._marker = marker
+
+        leaderboard.sync(force=True)
+        events = []
+        rows = leaderboard.take_changes()
+        if rows:
+            events.append(("leaderboard", {
+                "rows": [r._asdict() for r in rows],
+                "total": len(leaderboard),
+            }))
+
+        solves = self._read_solves()
+        if self._solves is not None:
+            for content_id, solved in sorted(solves.items()):
+                if solved != self._solves.get(content_id):
+                    events.append(("solves", self._solve_payload(content_id, solved)))
+        self._solves = solves
+
+        self._publish(events, {
+            "rows": [r._asdict() for r in leaderboard.top(config.LIVE_TOP_N)],
+            "total": len(leaderboard),
+            "solves": [
+                self._solve_payload(content_id, solved)
+                for content_id, solved in sorted(solves.items())
+            ],
+        })
+
+    def _run(self, app: Flask) -> None:
+        while True:
+            self._wake.wait(config.LIVE_POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                with app.app_context():
+                    self._tick()
+            except Exception:
+                app.logger.exception("Live dashboard publisher tick failed")
+
+    def wake(self) -> None:
+        """Run the publisher's next check now rather than at the next interval."""
+        self._wake.set()
+
+    def ensure_publisher(self, app: Flask) -> None:
+        """Start this process's publisher thread (once, after any fork)."""
+        with self._lock:
+            if self._publisher_pid == os.getpid():
+                return
+            self._publisher_pid = os.getpid()
+            self._subscribers = []
+            self._state = None
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._solves = self._marker = None
+        threading.Thread(target=self._run, args=(app,),
+                         name="live-events", daemon=True).start()
+
+    # ── Subscribing ──────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _solve_payload(content_id: int, solved: int) -> dict:
+        record = catalog.get(content_id)
+        return {
+            "content_id": content_id,
+            "chapter_number": record.chapter_number if record else None,
+            "title": record.title if record else None,
+            "solved": solved,
+        }
+
+    def snapshot(self, timeout: float) -> Optional[Event]:
+        """
+        The publisher's latest full state, waiting up to `timeout` for the
+        first one. It carries the id of the latest event, so a later
+        reconnect replays only what came after it. Reads no database.
+        """
+        if self._state is None:
+            self.wake()
+            self._ready.wait(timeout)
+        return self._state
+
+    def poll(self, app: Flask) -> Optional[Event]:
+        """Snapshot for a polling dashboard; keeps the publisher running."""
+        self._polled_at = time.monotonic()
+        self.ensure_publisher(app)
+        return self.snapshot(config.LIVE_FALLBACK_POLL_SECONDS)
+
+    def missed_since(self, last_event_id: Optional[str]) -> Optional[List[Event]]:
+        """Buffered events after `last_event_id`, or None if they can't be replayed."""
+        if not last_event_id or ":" not in last_event_id:
+            return None
+        token, _, seq = last_event_id.rpartition(":")
+        if token != self._process_token() or not seq.isdigit():
+            return None
+
+        seq = int(seq)
+        with self._lock:
+            buffered = list(self._replay)
+        if seq > self._seq:
+            return None
+        if buffered and _seq(buffered[0][0]) > seq + 1:
+            return None         # the gap has already fallen out of the buffer
+        return [e for e in buffered if _seq(e[0]) > seq]
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        """A new client queue, or None if LIVE_MAX_STREAMS are already open."""
+        q: queue.Queue = queue.Queue(maxsize=config.LIVE_CLIENT_BUFFER)
+        with self._lock:
+            if len(self._subscribers) >= config.LIVE_MAX_STREAMS:
+                return None
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def stream(self, q: queue.Queue, last_event_id: Optional[str]) -> Iterator[str]:
+        """
+        Body of one SSE response from a queue subscribed beforehand: what
+        the client missed (or a snapshot), then live events and heartbeats.
+        Events published between subscribing and the catch-up reach the
+        queue too; they are skipped there so the client sees each once.
+        """
+        deadline = time.monotonic() + config.LIVE_MAX_STREAM_SECONDS
+        try:
+            yield f"retry: {config.LIVE_RETRY_MS}\n\n"
+            first = self.missed_since(last_event_id)
+            if first is None:
+                state = self.snapshot(config.LIVE_HEARTBEAT_SECONDS)
+                if state is None:
+                    return          # the browser reconnects and tries again
+                first = [state]
+            sent = _seq(first[-1][0]) if first else _seq(last_event_id)
+            for event in first:
+                yield format_event(event)
+
+            while time.monotonic() < deadline:
+                try:
+                    event = q.get(timeout=config.LIVE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is _DISCONNECT:
+                    return
+                if _seq(event[0]) <= sent:
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(q)
+
+
+hub = LiveEventHub()
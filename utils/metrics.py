@@ -0,0 +1,313 @@
+"""
+Prometheus metrics aggregated across gunicorn workers.
+
+Each worker process keeps its own counters and latency histograms in
+memory; a background thread writes a JSON snapshot to
+`METRICS_DIR/<pid>-<start_ns>.json` every METRICS_FLUSH_INTERVAL when
+anything has changed (and the worker serving a scrape writes its own
+first). The start token keeps a new process that reuses an old pid from
+overwriting the old process's snapshot. The `/admin/metrics` endpoint
+merges every snapshot in the directory: counters and histograms are
+summed over all processes, including workers that have since exited, so
+they never go backwards on a worker restart; gauges (connection pool use)
+are summed over live processes only, where a pid shared by several
+snapshots belongs to the one that started last.
+
+Empty METRICS_DIR when deploying so counters from a previous release do
+not carry over.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, current_app, g, request
+
+from config import config
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, str, Dict[str, str], float]     # (kind, name, labels, value)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP: Dict[str, Tuple[str, str]] = {
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint"),
+    "http_requests_total": ("counter", "Requests by endpoint, method and status"),
+    "submit_outcomes_total": ("counter", "Outcome of /submit requests"),
+    "cache_hits_total": ("counter", "In-process cache hits"),
+    "cache_misses_total": ("counter", "In-process cache misses"),
+    "cache_hit_ratio": ("gauge", "Cache hits / lookups, over all processes"),
+    "db_pool_size": ("gauge", "Configured connection pool size, summed over workers"),
+    "db_pool_checked_out": ("gauge", "Connections currently checked out"),
+    "db_pool_overflow": ("gauge", "Connections open beyond the pool size"),
+    "metrics_processes": ("gauge", "Live processes reporting metrics"),
+}
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """This process's counters and histograms, plus collectors read at flush."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._dirty = False
+        self._flusher_pid: Optional[int] = None
+        self._process: Optional[Tuple[int, int]] = None
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+            self._dirty = True
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _key(labels))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                # one slot per bucket, then sum and count
+                h = self._histograms[key] = [0.0] * (len(LATENCY_BUCKETS) + 2)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+                    break
+            h[-2] += value
+            h[-1] += 1
+            self._dirty = True
+
+    def add_collector(self, fn: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(fn)
+
+    def process(self) -> Tuple[int, int]:
+        """(pid, start token) of this process; a forked child gets its own."""
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            self._process = (pid, time.time_ns())
+        return self._process
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._dirty = False
+            counters = [[n, dict(k), v] for (n, k), v in self._counters.items()]
+            histograms = [[n, dict(k), list(h)] for (n, k), h in self._histograms.items()]
+
+        gauges = []
+        for collect in self._collectors:
+            for kind, name, labels, value in collect():
+                (counters if kind == "counter" else gauges).append([name, labels, value])
+
+        pid, started = self.process()
+        return {
+            "pid": pid,
+            "started": started,
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": gauges,
+        }
+
+    def flush(self, directory: str) -> None:
+        pid, started = self.process()
+        path = os.path.join(directory, f"{pid}-{started}.json")
+        tmp = f"{path}.tmp"
+        with self._flush_lock:
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)
+
+    def start_flusher(self, app: Flask) -> None:
+        """Background snapshot writer; one per process, started post-fork."""
+        if self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def loop():
+            while True:
+                time.sleep(config.METRICS_FLUSH_INTERVAL)
+                if self._dirty:
+                    with app.app_context():
+                        self.flush(config.METRICS_DIR)
+
+        threading.Thread(target=loop, name="metrics-flush", daemon=True).start()
+
+
+registry = MetricsRegistry()
+
+
+# ---------------- MERGE + EXPOSITION ---------------- #
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(directory: str) -> dict:
+    counters: Dict[Tuple[str, LabelKey], float] = {}
+    histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+    gauges: Dict[Tuple[str, LabelKey], float] = {}
+    latest: Dict[int, dict] = {}   # pid -> newest snapshot written under it
+
+    names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue        # being replaced right now; picked up next scrape
+
+        for metric, labels, value in snap["counters"]:
+            key = (metric, _key(labels))
+            counters[key] = counters.get(key, 0.0) + value
+        for metric, labels, values in snap["histograms"]:
+            key = (metric, _key(labels))
+            merged = histograms.setdefault(key, [0.0] * len(values))
+            for i, v in enumerate(values):
+                merged[i] += v
+        pid = snap["pid"]
+        if pid not in latest or snap.get("started", 0) > latest[pid].get("started", 0):
+            latest[pid] = snap
+
+    live = 0
+    for pid, snap in latest.items():
+        if _alive(pid):
+            live += 1
+            for metric, labels, value in snap["gauges"]:
+                key = (metric, _key(labels))
+                gauges[key] = gauges.get(key, 0.0) + value
+
+    # Hit ratios are derived from the summed hit / miss counters
+    for (metric, labels), hits in list(counters.items()):
+        if metric == "cache_hits_total":
+            misses = counters.get(("cache_misses_total", labels), 0.0)
+            total = hits + misses
+            gauges[("cache_hit_ratio", labels)] = hits / total if total else 0.0
+    gauges[("metrics_processes", ())] = live
+
+    return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(merged: dict) -> str:
+    lines: List[str] = []
+    by_name: Dict[str, List[Tuple[LabelKey, object]]] = {}
+    for section in ("counters", "gauges", "histograms"):
+        for (metric, labels), value in merged[section].items():
+            by_name.setdefault(metric, []).append((labels, value))
+
+    for metric in sorted(by_name):
+        kind, help_text = METRIC_HELP.get(metric, ("untyped", metric))
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in sorted(by_name[metric]):
+            if kind != "histogram":
+                lines.append(f"{metric}{_labels_text(labels)} {_num(value)}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(LATENCY_BUCKETS, value):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels_text(labels, ('le', repr(bound)))} {_num(cumulative)}")
+            lines.append(f"{metric}_bucket{_labels_text(labels, ('le', '+Inf'))} {_num(value[-1])}")
+            lines.append(f"{metric}_sum{_labels_text(labels)} {_num(value[-2])}")
+            lines.append(f"{metric}_count{_labels_text(labels)} {_num(value[-1])}")
+
+    return "\n".join(lines) + "\n"
+
+
+def scrape() -> str:
+    """Flush this process, then merge every process's snapshot."""
+    registry.flush(config.METRICS_DIR)
+    return render_prometheus(merge_snapshots(config.METRICS_DIR))
+
+
+# ---------------- COLLECTORS ---------------- #
+
+def _pool_samples() -> Iterable[Sample]:
+    from models import db
+
+    pool = db.engine.pool
+    for name, attr in (("db_pool_size", "size"),
+                       ("db_pool_checked_out", "checkedout"),
+                       ("db_pool_overflow", "overflow")):
+        fn = getattr(pool, attr, None)
+        if fn is not None:
+            yield "gauge", name, {}, max(float(fn()), 0.0)
+
+
+def _cache_samples() -> Iterable[Sample]:
+    from routes.media_routes import handle_pool
+    from utils.content_catalog import catalog
+    from utils.page_cache import content_fragments
+
+    for cache, stats in (("catalog", catalog.stats()),
+                         ("page_fragments", content_fragments.stats()),
+                         ("media_fd", handle_pool.stats())):
+        yield "counter", "cache_hits_total", {"cache": cache}, stats["hits"]
+        yield "counter", "cache_misses_total", {"cache": cache}, stats["misses"]
+
+
+registry.add_collector(_pool_samples)
+registry.add_collector(_cache_samples)
+
+
+# ---------------- REQUEST HOOKS ---------------- #
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _finish_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+
+    endpoint = request.endpoint or "none"
+    registry.observe(
+        "http_request_duration_seconds",
+        time.perf_counter() - started,
+        endpoint=endpoint,
+    )
+    registry.inc(
+        "http_requests_total",
+        endpoint=endpoint,
+        method=request.method,
+        status=response.status_code,
+    )
+    registry.start_flusher(current_app._get_current_object())
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,99 @@
+"""
+Rendered-page fragments and ETags.
+
+Pages whose markup depends only on a content revision are rendered once per
+revision and kept in a bounded in-process LRU. The per-user navigation bar is
+left as a slot (see `base.html`) and spliced in on each request, so every
+player shares one cached render of a chapter.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from markupsafe import Markup
+
+# Placeholder rendered in place of `_user_nav.html` inside cached fragments
+USER_NAV_SLOT = "<!--user-nav-slot-->"
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered HTML keyed by content revision."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+
+        self.misses += 1
+        html = render()
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+def nav_slot() -> Markup:
+    return Markup(USER_NAV_SLOT)
+
+
+def fill_nav_slot(fragment: str, nav_html: str) -> str:
+    return fragment.replace(USER_NAV_SLOT, nav_html, 1)
+
+
+_template_revisions: Dict[str, str] = {}
+
+
+def template_revision(template_folder: str, names: Iterable[str]) -> str:
+    """
+    Short fingerprint of the given template files' contents, computed once
+    per process, so a deploy that changes markup changes every ETag.
+    """
+    names = tuple(names)
+    key = "|".join(names)
+    rev = _template_revisions.get(key)
+    if rev is None:
+        h = hashlib.sha256()
+        for name in names:
+            with open(os.path.join(template_folder, name), "rb") as f:
+                h.update(f.read())
+        rev = h.hexdigest()[:12]
+        _template_revisions[key] = rev
+    return rev
+
+
+def make_etag(*parts: Optional[object]) -> str:
+    """Strong validator over the given parts."""
+    raw = "\x1f".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+content_fragments = FragmentCache(max_entries=64)
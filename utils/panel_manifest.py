@@ -0,0 +1,173 @@
+"""
+Panel manifests: chapter panels compiled once, at write time.
+
+Admins paste panel URLs in many shapes (a JSON object, a JSON list, or raw
+text full of links). `parse_panels_input` normalises that into an ordered
+URL list, and `compile_manifest` classifies each URL (image / youtube /
+vimeo / direct video), precomputes embed URLs and a content hash. The
+result is stored in `contents.panel_manifest`, so the read path only has to
+hand the catalog's copy to the template. Uploaded panels (see
+`utils.panel_store`) also carry their dimensions and `srcset` strings.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from utils import panel_store
+
+MANIFEST_VERSION = 1
+
+_URL_RE = re.compile(r'https?://[^\s\'"\\,\]}\)]+')
+_YOUTUBE_ID_RE = re.compile(r"[?&]v=([^&]+)")
+
+VIDEO_EXTS = (".mp4", ".webm", ".ogg", ".mov")
+# Note: CDN/cloud hosts (cloudinary, S3, etc.) are NOT treated as video –
+# those can serve images too. The extension check handles direct files.
+
+
+class PanelRef(NamedTuple):
+    url: str
+    kind: str                      # "image" | "youtube" | "vimeo" | "direct"
+    embed_url: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    srcset: Optional[str] = None
+    webp_srcset: Optional[str] = None
+
+
+class PanelManifest(NamedTuple):
+    hash: str
+    panels: Tuple[PanelRef, ...]
+    is_video: bool = False
+    video_type: Optional[str] = None
+    video_url: Optional[str] = None
+
+    @property
+    def urls(self) -> Tuple[str, ...]:
+        return tuple(p.url for p in self.panels)
+
+
+EMPTY_MANIFEST = PanelManifest(hash="", panels=())
+
+
+# ---------------- INPUT PARSING ---------------- #
+
+def _clean(url: str) -> str:
+    return url.strip().rstrip('\\/\'" \t,')
+
+
+def parse_panels_input(raw: str) -> List[str]:
+    """Robust parser: handles plain URL lists AND pasted raw JSON blobs."""
+    raw = (raw or "").strip()
+    if not raw:
+        return []
+
+    panels: List[str] = []
+
+    # First: try to parse as a JSON object with a "panels" key, or a list
+    try:
+        data = json.loads(raw)
+        if isinstance(data, dict) and "panels" in data:
+            data = data["panels"]
+        if isinstance(data, list):
+            panels = [
+                _clean(u) for u in data
+                if isinstance(u, str) and u.startswith("http")
+            ]
+    except (json.JSONDecodeError, ValueError):
+        pass
+
+    # Second: if no URLs found yet, extract all http(s) URLs from the text
+    if not panels:
+        panels = [_clean(u) for u in _URL_RE.findall(raw)]
+
+    # Filter out any empty or non-http strings
+    return [u for u in panels if u.startswith("http")]
+
+
+def panels_from_json(panels_json: Optional[str]) -> List[str]:
+    """URL list from a stored `contents.panels_json` value."""
+    if not panels_json:
+        return []
+    try:
+        data = json.loads(panels_json)
+    except (json.JSONDecodeError, ValueError):
+        return []
+    panels = data.get("panels", []) if isinstance(data, dict) else []
+    return [u for u in panels if isinstance(u, str)]
+
+
+# ---------------- COMPILATION ---------------- #
+
+def classify_panel(url: str) -> PanelRef:
+    raw = url.strip()
+
+    if "youtube.com/watch" in raw:
+        m = _YOUTUBE_ID_RE.search(raw)
+        vid = m.group(1) if m else ""
+        return PanelRef(raw, "youtube",
+                        f"https://www.youtube.com/embed/{vid}?enablejsapi=1&rel=0")
+    if "youtu.be/" in raw:
+        vid = raw.split("youtu.be/")[-1].split("?")[0]
+        return PanelRef(raw, "youtube",
+                        f"https://www.youtube.com/embed/{vid}?enablejsapi=1&rel=0")
+    if "vimeo.com/" in raw:
+        vid = raw.rstrip("/").split("/")[-1]
+        return PanelRef(raw, "vimeo", f"https://player.vimeo.com/video/{vid}?api=1")
+    if raw.lower().endswith(VIDEO_EXTS):
+        return PanelRef(raw, "direct", raw)
+
+    stored = panel_store.describe(raw)
+    if stored is not None:
+        return PanelRef(raw, "image", None, stored.width, stored.height,
+                        stored.srcset, stored.webp_srcset)
+
+    return PanelRef(raw, "image")
+
+
+def compile_manifest(urls: List[str]) -> PanelManifest:
+    panels = tuple(classify_panel(u) for u in urls)
+
+    digest = hashlib.sha256(
+        json.dumps([list(p) for p in panels], separators=(",", ":")).encode()
+    ).hexdigest()
+
+    # A chapter with exactly one video "panel" switches to video-player mode
+    if len(panels) == 1 and panels[0].kind != "image":
+        only = panels[0]
+        return PanelManifest(digest, panels, True, only.kind, only.embed_url)
+
+    return PanelManifest(digest, panels)
+
+
+def manifest_to_json(manifest: PanelManifest) -> str:
+    return json.dumps({
+        "version": MANIFEST_VERSION,
+        "hash": manifest.hash,
+        "panels": [p._asdict() for p in manifest.panels],
+        "is_video": manifest.is_video,
+        "video_type": manifest.video_type,
+        "video_url": manifest.video_url,
+    }, separators=(",", ":"))
+
+
+def manifest_from_json(text: Optional[str]) -> Optional[PanelManifest]:
+    """Decode a stored manifest; None when missing or from an older format."""
+    if not text:
+        return None
+    try:
+        data: Dict[str, Any] = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+
+    return PanelManifest(
+        hash=data["hash"],
+        panels=tuple(PanelRef(**p) for p in data["panels"]),
+        is_video=data["is_video"],
+        video_type=data["video_type"],
+        video_url=data["video_url"],
+    )
@@ -0,0 +1,320 @@
+"""
+Uploaded chapter panels and their responsive variants.
+
+Admins can upload panel images instead of pasting remote URLs. Each upload
+is stored content-addressed as `MEDIA_ROOT/panels/<key>.<ext>` together
+with a small `<key>.json` sidecar holding its dimensions and the planned
+variants (a few narrower widths in the original format, plus WebP). The
+upload request only writes the original and the sidecar; the variants are
+resized on a process pool in the background, so upload latency does not
+depend on image size: the request reads only the image header, and the
+pool does all decoding. The pool starts its processes with "spawn":
+forking a threaded or gevent-patched worker can copy a held lock into the
+child and deadlock it. A spawned child re-imports the parent's main
+module; under gunicorn or the flask CLI that script is inert, but under
+`python app.py` each child runs `create_app()` once when the pool starts.
+
+Variant names are fixed at upload time, so the panel manifest can record
+`srcset` strings straight away. Until a variant file exists `/media/`
+answers its URL with the original image (uncached), after which the
+variant is served with immutable caching.
+
+Resizing needs the optional `Pillow` package, imported on first use so app
+startup does not pay for it; without it uploads are stored as-is and
+served without variants.
+"""
+
+import functools
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from config import config
+
+
+log = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _pillow():
+    """(Image, ImageOps), imported on first use; None without Pillow."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:      # optional: uploads are kept without variants
+        return None
+    return Image, ImageOps
+
+
+def pillow_available() -> bool:
+    return _pillow() is not None
+
+PANELS_DIR = "panels"
+PANEL_URL_PREFIX = "/media/panels/"
+
+# Widths generated below the original's width, with their JPEG/WebP quality
+VARIANT_WIDTHS: Tuple[Tuple[int, int], ...] = ((480, 70), (960, 78), (1600, 82))
+FULL_WIDTH_WEBP_QUALITY = 85
+
+# Pillow format -> stored extension. GIFs keep their animation, so no variants.
+IMAGE_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+RESIZABLE_FORMATS = ("JPEG", "PNG", "WEBP")
+
+_KEY_RE = re.compile(r"^[0-9a-f]{20}$")
+_VARIANT_RE = re.compile(r"^panels/([0-9a-f]{20})-\d+\.(?:jpg|png|webp)$")
+
+# (file name, width, Pillow format, quality)
+VariantJob = Tuple[str, int, str, int]
+
+
+class StoredPanel(NamedTuple):
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    srcset: Optional[str] = None
+    webp_srcset: Optional[str] = None
+
+
+def panels_folder() -> str:
+    return os.path.join(config.MEDIA_ROOT, PANELS_DIR)
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# ---------------- VARIANT PLAN ---------------- #
+
+def plan_variants(key: str, fmt: str, width: int) -> List[VariantJob]:
+    """Every variant to build for an original of the given format and width."""
+    if fmt not in RESIZABLE_FORMATS:
+        return []
+
+    ext = IMAGE_FORMATS[fmt]
+    jobs: List[VariantJob] = []
+    for w, quality in VARIANT_WIDTHS:
+        if w >= width:
+            break
+        if ext != ".webp":
+            jobs.append((f"{key}-{w}{ext}", w, fmt, quality))
+        jobs.append((f"{key}-{w}.webp", w, "WEBP", quality))
+    if ext != ".webp":
+        jobs.append((f"{key}-{width}.webp", width, "WEBP", FULL_WIDTH_WEBP_QUALITY))
+    return jobs
+
+
+def _srcsets(meta: dict) -> Tuple[Optional[str], Optional[str]]:
+    original = f"{PANEL_URL_PREFIX}{meta['key']}{meta['ext']}"
+    width = meta["width"]
+    same, webp = [], []
+    for name, w, fmt, _ in meta["variants"]:
+        (webp if fmt == "WEBP" else same).append(f"{PANEL_URL_PREFIX}{name} {w}w")
+    if not meta["variants"]:
+        return None, None
+    if meta["ext"] == ".webp":
+        webp.append(f"{original} {width}w")
+        return None, ", ".join(webp)
+    same.append(f"{original} {width}w")
+    return ", ".join(same), ", ".join(webp)
+
+
+# ---------------- UPLOAD ---------------- #
+
+# EXIF orientations 5-8 rotate by 90 or 270 degrees
+_EXIF_ORIENTATION = 0x0112
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _display_size(im) -> Tuple[int, int]:
+    """Size after `exif_transpose`, read from the header without decoding."""
+    width, height = im.size
+    if im.getexif().get(_EXIF_ORIENTATION) in _TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def store_upload(upload) -> StoredPanel:
+    """
+    Save an uploaded image (a werkzeug FileStorage) and queue its variants.
+    Raises ValueError for empty or unsupported files.
+    """
+    data = upload.read()
+    if not data:
+        raise ValueError(f"{upload.filename or 'Upload'} is empty.")
+
+    width = height = None
+    pillow = _pillow()
+    if pillow is not None:
+        Image, _ = pillow
+        try:
+            # Header only: decoding is left to build_variants in the pool
+            with Image.open(io.BytesIO(data)) as im:
+                fmt = im.format
+                width, height = _display_size(im)
+        except Exception:
+            fmt = None
+    else:
+        ext = os.path.splitext(upload.filename or "")[1].lower()
+        ext = ".jpg" if ext == ".jpeg" else ext
+        fmt = next((f for f, e in IMAGE_FORMATS.items() if e == ext), None)
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"{upload.filename or 'Upload'} is not a JPEG, PNG, WebP or GIF image.")
+
+    key = hashlib.sha256(data).hexdigest()[:20]
+    ext = IMAGE_FORMATS[fmt]
+    folder = panels_folder()
+    os.makedirs(folder, exist_ok=True)
+
+    original = os.path.join(folder, f"{key}{ext}")
+    if not os.path.exists(original):
+        _write(original, data)
+
+    jobs = plan_variants(key, fmt, width) if pillow is not None else []
+    meta = {"key": key, "ext": ext, "width": width, "height": height, "variants": jobs}
+    _write(os.path.join(folder, f"{key}.json"), json.dumps(meta).encode())
+
+    if jobs:
+        schedule_variants(original, jobs)
+
+    return describe_meta(meta)
+
+
+def describe_meta(meta: dict) -> StoredPanel:
+    srcset, webp_srcset = _srcsets(meta)
+    return StoredPanel(
+        url=f"{PANEL_URL_PREFIX}{meta['key']}{meta['ext']}",
+        width=meta["width"],
+        height=meta["height"],
+        srcset=srcset,
+        webp_srcset=webp_srcset,
+    )
+
+
+def _read_meta(key: str) -> Optional[dict]:
+    if not _KEY_RE.match(key):
+        return None
+    try:
+        with open(os.path.join(panels_folder(), f"{key}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def describe(url: str) -> Optional[StoredPanel]:
+    """Dimensions and srcsets for a stored panel URL; None for other URLs."""
+    if not url.startswith(PANEL_URL_PREFIX):
+        return None
+    key = os.path.splitext(url[len(PANEL_URL_PREFIX):])[0]
+    meta = _read_meta(key)
+    return describe_meta(meta) if meta else None
+
+
+def original_for(filename: str) -> Optional[str]:
+    """Media-relative path of the original behind a variant file name."""
+    m = _VARIANT_RE.match(filename)
+    if not m:
+        return None
+    meta = _read_meta(m.group(1))
+    if meta is None:
+        return None
+    return f"{PANELS_DIR}/{meta['key']}{meta['ext']}"
+
+
+def is_stored_panel(filename: str) -> bool:
+    """Content-addressed panel files never change once written."""
+    return filename.startswith(f"{PANELS_DIR}/")
+
+
+# ---------------- BACKGROUND RESIZING ---------------- #
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=config.MEDIA_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _log_failure(future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        log.warning("Panel variant build failed: %s", exc)
+
+
+def schedule_variants(original: str, jobs: List[VariantJob]) -> None:
+    global _pool
+    try:
+        future = _executor().submit(build_variants, original, jobs)
+    except Exception as exc:            # broken pool: reset and serve originals
+        log.warning("Could not queue panel variants for %s: %s", original, exc)
+        with _pool_lock:
+            _pool = None
+        return
+    future.add_done_callback(_log_failure)
+
+
+def build_variants(original: str, jobs: List[VariantJob]) -> int:
+    """Resize one original into its planned variants; returns files written."""
+    Image, ImageOps = _pillow()
+    folder = os.path.dirname(original)
+    written = 0
+
+    with Image.open(original) as im:
+        im = ImageOps.exif_transpose(im)
+        im.load()
+        for name, width, fmt, quality in jobs:
+            target = os.path.join(folder, name)
+            if os.path.exists(target):
+                continue
+
+            height = max(1, round(im.height * width / im.width))
+            out = im if width == im.width else im.resize((width, height), Image.LANCZOS)
+            if fmt == "JPEG" and out.mode not in ("RGB", "L"):
+                out = out.convert("RGB")
+
+            buf = io.BytesIO()
+            if fmt == "PNG":
+                out.save(buf, "PNG", optimize=True)
+            elif fmt == "WEBP":
+                out.save(buf, "WEBP", quality=quality, method=4)
+            else:
+                out.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+            _write(target, buf.getvalue())
+            written += 1
+
+    return written
+
+
+def missing_variants() -> List[Tuple[str, List[VariantJob]]]:
+    """(original path, jobs) for every stored panel with unbuilt variants."""
+    folder = panels_folder()
+    if not os.path.isdir(folder):
+        return []
+
+    pending = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".json"):
+            continue
+        meta = _read_meta(name[:-5])
+        if not meta:
+            continue
+        jobs = [j for j in meta["variants"] if not os.path.exists(os.path.join(folder, j[0]))]
+        if jobs:
+            pending.append((os.path.join(folder, f"{meta['key']}{meta['ext']}"), jobs))
+    return pending
@@ -0,0 +1,49 @@
+"""
+Finish-order sequencing for chapter completions.
+
+Each completed attempt takes the next number from `chapter_stats.completions`
+with a single `UPDATE ... RETURNING`. The row lock serialises concurrent
+submits (SQLite takes the database write lock, Postgres the row lock), so
+every completion gets a distinct place in O(1), however many came before.
+"""
+
+from sqlalchemy import update
+
+from models import ChapterStats, db
+from utils.chapter_rollups import create_stats_row
+
+# Chapters with an interactive puzzle/game that pay a placement bonus
+GAME_CHAPTERS = {3, 4, 5, 7}
+
+
+def placement_bonus(place: int) -> int:
+    """1st → +500 | 2nd → +300 | 3rd → +150 | 4th-28th → +100 | 29th+ → +50"""
+    if place == 1:
+        return 500
+    if place == 2:
+        return 300
+    if place == 3:
+        return 150
+    if place <= 28:
+        return 100
+    return 50
+
+
+def _increment(content_id: int):
+    return db.session.execute(
+        update(ChapterStats)
+        .where(ChapterStats.content_id == content_id)
+        .values(completions=ChapterStats.completions + 1)
+        .returning(ChapterStats.completions)
+    ).scalar()
+
+
+def next_completion_place(content_id: int, attempt_id: int) -> int:
+    """Claim this attempt's 1-based finish position for the chapter."""
+    place = _increment(content_id)
+    if place is None:
+        # First completion since the counters existed: seed them from the
+        # attempts on record (this attempt's start was never counted)
+        create_stats_row(content_id, attempt_id, count_own_start=True)
+        place = _increment(content_id)
+    return int(place)
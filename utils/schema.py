@@ -0,0 +1,90 @@
+"""
+Schema setup at app start, per SCHEMA_MODE.
+
+- `create_all` (default): `db.create_all()` on every start, handy for a
+  local SQLite file but a reflection round trip per table on every boot.
+- `alembic`: trust `flask db upgrade` (run by the deploy). Startup reads
+  `alembic_version` once and refuses to serve a database that is not at
+  the head revision of `migrations/versions`. The head is found by reading
+  the revision ids out of the migration files, so this does not import
+  Alembic itself.
+- `skip`: no schema work at all.
+
+With gunicorn's `preload_app` (gunicorn.conf.py) this runs once in the
+master before the workers fork.
+"""
+
+import os
+import re
+from typing import Optional, Set
+
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from config import config
+from models import db
+
+SCHEMA_MODES = ("create_all", "alembic", "skip")
+
+VERSIONS_DIR = os.path.join(config.BASE_DIR, "migrations", "versions")
+
+_REVISION_RE = re.compile(r"^revision\s*=\s*['\"]([0-9a-f]+)['\"]", re.M)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\s*=\s*['\"]([0-9a-f]+)['\"]", re.M)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def migration_heads(versions_dir: str = VERSIONS_DIR) -> Set[str]:
+    """Revisions no other migration builds on."""
+    revisions: Set[str] = set()
+    parents: Set[str] = set()
+    for name in os.listdir(versions_dir):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, name)) as f:
+            source = f.read()
+        m = _REVISION_RE.search(source)
+        if m:
+            revisions.add(m.group(1))
+        parents.update(_DOWN_REVISION_RE.findall(source))
+    return revisions - parents
+
+
+def database_revision() -> Optional[str]:
+    with db.engine.connect() as conn:
+        if not inspect(conn).has_table("alembic_version"):
+            return None
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def check_alembic_head() -> str:
+    heads = migration_heads()
+    current = database_revision()
+    if current not in heads:
+        raise SchemaOutOfDate(
+            f"Database is at revision {current or '(none)'}, expected "
+            f"{' / '.join(sorted(heads))}. Run `flask db upgrade` first."
+        )
+    return current
+
+
+def prepare_schema(app: Flask, from_cli: bool = False) -> None:
+    """
+    Run SCHEMA_MODE's startup step. The revision check is skipped for the
+    `flask` CLI, which is what `flask db upgrade` runs under.
+    """
+    mode = config.SCHEMA_MODE
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"SCHEMA_MODE must be one of {', '.join(SCHEMA_MODES)}, not {mode!r}")
+    if mode == "skip" or (mode == "alembic" and from_cli):
+        return
+
+    with app.app_context():
+        if mode == "create_all":
+            db.create_all()
+        else:
+            check_alembic_head()
+        # Workers (or a preloading master's children) open their own connections
+        db.engine.dispose()
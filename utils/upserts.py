@@ -0,0 +1,21 @@
+"""
+Dialect-specific INSERT constructs for `ON CONFLICT` upserts.
+
+Both supported backends (SQLite 3.24+ and Postgres) accept the same
+`on_conflict_do_nothing` / `on_conflict_do_update` API, but SQLAlchemy
+exposes it through each dialect's own `insert`.
+"""
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db
+
+
+def dialect_insert(model):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return pg_insert(model)
+    if dialect == "sqlite":
+        return sqlite_insert(model)
+    raise NotImplementedError(f"No upsert support for {dialect}")
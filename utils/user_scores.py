@@ -0,0 +1,122 @@
+"""
+Materialized per-user score totals.
+
+`users.total_score` mirrors SUM(attempts.score). It is updated in the same
+transaction as the attempt that earned (or lost) the points, and can be
+rebuilt from `attempts` with `flask repair-scores`.
+
+The nav badge reads the total from the Flask session, stamped with the
+user's progress version. Every change to a user's points also bumps that
+version, so the cached total is dropped as soon as a caller that read the
+version sees it move, and after PROGRESS_MASK_TTL seconds otherwise.
+"""
+
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select, update
+
+from config import config
+from models import Attempt, User, db
+
+SESSION_KEY = "user_total_score"
+
+
+def add_to_user_total(user_id: int, points: float) -> float:
+    """Atomically add `points` to the user's total and return the new total."""
+    new_total = db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            total_score=User.total_score + points,
+            score_updated_at=datetime.utcnow(),
+        )
+        .returning(User.total_score)
+    ).scalar()
+    return float(new_total or 0)
+
+
+def read_user_total(user_id: int) -> Tuple[float, int]:
+    """Primary-key read of the materialized total and the progress version."""
+    row = (
+        db.session.query(User.total_score, User.progress_version)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return 0.0, 0
+    return float(row.total_score or 0), int(row.progress_version or 0)
+
+
+def count_drifted_totals() -> int:
+    """Number of users whose stored total disagrees with their attempts."""
+    actual = (
+        select(func.coalesce(func.sum(Attempt.score), 0))
+        .where(Attempt.user_id == User.id)
+        .scalar_subquery()
+    )
+    return (
+        db.session.query(func.count(User.id))
+        .filter(User.total_score != actual)
+        .scalar()
+    ) or 0
+
+
+def rebuild_user_totals() -> int:
+    """Recompute every total from `attempts`; returns how many were wrong."""
+    drifted = count_drifted_totals()
+
+    actual = (
+        select(func.coalesce(func.sum(Attempt.score), 0))
+        .where(Attempt.user_id == User.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(User).values(
+            total_score=actual,
+            score_updated_at=datetime.utcnow(),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    return drifted
+
+
+def remember_total(session, user_id: int, total: float, progress_version: Optional[int]) -> None:
+    """Cache the user's total in the session as of `progress_version`."""
+    session[SESSION_KEY] = {
+        "uid": user_id,
+        "v": total,
+        "pv": progress_version,
+        "t": time.time(),
+    }
+
+
+def cached_total(
+    session,
+    user_id: Optional[int],
+    progress_version: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Nav-badge score for the logged-in user.
+
+    Served from the Flask session while it is current: stamped with
+    `progress_version` when the caller has already read it, otherwise
+    younger than PROGRESS_MASK_TTL. Else one primary-key read, which is
+    then cached in the session.
+    """
+    if not user_id:
+        return None
+
+    cached = session.get(SESSION_KEY)
+    if isinstance(cached, dict) and cached.get("uid") == user_id:
+        if progress_version is not None:
+            current = cached.get("pv") == progress_version
+        else:
+            current = time.time() - cached.get("t", 0) < config.PROGRESS_MASK_TTL
+        if current:
+            return int(cached["v"])
+
+    total, version = read_user_total(user_id)
+    remember_total(session, user_id, total, version)
+    return int(total)